@@ -0,0 +1,100 @@
+"""Geofence evaluation benchmark: grid index against a linear scan.
+
+Places circular zones and polygons around Shanghai, moves a fleet through
+them and reports the time per refresh for both strategies, after checking
+that they find the same zones. Requires Home Assistant to be installed:
+
+    python benchmarks/bench_geofence.py --zones 1000 5000 --vehicles 50
+"""
+import argparse
+import importlib
+import pathlib
+import random
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+geofence = importlib.import_module('custom_components.Lynk&Co.geofence')
+
+CENTER = (31.2, 121.4)
+SPREAD = 0.5
+
+
+def make_zones(count, rng):
+    """Return count zones, one in ten a polygon."""
+    zones = []
+    for index in range(count):
+        lat = CENTER[0] + rng.uniform(-SPREAD, SPREAD)
+        lon = CENTER[1] + rng.uniform(-SPREAD, SPREAD)
+        if index % 10:
+            zones.append(geofence.CircleZone('zone.{}'.format(index), lat, lon, rng.uniform(50, 500)))
+        else:
+            size = rng.uniform(0.001, 0.01)
+            zones.append(geofence.PolygonZone('polygon.{}'.format(index), [
+                (lat, lon), (lat + size, lon), (lat + size, lon + size), (lat, lon + size),
+            ]))
+    return zones
+
+
+def make_positions(count, rng):
+    """Return raw fleet positions."""
+    return [
+        ((CENTER[0] + rng.uniform(-SPREAD, SPREAD)) * 3600000,
+         (CENTER[1] + rng.uniform(-SPREAD, SPREAD)) * 3600000)
+        for _ in range(count)
+    ]
+
+
+def time_refresh(lookup, positions, rounds):
+    """Return the median seconds to evaluate every position once."""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for lat, lon in positions:
+            lookup(lat, lon)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--zones', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--vehicles', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    header = '{:>8} {:>8} {:>10} {:>12} {:>12} {:>8}'
+    row = '{:>8} {:>8} {:>10.1f} {:>12.3f} {:>12.3f} {:>8.0f}'
+    print(header.format('zones', 'vehicles', 'build ms', 'linear ms', 'grid ms', 'speedup'))
+    for count in args.zones:
+        zones = make_zones(count, rng)
+        positions = make_positions(args.vehicles, rng)
+        # Put a few cars inside zones so both paths do real work
+        for i, zone in enumerate(zones[1:args.vehicles // 2:10]):
+            positions[i] = (zone.lat, zone.lon)
+
+        started = time.perf_counter()
+        index = geofence.GeofenceIndex(zones)
+        build = time.perf_counter() - started
+
+        def linear(lat, lon):
+            return {zone.name for zone in zones if zone.contains(lat, lon)}
+
+        def grid(lat, lon):
+            return {zone.name for zone in index.candidates(lat, lon) if zone.contains(lat, lon)}
+
+        for lat, lon in positions:
+            assert linear(lat, lon) == grid(lat, lon)
+        linear_time = time_refresh(linear, positions, args.rounds)
+        grid_time = time_refresh(grid, positions, args.rounds)
+        print(row.format(count, args.vehicles, build * 1000, linear_time * 1000,
+                         grid_time * 1000, linear_time / grid_time))
+
+
+if __name__ == '__main__':
+    main()
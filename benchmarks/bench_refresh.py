@@ -0,0 +1,196 @@
+"""End-to-end refresh benchmark against the local mock xchanger API.
+
+Drives LynkCoAccount, its per-vehicle coordinators and the device_tracker, sensor and
+binary_sensor platforms for fleets of 1, 10 and 100 vehicles and reports
+refresh latency, HTTP requests per cycle, entity state writes per cycle and
+memory, plus the time and memory the platforms take to set up their
+entities. --disable-ratio disables a share of the sensor kinds in the
+entity registry first. Requires Home Assistant to be installed:
+
+    python benchmarks/bench_refresh.py --fleet 1 10 100 --cycles 5
+"""
+import argparse
+import asyncio
+import importlib
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from homeassistant import config_entries
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from mock_xchanger import MockXchanger  # noqa: E402
+
+PACKAGE = 'custom_components.Lynk&Co'
+integration = importlib.import_module(PACKAGE)
+coordinator_module = importlib.import_module(PACKAGE + '.coordinator')
+api = importlib.import_module(PACKAGE + '.api')
+const = importlib.import_module(PACKAGE + '.const')
+PLATFORMS = [importlib.import_module(PACKAGE + '.' + name) for name in const.LYNKCO_COMPONENT]
+
+
+async def async_create_hass(config_dir):
+    """Return a bare HomeAssistant instance."""
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    await integration.async_setup(hass, {})
+    if hass.config_entries is None:
+        hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    return hass
+
+
+def add_config_entry(hass):
+    """Register a config entry so registry entries and devices can link to it."""
+    entry = config_entries.ConfigEntry(
+        version=1, minor_version=1, domain=const.DOMAIN, title='bench',
+        data={}, source=config_entries.SOURCE_USER, options={}, entry_id='bench',
+    )
+    hass.config_entries._entries[entry.entry_id] = entry  # pylint: disable=protected-access
+    return entry
+
+
+def disable_entities(hass, entry, vins, ratio):
+    """Disable a share of the sensor and binary_sensor kinds of every car in the registry."""
+    registry = er.async_get(hass)
+    for domain, kinds in (('sensor', const.SENSOR_TYPES), ('binary_sensor', const.BINARY_SENSOR_TYPES)):
+        kinds = list(kinds)[:int(len(kinds) * ratio)]
+        for vin in vins:
+            for kind in kinds:
+                registry.async_get_or_create(
+                    domain, const.DOMAIN, f'{vin}-{kind}'.lower(), config_entry=entry,
+                    disabled_by=er.RegistryEntryDisabler.USER)
+
+
+def render(entity):
+    """Evaluate what Home Assistant reads when it writes an entity state."""
+    if hasattr(entity, 'latitude'):
+        return (entity.latitude, entity.longitude, entity.extra_state_attributes)
+    if hasattr(entity, 'is_on'):
+        return (entity.is_on, entity.icon)
+    return (entity.state, entity.icon, entity.extra_state_attributes)
+
+
+async def async_add_platform_entities(hass, entry, counter):
+    """Set up the three platforms and count the state writes of their entities."""
+    entities = []
+
+    def add_entities(new_entities, update_before_add=False):
+        entities.extend(new_entities)
+
+    for platform in PLATFORMS:
+        await platform.async_setup_entry(hass, entry, add_entities)
+
+    for entity in entities:
+        entity.hass = hass
+
+        def write(entity=entity):
+            counter[0] += 1
+            render(entity)
+
+        entity.async_write_ha_state = write
+        await entity.async_added_to_hass()
+    return entities
+
+
+async def async_bench(size, cycles, latency, error_rate, disable_ratio):
+    """Run one fleet size and return its measurements."""
+    mock = await MockXchanger(vehicles=size, latency=latency, error_rate=error_rate).start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_create_hass(config_dir)
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+        client = api.LynkCoClient(base_url=mock.url)
+        account = coordinator_module.LynkCoAccount(hass, client, 'bench', 'bench', 5)
+
+        started = time.perf_counter()
+        await account.async_setup()
+        cold = time.perf_counter() - started
+
+        entry = add_config_entry(hass)
+        disable_entities(hass, entry, account.coordinators, disable_ratio)
+        hass.data[const.DOMAIN][entry.entry_id] = {const.ACCOUNT: account}
+        writes = [0]
+        before_platforms = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        entities = await async_add_platform_entities(hass, entry, writes)
+        platform_setup = time.perf_counter() - started
+        platform_memory = tracemalloc.get_traced_memory()[0] - before_platforms
+
+        latencies, requests, state_writes = [], [], []
+        for _ in range(cycles):
+            before = mock.total_requests
+            writes[0] = 0
+            started = time.perf_counter()
+            await account.async_refresh_all()
+            latencies.append(time.perf_counter() - started)
+            requests.append(mock.total_requests - before)
+            state_writes.append(writes[0])
+
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        await entry._async_process_on_unload(hass)  # pylint: disable=protected-access
+        await account.async_close()
+        await mock.stop()
+        try:
+            await hass.async_stop(force=True)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    return {
+        'vehicles': size,
+        'entities': len(entities),
+        'cold_ms': cold * 1000,
+        'setup_ms': platform_setup * 1000,
+        'setup_kib': platform_memory / 1024,
+        'refresh_ms': statistics.median(latencies) * 1000,
+        'requests': statistics.mean(requests),
+        'writes': statistics.mean(state_writes),
+        'memory_kib': memory / 1024,
+    }
+
+
+def no_schedule(coordinator):
+    """Cycles are driven explicitly; keep the coordinators from scheduling their own."""
+
+
+async def async_main(args):
+    """Run every fleet size and print a table."""
+    coordinator_module.LynkCoVehicleCoordinator._schedule_refresh = no_schedule
+    header = '{:>8} {:>8} {:>10} {:>10} {:>10} {:>12} {:>10} {:>10} {:>12}'
+    row = ('{vehicles:>8} {entities:>8} {cold_ms:>10.1f} {setup_ms:>10.1f} {setup_kib:>10.1f} '
+           '{refresh_ms:>12.1f} {requests:>10.1f} {writes:>10.1f} {memory_kib:>12.1f}')
+    print(header.format('vehicles', 'entities', 'cold ms', 'setup ms', 'setup KiB',
+                        'refresh ms', 'http/cycle', 'writes', 'memory KiB'))
+    for size in args.fleet:
+        result = await async_bench(size, args.cycles, args.latency, args.error_rate, args.disable_ratio)
+        print(row.format(**result))
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fleet', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--disable-ratio', type=float, default=0.0,
+                        help='share of sensor and binary_sensor kinds disabled in the registry')
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Per-car memory and GC pressure of whole status trees versus VehicleSnapshots.
+
+Decodes mock status payloads the way LynkCoClient does and either keeps the
+decoded tree (what the coordinators used to hold) or extracts a
+VehicleSnapshot from it and drops the tree. Replaced payloads are freed by
+reference counting either way, so GC pressure shows as the containers every
+full collection has to traverse. Requires Home Assistant to be
+installed, since the integration package imports it:
+
+    python benchmarks/bench_snapshot.py --fleet 1 10 100 --cycles 200
+"""
+import argparse
+import gc
+import importlib
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from mock_xchanger import MockVehicle  # noqa: E402
+
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+
+
+def keep_tree(schema, body):
+    """Hold the whole decoded payload."""
+    return json.loads(body)['data']
+
+
+def keep_snapshot(schema, body):
+    """Hold only the snapshot; the decoded tree becomes garbage right away."""
+    return schema.snapshot(json.loads(body)['data']['vehicleStatus'])
+
+
+def bodies(size, cycles):
+    """Return pre-encoded payloads, one list per cycle."""
+    vehicles = [MockVehicle(index, index % 10 == 0) for index in range(size)]
+    return [
+        [json.dumps({'data': vehicle.status()}).encode() for vehicle in vehicles]
+        for _ in range(cycles)
+    ]
+
+
+def measure(hold, schema, payloads):
+    """Return retained bytes and GC-tracked containers per car, full collection and refresh time."""
+    size = len(payloads[0])
+    gc.collect()
+    tracked = len(gc.get_objects())
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    held = [hold(schema, body) for body in payloads[0]]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    gc.collect()
+    tracked = len(gc.get_objects()) - tracked
+
+    started = time.perf_counter()
+    for cycle in payloads[1:]:
+        for index, body in enumerate(cycle):
+            held[index] = hold(schema, body)
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    gc.collect()
+    collect = time.perf_counter() - started
+    del held
+    return {
+        'per_car_bytes': retained / size,
+        'tracked': tracked / size,
+        'collect_ms': collect * 1000,
+        'refresh_us': elapsed / (size * (len(payloads) - 1)) * 1e6,
+    }
+
+
+def main():
+    """Parse arguments and print one row per fleet size and representation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fleet', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--cycles', type=int, default=200)
+    args = parser.parse_args()
+    schema = snapshot.SnapshotSchema()
+    header = '{:>8} {:>9} {:>14} {:>16} {:>11} {:>11}'
+    row = '{size:>8} {mode:>9} {per_car_bytes:>14.0f} {tracked:>16.1f} {collect_ms:>11.2f} {refresh_us:>11.1f}'
+    print(header.format('vehicles', 'holds', 'bytes per car', 'tracked per car', 'gc.collect ms', 'refresh us'))
+    for size in args.fleet:
+        payloads = bodies(size, args.cycles)
+        for mode, hold in (('tree', keep_tree), ('snapshot', keep_snapshot)):
+            print(row.format(size=size, mode=mode, **measure(hold, schema, payloads)))
+
+
+if __name__ == '__main__':
+    main()
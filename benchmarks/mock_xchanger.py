@@ -0,0 +1,281 @@
+"""Local stand-in for the api.xchanger.cn endpoints used by the integration.
+
+Run standalone with ``python benchmarks/mock_xchanger.py --vehicles 10`` and
+point ``LynkCoClient(base_url=...)`` at it, or start it in-process with
+``MockXchanger(...).start()`` as the benchmarks do.
+"""
+import argparse
+import asyncio
+import collections
+import random
+import time
+
+from aiohttp import web
+
+DRIVING_SAFETY = (
+    'seatBeltStatusDriverRear', 'seatBeltStatusDriver', 'seatBeltStatusPassenger',
+    'seatBeltStatusPassengerRear', 'doorOpenStatusDriverRear', 'doorOpenStatusDriver',
+    'doorOpenStatusPassenger', 'doorOpenStatusPassengerRear', 'doorLockStatusDriverRear',
+    'doorLockStatusDriver', 'doorLockStatusPassenger', 'doorLockStatusPassengerRear',
+    'trunkLockStatus', 'trunkOpenStatus', 'engineHoodOpenStatus', 'srsStatus',
+    'centralLockingStatus', 'handBrakeStatus', 'vehicleAlarm',
+)
+MAINTENANCE = (
+    'tyrePreWarningDriver', 'tyrePreWarningPassenger', 'tyrePreWarningDriverRear',
+    'tyrePreWarningPassengerRear', 'engineHrsToService', 'daysToService', 'odometer',
+    'brakeFluidLevelStatus', 'tyreStatusDriver', 'tyreStatusPassenger',
+    'tyreStatusDriverRear', 'tyreStatusPassengerRear', 'distanceToService',
+    'serviceWarningTrigger', 'serviceWarningStatus', 'washerFluidLevelStatus',
+)
+CLIMATE = (
+    'exteriorTemp', 'interiorTemp', 'winStatusDriverRear', 'winStatusDriver',
+    'winStatusPassengerRear', 'winStatusPassenger', 'sunroofOpenStatus',
+    'ventilateStatus', 'preClimateActive',
+)
+DRIVING_BEHAVIOUR = (
+    'cruiseControlStatus', 'brakePedalDepressed', 'transimissionGearPostion', 'engineSpeed',
+)
+RUNNING = (
+    'fuelLevelStatus', 'aveFuelConsumptionInLatestDrivingCycle', 'engineOilPressureWarning',
+    'bulbStatus', 'engineCoolantTemperature', 'engineCoolantLevelStatus',
+    'engineOilLevelStatus', 'tripMeter1', 'tripMeter2', 'aveFuelConsumption', 'avgSpeed',
+)
+
+ENDPOINTS = (
+    ('/api/v1/user/login', 'login'),
+    ('/api/v1/user/token/refresh', 'token_refresh'),
+    ('/device_platform/user/vehicle', 'vehicles'),
+    ('/geelyTCAccess/tcservices/vehicle/status/', 'status'),
+    ('/geelyTCAccess/tcservices/vehicle/telematics/', 'telematics'),
+)
+
+
+def endpoint_name(path):
+    """Return the short endpoint name of a request path."""
+    for prefix, name in ENDPOINTS:
+        if path.startswith(prefix):
+            return name
+    return path
+
+
+def make_vin(index):
+    """Return a deterministic 17 character VIN."""
+    return 'LB37MOCK{:09d}'.format(index)
+
+
+class MockVehicle:
+    """Simulated car; a fraction of the fleet drives and changes state."""
+
+    def __init__(self, index, moving):
+        """Initialize."""
+        self.vin = make_vin(index)
+        self.index = index
+        self.moving = moving
+        self.latitude = int((31.2 + index * 0.001) * 3600000)
+        self.longitude = int((121.4 + index * 0.001) * 3600000)
+        self.odometer = 10000 + index
+        self.fuel = 40
+        self.locked = 1
+
+    def step(self):
+        """Advance the simulation by one status request."""
+        if self.moving:
+            self.latitude += random.randint(0, 2000)
+            self.longitude += random.randint(0, 2000)
+            self.odometer += 1
+            self.fuel = max(0, self.fuel - random.random() / 10)
+
+    def roster(self):
+        """Return the vehicle list entry."""
+        return {
+            'vin': self.vin,
+            'plateNo': 'MOCK{:04d}'.format(self.index),
+            'seriesName': '01',
+            'colorCode': 'BLK',
+            'tboxPlatform': 'mock',
+        }
+
+    def status(self):
+        """Return the status payload in the shape of the real endpoint."""
+        self.step()
+        speed = random.randint(20, 90) if self.moving else 0
+        safety = dict.fromkeys(DRIVING_SAFETY, 0)
+        for kind in DRIVING_SAFETY:
+            if 'LockStatus' in kind:
+                safety[kind] = self.locked
+            elif 'seatBeltStatus' in kind:
+                safety[kind] = bool(self.moving)
+        maintenance = dict.fromkeys(MAINTENANCE, 0)
+        maintenance['odometer'] = self.odometer
+        maintenance['mainBatteryStatus'] = {
+            'stateOfCharge': 90, 'chargeLevel': 1, 'stateOfHealth': 95, 'voltage': 12.6,
+        }
+        climate = dict.fromkeys(CLIMATE, 0)
+        climate['exteriorTemp'] = 21
+        climate['interiorTemp'] = 24
+        behaviour = dict.fromkeys(DRIVING_BEHAVIOUR, 0)
+        behaviour['engineSpeed'] = speed * 30
+        running = dict.fromkeys(RUNNING, 0)
+        running['fuelLevelStatus'] = round(self.fuel, 1)
+        return {
+            'result': {'vin': self.vin},
+            'vehicleStatus': {
+                'updateTime': int(time.time() * 1000),
+                'basicVehicleStatus': {
+                    'keyStatus': 0,
+                    'engineStatus': 'ENGINE_RUNNING' if self.moving else 'ENGINE_OFF',
+                    'speed': speed,
+                    'direction': random.randint(0, 359) if self.moving else 0,
+                    'distanceToEmpty': int(self.fuel * 12),
+                    'position': {
+                        'latitude': self.latitude,
+                        'longitude': self.longitude,
+                        'altitude': 10,
+                        'posCanBeTrusted': True,
+                    },
+                },
+                'additionalVehicleStatus': {
+                    'ecuWarningMessages': [],
+                    'drivingSafetyStatus': safety,
+                    'maintenanceStatus': maintenance,
+                    'climateStatus': climate,
+                    'drivingBehaviourStatus': behaviour,
+                    'runningStatus': running,
+                },
+            },
+        }
+
+
+class MockXchanger:
+    """aiohttp application serving a simulated fleet."""
+
+    def __init__(self, vehicles=1, moving_ratio=0.1, latency=0.05, jitter=0.02,
+                 error_rate=0.0, auth_error_rate=0.0, host='127.0.0.1', port=0,
+                 throttle_rate=0.0, retry_after=1):
+        """Initialize."""
+        moving = max(1, int(vehicles * moving_ratio)) if moving_ratio else 0
+        self.vehicles = {}
+        for index in range(vehicles):
+            vehicle = MockVehicle(index, index < moving)
+            self.vehicles[vehicle.vin] = vehicle
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.auth_error_rate = auth_error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.host = host
+        self.port = port
+        self.requests = collections.Counter()
+        self.bytes_sent = 0
+        self._runner = None
+
+    @property
+    def url(self):
+        """Return the base URL to hand to LynkCoClient."""
+        return 'http://{}:{}'.format(self.host, self.port)
+
+    @property
+    def total_requests(self):
+        """Return the number of requests served so far."""
+        return sum(self.requests.values())
+
+    def app(self):
+        """Return the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post('/api/v1/user/login', self._login)
+        app.router.add_post('/api/v1/user/token/refresh', self._login)
+        app.router.add_get('/device_platform/user/vehicle', self._vehicles)
+        app.router.add_get('/geelyTCAccess/tcservices/vehicle/status/{vin}', self._status)
+        app.router.add_put('/geelyTCAccess/tcservices/vehicle/telematics/{vin}', self._telematics)
+        return app
+
+    async def start(self):
+        """Start serving; returns self once the port is bound."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        name = endpoint_name(request.path)
+        self.requests[name] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if random.random() < self.throttle_rate:
+            return web.json_response(
+                {'message': 'too many requests'}, status=429,
+                headers={'Retry-After': str(self.retry_after)})
+        if name != 'login':
+            if random.random() < self.auth_error_rate:
+                return web.json_response({'message': 'unauthorized'}, status=401)
+            if random.random() < self.error_rate:
+                return web.json_response({'message': 'internal error'}, status=500)
+        response = await handler(request)
+        self.bytes_sent += response.content_length or 0
+        return response
+
+    async def _login(self, request):
+        return web.json_response({
+            'resultMessage': 'Success',
+            'accessToken': 'mock-access-token',
+            'refreshToken': 'mock-refresh-token',
+            'userId': 'mock-user',
+            'expiresIn': 3600,
+        })
+
+    async def _vehicles(self, request):
+        return web.json_response({'list': [v.roster() for v in self.vehicles.values()]})
+
+    async def _status(self, request):
+        vehicle = self.vehicles.get(request.match_info['vin'])
+        if vehicle is None:
+            return web.json_response({'message': 'not found'}, status=404)
+        return web.json_response({'data': vehicle.status()})
+
+    async def _telematics(self, request):
+        vehicle = self.vehicles.get(request.match_info['vin'])
+        if vehicle is None:
+            return web.json_response({'message': 'not found'}, status=404)
+        body = await request.json()
+        if body.get('serviceId') == 'RDL':
+            vehicle.locked = 1
+        elif body.get('serviceId') == 'RDU':
+            vehicle.locked = 0
+        elif body.get('serviceId') == 'RES':
+            vehicle.moving = body.get('command') == 'start'
+        return web.json_response({'message': 'success'})
+
+
+def main():
+    """Serve the mock API until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vehicles', type=int, default=1)
+    parser.add_argument('--moving-ratio', type=float, default=0.1)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--auth-error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+    mock = MockXchanger(
+        args.vehicles, args.moving_ratio, args.latency, args.jitter,
+        args.error_rate, args.auth_error_rate, args.host, args.port,
+        args.throttle_rate,
+    )
+    web.run_app(mock.app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,28 +5,19 @@ For more details about this component, please refer to
 https://github.com/fineemb/xiaomi-cloud
 """
 import asyncio
-import json
 import datetime
-import time
 import logging
-import re
-import base64
-import hashlib
 
-import async_timeout
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 
-from urllib import parse
-from aiohttp.client_exceptions import ClientConnectorError
-from homeassistant.core import Config, HomeAssistant
+from aiohttp import ClientError
+from homeassistant.core import Config, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.components.device_tracker import (
-    ATTR_BATTERY,
-    DOMAIN as DEVICE_TRACKER,
-)
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.const import (
     CONF_PASSWORD,
     CONF_USERNAME,
@@ -36,10 +27,31 @@ from homeassistant.const import (
 
 from .const import (
     DOMAIN,
+    UNDO_ROSTER_SYNC,
     UNDO_UPDATE_LISTENER,
-    COORDINATOR,
-    LYNKCO_COMPONENT
+    ACCOUNT,
+    CONF_GEOFENCES,
+    CONF_TRACE_SAMPLE_RATE,
+    CONF_TRACKER_ATTRIBUTES,
+    CONF_TRIP_IDLE_TIMEOUT,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    DEFAULT_TRACKER_ATTRIBUTES,
+    DEFAULT_TRIP_IDLE_TIMEOUT,
+    GEOFENCES,
+    LYNKCO_COMPONENT,
+    MIN_SCAN_INTERVAL,
+    ROSTER_SYNC_INTERVAL,
+    SIGNAL_VEHICLES_ADDED,
+    SIGNAL_VEHICLES_REMOVED,
+    STORAGE_KEY,
+    STORAGE_VERSION
 )
+from .api import LynkCoClient
+from .coordinator import LynkCoAccount
+from .exceptions import LynkCoError
+from .geofence import GeofenceEngine, parse_polygons
+from .ratelimit import async_get_limiter
+from .snapshot import parse_projection
 
 SET_SERVICE_SCHEMA = vol.Schema({
     vol.Required(ATTR_ENTITY_ID): cv.entity_id
@@ -52,6 +64,13 @@ SERVICE_SCHEMA_HLF = SET_SERVICE_SCHEMA.extend({
     vol.Required("value"):
         vol.All(vol.Coerce(str), vol.Clamp('horn-light-flash', 'light-flash', 'horn-flash'))
 })
+SERVICE_SCHEMAS = {
+    "start": SET_SERVICE_SCHEMA,
+    "stop": SET_SERVICE_SCHEMA,
+    "unlock": SERVICE_SCHEMA_ULOCK,
+    "lock": SET_SERVICE_SCHEMA,
+    "hlf": SERVICE_SCHEMA_HLF,
+}
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup(hass: HomeAssistant, config: Config) -> bool:
@@ -63,279 +82,140 @@ async def async_setup_entry(hass, config_entry) -> bool:
     """Set up LynkCo as config entry."""
     username = config_entry.data[CONF_USERNAME]
     password = config_entry.data[CONF_PASSWORD]
-    scan_interval = config_entry.options.get(CONF_SCAN_INTERVAL, 5)
-
-    _LOGGER.debug("Username: %s", username)
-
-
-    coordinator = LynkCoDataUpdateCoordinator(
-        hass, username, password, scan_interval
+    scan_interval = config_entry.options.get(CONF_SCAN_INTERVAL, MIN_SCAN_INTERVAL)
+    trip_idle_timeout = config_entry.options.get(CONF_TRIP_IDLE_TIMEOUT, DEFAULT_TRIP_IDLE_TIMEOUT)
+    trace_sample_rate = config_entry.options.get(CONF_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SAMPLE_RATE)
+    projection = parse_projection(
+        config_entry.options.get(CONF_TRACKER_ATTRIBUTES, DEFAULT_TRACKER_ATTRIBUTES)
     )
-    await coordinator.async_refresh()
 
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
+    client = LynkCoClient(limiter=async_get_limiter(hass, username))
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(config_entry.entry_id))
+    account = LynkCoAccount(
+        hass, client, username, password, scan_interval, store=store,
+        trip_idle_timeout=trip_idle_timeout,
+        extra_paths=projection or (), keep_raw=projection is None,
+        trace_sample_rate=trace_sample_rate
+    )
+    if await account.async_load_cache():
+        # Entities start from the cached snapshot, the cloud catches up in the background
+        hass.async_create_task(account.async_refresh_all())
+    else:
+        try:
+            ready = await account.async_setup()
+        except (LynkCoError, ClientError, asyncio.TimeoutError) as error:
+            _LOGGER.debug("Setup failed: %s", error)
+            ready = False
+        if not ready:
+            await account.async_close()
+            raise ConfigEntryNotReady
+
+    try:
+        polygons = parse_polygons(config_entry.options.get(CONF_GEOFENCES, ""))
+    except (ValueError, TypeError, AttributeError) as error:
+        _LOGGER.warning("Ignoring invalid geofences option: %s", error)
+        polygons = []
+    geofences = GeofenceEngine(hass, polygons)
+    geofences.async_start(account.coordinators.values())
 
     undo_listener = config_entry.add_update_listener(update_listener)
 
+    async def async_sync_roster(_now):
+        """Pick up cars added to or removed from the account."""
+        try:
+            added, removed = await account.async_sync_roster()
+        except (LynkCoError, ClientError, asyncio.TimeoutError) as error:
+            _LOGGER.debug("Vehicle list sync failed: %s", error)
+            return
+        if removed:
+            _LOGGER.debug("Removing %s vehicles", len(removed))
+            async_dispatcher_send(hass, SIGNAL_VEHICLES_REMOVED.format(config_entry.entry_id), removed)
+            device_registry = dr.async_get(hass)
+            for vin in removed:
+                geofences.async_unfollow(vin)
+                device = device_registry.async_get_device(identifiers={(DOMAIN, vin)})
+                if device is not None:
+                    device_registry.async_update_device(
+                        device.id, remove_config_entry_id=config_entry.entry_id)
+        if added:
+            _LOGGER.debug("Adding %s vehicles", len(added))
+            for vin in added:
+                geofences.async_follow(account.coordinators[vin])
+            async_dispatcher_send(hass, SIGNAL_VEHICLES_ADDED.format(config_entry.entry_id), added)
+
+    undo_roster_sync = async_track_time_interval(
+        hass, async_sync_roster, datetime.timedelta(seconds=ROSTER_SYNC_INTERVAL))
+
     hass.data[DOMAIN][config_entry.entry_id] = {
-        COORDINATOR: coordinator,
+        ACCOUNT: account,
+        GEOFENCES: geofences,
         UNDO_UPDATE_LISTENER: undo_listener,
+        UNDO_ROSTER_SYNC: undo_roster_sync,
     }
-    for component in LYNKCO_COMPONENT:
-        _LOGGER.debug("Loading %s", component)
-        hass.async_create_task(
-            hass.config_entries.async_forward_entry_setup(config_entry, component)
-        )
+    await hass.config_entries.async_forward_entry_setups(config_entry, LYNKCO_COMPONENT)
+    async_setup_services(hass)
+
+    return True
+
+
+def _accounts(hass):
+    return [data[ACCOUNT] for data in hass.data[DOMAIN].values()
+            if isinstance(data, dict) and ACCOUNT in data]
+
+
+@callback
+def async_setup_services(hass):
+    """Register the vehicle services once for all config entries.
+
+    Each call is sent through the account that owns the VIN of its entity.
+    """
+    if hass.services.has_service(DOMAIN, "start"):
+        return
 
     async def services(call):
         """Handle the service call."""
-        
         service = call.service
-        vin = call.data.get("entity_id")
+        entry = er.async_get(hass).async_get(call.data.get("entity_id"))
+        vin = entry.unique_id if entry is not None else None
+        account = next((a for a in _accounts(hass) if vin in a.coordinators), None)
+        if account is None:
+            raise LynkCoError("{} is not a Lynk&Co vehicle".format(call.data.get("entity_id")))
+        result = await account.commands.async_submit(vin, service, call.data.get("value"))
+        _LOGGER.debug("%s for %s: %s", service, vin, result)
 
-        data = {'service':service,
-                'entity_id':vin,
-                }
-        if service == "unlock":
-            data['value'] = call.data.get("value")
-        elif service == "hlf":
-            data['value'] = call.data.get("value")
+    for service, schema in SERVICE_SCHEMAS.items():
+        hass.services.async_register(DOMAIN, service, services, schema=schema)
 
-        await coordinator._send_command(data)
 
-    hass.services.async_register(DOMAIN, "start", services, schema=SET_SERVICE_SCHEMA)
-    hass.services.async_register(DOMAIN, "stop", services, schema=SET_SERVICE_SCHEMA)
-    hass.services.async_register(DOMAIN, "unlock", services, schema=SERVICE_SCHEMA_ULOCK)
-    hass.services.async_register(DOMAIN, "lock", services, schema=SET_SERVICE_SCHEMA)
-    hass.services.async_register(DOMAIN, "hlf", services, schema=SERVICE_SCHEMA_HLF)
-
-    return True
+@callback
+def async_unload_services(hass):
+    """Remove the vehicle services once no config entry is left."""
+    if _accounts(hass):
+        return
+    for service in SERVICE_SCHEMAS:
+        hass.services.async_remove(DOMAIN, service)
 
 
 async def async_unload_entry(hass, config_entry) -> bool:
     """Unload a config entry."""
-    unload_ok = all(
-        await asyncio.gather(
-            *[
-                hass.config_entries.async_forward_entry_unload(config_entry, component)
-                for component in LYNKCO_COMPONENT
-            ]
-        )
-    )
+    unload_ok = await hass.config_entries.async_unload_platforms(config_entry, LYNKCO_COMPONENT)
     hass.data[DOMAIN][config_entry.entry_id][UNDO_UPDATE_LISTENER]()
+    hass.data[DOMAIN][config_entry.entry_id][UNDO_ROSTER_SYNC]()
 
     username = config_entry.title
     if unload_ok:
-        hass.data[DOMAIN].pop(config_entry.entry_id)
+        data = hass.data[DOMAIN].pop(config_entry.entry_id)
+        data[GEOFENCES].async_stop()
+        await data[ACCOUNT].async_close()
+        async_unload_services(hass)
         _LOGGER.debug("Unloaded entry for %s", username)
         return True
     return False
 
+async def async_remove_entry(hass, config_entry) -> None:
+    """Remove the cached snapshot of a deleted config entry."""
+    await Store(hass, STORAGE_VERSION, STORAGE_KEY.format(config_entry.entry_id)).async_remove()
+
 async def update_listener(hass, config_entry):
     """Update when config_entry options update."""
     await hass.config_entries.async_reload(config_entry.entry_id)
-
-class LynkCoDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching XiaomiCloud data API."""
-    def __init__(self, hass, user, password, scan_interval):
-        """Initialize."""
-        self._username = user
-        self._password = password
-        self._cookies = {}
-        self._accessToken = None
-        self._userId = None
-        self._refreshToken = None
-        self._vehicles = None
-        self._vehicles_status = [ ]
-        self._scan_interval = scan_interval
-        self.login_result = False
-        self.service_data = {}
-        self.service = None
-
-        update_interval = (
-            datetime.timedelta(seconds=self._scan_interval)
-        )
-        _LOGGER.debug("Data will be update every %s", update_interval)
-
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=update_interval)
-
-    async def _send_command(self, data):
-        self.service_data = data
-        self.service = True
-        await self.async_refresh()
-
-    async def _send_RES_command(self, session):
-        flag = True
-        vin = self.hass.states.get(self.service_data['entity_id']).attributes['vin']
-        # session.cookie_jar.clear()
-        url = 'http://api.xchanger.cn/geelyTCAccess/tcservices/vehicle/telematics/{}'.format(vin)
-        headers ={
-                    "authorization" : self._accessToken,
-                    "X-APP-ID" : "xiaokanl",
-                    "X-OPERATOR-CODE":"LYNKCO",
-                    "Content-Type":"application/json",
-                    "Accept":"application/json;responseformat=3"
-                }
-        data = {"command":"",
-                "creator":"tc",
-                "serviceId":"",
-                "timestamp":int(time.time()),
-                "userId":self._userId
-                }
-        if self.service_data['service'] == 'start':
-            data['command'] = 'start'
-            data['serviceId'] = 'RES'
-        elif self.service_data['service'] == 'stop':
-            data['command'] = 'stop'
-            data['serviceId'] = 'RES'
-        elif self.service_data['service'] == 'lock':    
-            data['command'] = 'start'
-            data['serviceId'] = 'RDL'
-        elif self.service_data['service'] == 'unlock':    
-            data['command'] = 'start'
-            data['serviceId'] = 'RDU'
-            data['serviceParameters'] = [{
-                                        "key":"time.window",
-                                        "value":self.service_data['value']  
-                                        }]
-        elif self.service_data['service'] == 'hlf':    
-            data['command'] = 'start'
-            data['serviceId'] = 'RHL'
-            data['serviceParameters'] = [{
-                                        "key":"rhl",
-                                        "value":self.service_data['value']  
-                                        }]
-
-        _LOGGER.debug("_send_RES_command request: \nurl: %s\nheaders: %s\ndata: %s", url,headers,data)
-        r = await session.put(url,data=json.dumps(data), headers=headers )
-        _LOGGER.debug("_send_RES_command response: \nstatus: %s\nurl: %s\nheaders: %s\ncontent: %s", r.status,r.url,r.headers,await r.text('UTF-8'))
-        if r.status == 200:
-            # _LOGGER.debug("_send_RES_command_status: %s", json.loads(await r.text()))
-            _LOGGER.error("message: %s", json.loads(await r.text())['message'])
-            flag = True
-            self.login_result = True
-            self.service = False
-            self.service_data = None
-            return flag
-
-        flag = False
-        self.login_result = False
-        self.service = False
-        self.service_data = None
-        return flag
-
-    async def _login_lynkco(self, session):
-        url = 'https://api.xchanger.cn/api/v1/user/login'
-        headers = {
-            'Accept':'application/json;charset=UTF-8',
-            'X-APP-ID':'xiaokanl',
-            'Content-Type':'application/x-www-form-urlencoded'
-        }
-        auth_post_data = {
-                          'password': hashlib.md5(self._password.encode('utf-8')).hexdigest().lower(),
-                          'username': self._username}
-        try:
-            r = await session.post(url, headers=headers, data=auth_post_data)
-            if r.status == 200:
-                data = json.loads((await r.text()))
-                _LOGGER.debug("_login_lynkco_res: %s", data)
-                if data['resultMessage'] == 'Success':
-                    self._accessToken = data['accessToken']
-                    self._userId = data['userId']
-                    self._refreshToken = data['refreshToken']
-                    self.login_result = True
-                    return True
-                else:
-                    return False
-            else:
-                return False
-        except BaseException as e:
-            _LOGGER.warning(e.args[0])
-            return False
-
-    async def _get_vehicles(self, session):
-        url = 'https://api.xchanger.cn/device_platform/user/vehicle?id={}'.format(self._userId)
-        headers = {
-            'Accept':'application/json;charset=UTF-8',
-            'X-APP-ID':'xiaokanl',
-            'x-operator-code':'LYNKCO',
-            'authorization':self._accessToken
-        }
-        try:
-            r = await session.get(url, headers=headers)
-            if r.status == 200:
-                data = json.loads(await r.text())
-                self._vehicles = data['list']
-                # _LOGGER.debug("_get_vehicles: %s", self._vehicles)
-                return True
-            else:
-                return False
-        except BaseException as e:
-            _LOGGER.warning(e.args[0])
-            return False
-
-    async def _get_vehicle_status(self, session):
-        headers = {
-            'Accept':'application/json;charset=UTF-8',
-            'x-operator-code':'LYNKCO',
-            'authorization':self._accessToken
-        }
-        redata = []
-        for item in self._vehicles:
-            url = "http://api.xchanger.cn/geelyTCAccess/tcservices/vehicle/status/{}?userId={}&latest=false&target=more%2Cbasic".format(
-                item['vin'], 
-                self._userId)
-            # _LOGGER.debug("_get_vehicle_status_url:%s \n %s",self._accessToken, url)
-            try:
-                r = await session.get(url, headers=headers)
-                # _LOGGER.debug("_get_vehicle_status response: \nstatus: %s\nurl: %s\nheaders: %s\ncontent: %s", r.status,r.url,r.headers,await r.text('UTF-8'))
-                if r.status == 200:
-                    data = json.loads(await r.text())['data']
-                    data['plateNo']=item['plateNo'] 
-                    data['seriesName']=item['seriesName']
-                    data['colorCode']=item['colorCode']
-                    data['tboxPlatform']=item['tboxPlatform']
-                    # _LOGGER.debug("_get_vehicle_status: %s", data)
-                    redata.append(data)
-                else:
-                    self.login_result = False
-                    return False
-            except BaseException as e:
-                _LOGGER.debug(e.args[0])
-                return False
-        return redata
-
-    @asyncio.coroutine
-    async def _async_update_data(self):
-        """Update data via library."""
-        try:
-            session = async_get_clientsession(self.hass)
-            session.cookie_jar.clear()
-            if self.login_result is True:
-                # _LOGGER.debug('login_result: %s',self.login_result)
-                if self.service:
-                    tmp = await self._send_RES_command(session)
-                tmp = await self._get_vehicle_status(session)
-            else:
-                tmp = await self._login_lynkco(session)
-                if not tmp:
-                    _LOGGER.debug('Login failed')
-                else:
-                    tmp = await self._get_vehicles(session)
-                    _LOGGER.debug('_get_vehicles: %s',tmp)
-                    if not tmp:
-                        _LOGGER.debug('Get vehicles failed')
-                    else:
-                        if self.service:
-                            tmp = await self._send_RES_command(session)
-                        tmp = await self._get_vehicle_status(session)
-                        if not tmp:
-                            _LOGGER.debug('Get status failed')
-
-        except (
-            ClientConnectorError
-        ) as error:
-            raise UpdateFailed(error)
-        # _LOGGER.debug("Data Coordinator: %s", tmp)
-        return tmp
@@ -0,0 +1,98 @@
+"""Accessors compiled once from SENSOR_TYPES and BINARY_SENSOR_TYPES."""
+from homeassistant.const import ATTR_DEVICE_CLASS
+
+from .changes import status_path
+from .const import (
+    ATTR_FRIENDLY_NAME,
+    ATTR_ICON,
+    ATTR_LABEL,
+    ATTR_UNIT_METRIC,
+    BINARY_SENSOR_TYPES,
+    OPTIONAL_SENSORS,
+    SENSOR_TYPES,
+)
+from .snapshot import BASE_INDEX
+
+
+def _getter(path):
+    # A car whose first refresh failed has no snapshot yet; Home Assistant
+    # still reads the icon of its unavailable entities
+    index = BASE_INDEX[path]
+    return lambda snapshot: None if snapshot is None else snapshot.values[index]
+
+
+def _identity(value):
+    return value
+
+
+def _sensor_transform(kind):
+    if kind == 'ecuWarningMessages':
+        return len
+    if kind == 'mainBatteryStatus':
+        return lambda value: value['stateOfCharge']
+    return _identity
+
+
+def _binary_transform(kind):
+    if 'seatBeltStatus' in kind:
+        return lambda value: value == False  # noqa: E712
+    if 'tyrePreWarning' in kind:
+        return lambda value: value == 1
+    if 'LockStatus' in kind:
+        return lambda value: value == 0
+    return _identity
+
+
+def _icon_resolver(kind, icon):
+    if kind == 'engineStatus':
+        return lambda value: 'mdi:engine-off' if value == 'ENGINE_OFF' else icon
+    if 'winStatus' in kind:
+        icons = {0: 'mdi:window-shutter-alert', 1: 'mdi:window-shutter-open'}
+        return lambda value: icons.get(value, icon)
+    if kind == 'sunroofOpenStatus':
+        return lambda value: 'mdi:window-open' if value == 0 else icon
+    return None
+
+
+class Accessor:
+    """Resolved path, transform, icon and unit of one entity kind."""
+
+    __slots__ = (
+        'kind', 'path', 'label', 'friendly_name', 'device_class', 'unit',
+        'icon_default', 'enabled_default', 'raw', '_transform', '_icon',
+    )
+
+    def __init__(self, kind, description, transform):
+        """Initialize."""
+        self.kind = kind
+        self.path = status_path(kind, description)
+        self.label = description[ATTR_LABEL]
+        self.friendly_name = description[ATTR_FRIENDLY_NAME]
+        self.device_class = description[ATTR_DEVICE_CLASS]
+        self.unit = description.get(ATTR_UNIT_METRIC)
+        self.icon_default = description[ATTR_ICON]
+        self.enabled_default = kind not in OPTIONAL_SENSORS
+        self.raw = _getter(self.path)
+        self._transform = transform
+        self._icon = _icon_resolver(kind, self.icon_default)
+
+    def value(self, snapshot):
+        """Return the entity state from a VehicleSnapshot."""
+        value = self.raw(snapshot)
+        return None if value is None else self._transform(value)
+
+    def icon(self, snapshot):
+        """Return the icon for a VehicleSnapshot."""
+        if self._icon is None:
+            return self.icon_default
+        return self._icon(self.raw(snapshot))
+
+
+SENSOR_ACCESSORS = {
+    kind: Accessor(kind, description, _sensor_transform(kind))
+    for kind, description in SENSOR_TYPES.items()
+}
+BINARY_SENSOR_ACCESSORS = {
+    kind: Accessor(kind, description, _binary_transform(kind))
+    for kind, description in BINARY_SENSOR_TYPES.items()
+}
@@ -0,0 +1,197 @@
+"""HTTP client for the Lynk&Co cloud."""
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+from .const import (
+    API_BASE_URL,
+    CONNECTION_LIMIT,
+    DNS_CACHE_TTL,
+    KEEPALIVE_TIMEOUT,
+    RATE_LIMIT_RETRIES,
+    RATE_LIMIT_STATUS,
+    REQUEST_TIMEOUT,
+)
+from .breaker import CircuitBreaker
+from .exceptions import LynkCoApiError, LynkCoCircuitOpenError
+from .metrics import STATUS_CIRCUIT_OPEN, STATUS_ERROR, MetricsRegistry, request_size
+from .ratelimit import PRIORITY_POLL, parse_retry_after
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ApiResponse:
+    """Status, headers and decoded JSON body of one request."""
+
+    __slots__ = ('status', 'headers', 'data', 'size')
+
+    def __init__(self, status, headers, data, size):
+        """Initialize."""
+        self.status = status
+        self.headers = headers
+        self.data = data
+        self.size = size
+
+
+class LynkCoClient:
+    """Integration-owned session with its own cookie jar and pooled connector."""
+
+    def __init__(self, base_url=API_BASE_URL, limiter=None):
+        """Initialize."""
+        self.base_url = base_url
+        self.limiter = limiter
+        self._session = None
+        self.payload_stats = {}
+        self.metrics = MetricsRegistry()
+        self.breakers = {}
+        self._breaker_listeners = []
+
+    @property
+    def session(self):
+        """Return the session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.CookieJar(),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            )
+        return self._session
+
+    def breaker(self, endpoint, vin=None):
+        """Return the circuit breaker of an endpoint, creating it on first use.
+
+        Requests for one car get a breaker of their own, so a car whose
+        requests keep failing does not hold back the others.
+        """
+        name = endpoint if vin is None else "{} {}".format(endpoint, vin)
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(name, self._breaker_changed)
+        return breaker
+
+    def breakers_for(self, vin=None):
+        """Return the shared breakers, or those of one car, keyed by endpoint."""
+        breakers = {}
+        for name, breaker in self.breakers.items():
+            endpoint, _, breaker_vin = name.partition(" ")
+            if (breaker_vin or None) == vin:
+                breakers[endpoint] = breaker
+        return breakers
+
+    def forget_vehicle(self, vin):
+        """Drop the breakers and request metrics of a car that left the account."""
+        suffix = " {}".format(vin)
+        names = [name for name in self.breakers if name.endswith(suffix)]
+        for name in names:
+            del self.breakers[name]
+        self.metrics.vehicles.pop(vin, None)
+        if names:
+            self._breaker_changed()
+
+    def add_breaker_listener(self, listener):
+        """Call listener whenever a breaker changes state; return a remover."""
+        self._breaker_listeners.append(listener)
+        return lambda: self._breaker_listeners.remove(listener)
+
+    def _breaker_changed(self):
+        for listener in list(self._breaker_listeners):
+            listener()
+
+    def url(self, path, *args):
+        """Return the absolute URL of an API path."""
+        return self.base_url + path.format(*args)
+
+    async def async_request(self, method, endpoint, url, priority=PRIORITY_POLL, vin=None, **kwargs):
+        """Send a request, read the body once and decode it from bytes.
+
+        Requests to an endpoint whose circuit breaker is open fail at once
+        with LynkCoCircuitOpenError. With a limiter the request first waits
+        for a token; a 429 pauses the limiter for Retry-After and is retried
+        up to RATE_LIMIT_RETRIES times. A 200 response that is not JSON raises
+        LynkCoApiError; bodies of other responses that are not JSON decode
+        to None. Every attempt is recorded in metrics under the endpoint
+        and, if given, the VIN.
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            if attempt:
+                self.metrics.record_retry(endpoint, vin)
+            status, headers, body = await self._async_send(
+                method, endpoint, url, priority, vin, **kwargs)
+            if status != RATE_LIMIT_STATUS or self.limiter is None:
+                break
+            self.limiter.async_throttled(parse_retry_after(headers.get('Retry-After')))
+        started = time.perf_counter()
+        try:
+            data = json_loads(body) if body else None
+        except ValueError as e:
+            if status == 200:
+                raise LynkCoApiError("Invalid {} response: {}".format(endpoint, e), status) from e
+            data = None
+        stats = self.payload_stats.setdefault(
+            endpoint, {'responses': 0, 'bytes': 0, 'max_bytes': 0, 'decode_ms': 0.0})
+        stats['responses'] += 1
+        stats['bytes'] += len(body)
+        stats['max_bytes'] = max(stats['max_bytes'], len(body))
+        stats['decode_ms'] += (time.perf_counter() - started) * 1000
+        return ApiResponse(status, headers, data, len(body))
+
+    async def _async_send(self, method, endpoint, url, priority, vin, **kwargs):
+        breaker = self.breaker(endpoint, vin)
+        bytes_out = request_size(kwargs)
+        try:
+            probe = breaker.before_request()
+        except LynkCoCircuitOpenError:
+            self.metrics.record(endpoint, vin, STATUS_CIRCUIT_OPEN)
+            raise
+        started = None
+        try:
+            if self.limiter is not None:
+                waited = await self.limiter.async_acquire(priority)
+                if waited:
+                    _LOGGER.debug("%s request waited %.2fs for the rate limiter", endpoint, waited)
+            # Latency excludes the rate limiter wait, which the limiter reports itself
+            started = time.perf_counter()
+            async with self.session.request(method, url, **kwargs) as r:
+                body = await r.read()
+                status = r.status
+                headers = r.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record_failure(probe)
+            latency = None if started is None else (time.perf_counter() - started) * 1000
+            self.metrics.record(endpoint, vin, STATUS_ERROR, latency, bytes_out)
+            raise
+        except asyncio.CancelledError:
+            # A cancelled probe must not keep the breaker half-open forever
+            if probe:
+                breaker.release()
+            raise
+        if status >= 500:
+            breaker.record_failure(probe)
+        elif status != RATE_LIMIT_STATUS:
+            breaker.record_success()
+        elif probe:
+            breaker.release()
+        self.metrics.record(
+            endpoint, vin, status, (time.perf_counter() - started) * 1000, bytes_out, len(body))
+        return status, headers, body
+
+    async def async_close(self):
+        """Close the session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,134 @@
+"""Token lifecycle for the Lynk&Co cloud."""
+import asyncio
+import hashlib
+import logging
+import time
+
+from aiohttp import ClientError
+
+from .const import (
+    API_LOGIN,
+    API_TOKEN_REFRESH,
+    AUTH_FAILURE_STATUS,
+    TOKEN_LIFETIME,
+    TOKEN_REFRESH_MARGIN,
+)
+from .exceptions import LynkCoApiError, LynkCoAuthError
+from .ratelimit import PRIORITY_COMMAND
+
+_LOGGER = logging.getLogger(__name__)
+
+class LynkCoAuth:
+    """Keep an access token valid, preferring the refresh token over a full login."""
+
+    def __init__(self, client, username, password):
+        """Initialize."""
+        self._client = client
+        self._username = username
+        self._password_hash = hashlib.md5(password.encode('utf-8')).hexdigest().lower()
+        self.access_token = None
+        self.user_id = None
+        self._refresh_token = None
+        self._expires_at = 0
+        self._refresh_supported = True
+        self._lock = asyncio.Lock()
+
+    @property
+    def headers(self):
+        """Return the common request headers."""
+        return {
+            'Accept':'application/json;charset=UTF-8',
+            'X-APP-ID':'xiaokanl',
+            'Content-Type':'application/x-www-form-urlencoded'
+        }
+
+    def invalidate(self):
+        """Mark the access token as rejected so the next call renews it."""
+        self._expires_at = 0
+
+    async def async_get_token(self):
+        """Return a valid access token, renewing it ahead of expiry.
+
+        Concurrent callers wait for a single renewal instead of each logging in.
+        """
+        async with self._lock:
+            if self.access_token is None:
+                await self.async_login()
+            elif time.monotonic() >= self._expires_at - TOKEN_REFRESH_MARGIN:
+                await self._async_renew()
+        return self.access_token
+
+    async def _async_renew(self):
+        """Renew the access token with the refresh token, or log in again.
+
+        A rejected refresh token falls back to a login. A server error,
+        timeout or open breaker keeps the current token while it is still
+        valid, so the renewal is retried on the next call; once it has
+        expired, a login is tried instead. Any other answer means the backend
+        does not offer the refresh endpoint, so it is not tried again and
+        every later renewal is a login.
+        """
+        if self._refresh_supported:
+            try:
+                await self.async_refresh()
+                return
+            except LynkCoAuthError:
+                _LOGGER.debug("Refresh token rejected, logging in again")
+            except LynkCoApiError as e:
+                if e.status is None or e.status >= 500:
+                    if time.monotonic() < self._expires_at:
+                        _LOGGER.debug("Token refresh failed, keeping the current token: %s", e)
+                        return
+                    _LOGGER.debug("Token refresh failed, logging in again: %s", e)
+                else:
+                    _LOGGER.debug("Token refresh unsupported (%s), logging in from now on", e.status)
+                    self._refresh_supported = False
+        await self.async_login()
+
+    async def async_login(self):
+        """Log in with username and password."""
+        data = await self._async_post('login', API_LOGIN, {
+            'password': self._password_hash,
+            'username': self._username}, ('userId', 'accessToken'))
+        self.user_id = data['userId']
+        self._set_tokens(data)
+
+    async def async_refresh(self):
+        """Exchange the refresh token for a new access token."""
+        if self._refresh_token is None:
+            raise LynkCoAuthError("No refresh token")
+        data = await self._async_post('token_refresh', API_TOKEN_REFRESH, {
+            'refreshToken': self._refresh_token,
+            'userId': self.user_id}, ('accessToken',))
+        self._set_tokens(data)
+
+    def _set_tokens(self, data):
+        self.access_token = data['accessToken']
+        self._refresh_token = data.get('refreshToken', self._refresh_token)
+        try:
+            lifetime = int(data.get('expiresIn') or TOKEN_LIFETIME)
+        except (TypeError, ValueError):
+            lifetime = TOKEN_LIFETIME
+        self._expires_at = time.monotonic() + lifetime
+
+    async def _async_post(self, endpoint, path, payload, required):
+        """Post to an auth endpoint; return the body, which holds the required keys."""
+        try:
+            r = await self._client.async_request(
+                'POST', endpoint, self._client.url(path), priority=PRIORITY_COMMAND,
+                headers=self.headers, data=payload)
+            if r.status in AUTH_FAILURE_STATUS:
+                raise LynkCoAuthError("Authentication rejected: {}".format(r.status))
+            if r.status != 200:
+                raise LynkCoApiError("Authentication failed: {}".format(r.status), r.status)
+            data = r.data
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise LynkCoApiError("Authentication failed: {}".format(e)) from e
+        if not isinstance(data, dict):
+            raise LynkCoApiError("Authentication failed: invalid response")
+        if data.get('resultMessage') != 'Success':
+            raise LynkCoAuthError("Authentication rejected: {}".format(data.get('resultMessage')))
+        missing = [key for key in required if not data.get(key)]
+        if missing:
+            raise LynkCoApiError("Authentication failed: no {}".format(", ".join(missing)))
+        return data
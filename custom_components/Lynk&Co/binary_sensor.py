@@ -1,26 +1,12 @@
 """Support for the Colorfulclouds service."""
 import logging
-import string
-from homeassistant.components.binary_sensor import BinarySensorEntity
-from homeassistant.const import (
-    ATTR_ATTRIBUTION,
-    ATTR_DEVICE_CLASS,
-    CONF_NAME,
-    DEVICE_CLASS_TEMPERATURE,
-)
-from homeassistant.helpers.entity import Entity
+from homeassistant.components.binary_sensor import DOMAIN as BINARY_SENSOR_DOMAIN, BinarySensorEntity
 
+from .accessors import BINARY_SENSOR_ACCESSORS
+from .roster import EntitySpec, async_track_vehicles
 from .const import (
-    ATTR_ICON,
-    ATTR_LABEL,
-    ATTR_VEHICLE_STATUS,
-    ATTR_ADD_VEHICLE_STATUS,
-    ATTR_FRIENDLY_NAME,
-    COORDINATOR,
+    ACCOUNT,
     DOMAIN,
-    NAME,
-    OPTIONAL_SENSORS,
-    BINARY_SENSOR_TYPES,
 )
 
 PARALLEL_UPDATES = 1
@@ -30,13 +16,17 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add Colorfulclouds entities from a config_entry."""
 
-    coordinator = hass.data[DOMAIN][config_entry.entry_id][COORDINATOR]
+    account = hass.data[DOMAIN][config_entry.entry_id][ACCOUNT]
 
-    binary_sensor = []
-    for i in range(len(coordinator.data)):
-        for sensor in BINARY_SENSOR_TYPES:
-            binary_sensor.append(LynkCoBinarySensor(i, sensor, coordinator))
-    async_add_entities(binary_sensor, False)
+    specs = [
+        EntitySpec(
+            kind, accessor.label,
+            lambda vin, coordinator, kind=kind: LynkCoBinarySensor(vin, kind, coordinator),
+            accessor.enabled_default, (accessor.path,),
+        )
+        for kind, accessor in BINARY_SENSOR_ACCESSORS.items()
+    ]
+    async_track_vehicles(hass, config_entry, account, async_add_entities, BINARY_SENSOR_DOMAIN, specs)
 
 
 class LynkCoBinarySensor(BinarySensorEntity):
@@ -44,18 +34,19 @@ class LynkCoBinarySensor(BinarySensorEntity):
 
     def __init__(self, vin, kind, coordinator):
         """Initialize."""
-        self._name = coordinator.data[vin]["plateNo"]
+        self._name = coordinator.account.vehicles[vin]["plateNo"]
         self.kind = kind
         self.vin = vin
         self.coordinator = coordinator
-        self._unique_id = coordinator.data[vin]["result"]['vin']
+        self._unique_id = vin
+        self._accessor = BINARY_SENSOR_ACCESSORS[kind]
         self._device_class = None
-        self._attrs = {"friendly_name_cn":BINARY_SENSOR_TYPES[self.kind][ATTR_FRIENDLY_NAME]}
+        self._attrs = {"friendly_name_cn":self._accessor.friendly_name}
 
     @property
     def name(self):
         """Return the name."""
-        return BINARY_SENSOR_TYPES[self.kind][ATTR_LABEL]
+        return self._accessor.label
 
     @property
     def unique_id(self):
@@ -69,7 +60,6 @@ class LynkCoBinarySensor(BinarySensorEntity):
             "identifiers": {(DOMAIN, self._unique_id)},
             "name": self._name,
             "manufacturer": "Lynk&Co",
-            "entry_type": "device",
             "model": self._name
         }
 
@@ -81,58 +71,46 @@ class LynkCoBinarySensor(BinarySensorEntity):
     @property
     def available(self):
         """Return True if entity is available."""
-        return self.coordinator.last_update_success
+        return self.coordinator.available
+
+    @property
+    def assumed_state(self):
+        """Return True while showing the cached snapshot."""
+        return self.coordinator.stale
 
     @property
     def is_on(self):
         """Return the state."""
-        state =  self.coordinator.data[self.vin]["vehicleStatus"][BINARY_SENSOR_TYPES[self.kind][ATTR_VEHICLE_STATUS]][BINARY_SENSOR_TYPES[self.kind][ATTR_ADD_VEHICLE_STATUS]][self.kind]
-        if self.kind.find('seatBeltStatus') >=0:
-            return state==False
-        if self.kind.find('tyrePreWarning') >=0:
-            return state==1
-        if self.kind.find('LockStatus') >=0:
-            return state==0
-        return state
+        return self._accessor.value(self.coordinator.data)
 
     @property
     def icon(self):
         """Return the icon."""
-        icon = BINARY_SENSOR_TYPES[self.kind][ATTR_ICON]
-        if self.kind == 'engineStatus':
-            if self.coordinator.data[self.vin]["vehicleStatus"][BINARY_SENSOR_TYPES[self.kind][ATTR_VEHICLE_STATUS]][self.kind]=='ENGINE_OFF':
-                icon = 'mdi:engine-off'
-        if self.kind.find('winStatus') >=0:
-            if self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['climateStatus'][self.kind]==0:
-                icon = 'mdi:window-shutter-alert'
-            elif self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['climateStatus'][self.kind]==1:
-                icon = 'mdi:window-shutter-open'
-        if self.kind == 'sunroofOpenStatus':
-            if self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['climateStatus'][self.kind]==0:
-                icon = 'mdi:window-open'
-        return icon
+        return self._accessor.icon(self.coordinator.data)
 
     @property
     def device_class(self):
         """Return the device_class."""
-        return BINARY_SENSOR_TYPES[self.kind][ATTR_DEVICE_CLASS]
+        return self._accessor.device_class
 
 
     @property
-    def device_state_attributes(self):
+    def extra_state_attributes(self):
         """Return the state attributes."""
-        self._attrs["friendly_name"] = BINARY_SENSOR_TYPES[self.kind][ATTR_FRIENDLY_NAME]
+        self._attrs["friendly_name"] = self._accessor.friendly_name
         return self._attrs
 
     @property
     def entity_registry_enabled_default(self):
         """Return if the entity should be enabled when first added to the entity registry."""
-        return bool(self.kind not in OPTIONAL_SENSORS)
+        return self._accessor.enabled_default
 
     async def async_added_to_hass(self):
         """Connect to dispatcher listening for entity data notifications."""
         self.async_on_remove(
-            self.coordinator.async_add_listener(self.async_write_ha_state)
+            self.coordinator.async_add_field_listener(
+                (self._accessor.path,), self.async_write_ha_state
+            )
         )
 
     async def async_update(self):
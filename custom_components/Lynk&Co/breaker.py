@@ -0,0 +1,102 @@
+"""Circuit breakers for the Lynk&Co cloud endpoints."""
+import logging
+import random
+import time
+
+from .const import (
+    BREAKER_BASE_DELAY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MAX_DELAY,
+)
+from .exceptions import LynkCoCircuitOpenError
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# Worst first, for summarising several breakers in one state
+STATE_ORDER = (STATE_OPEN, STATE_HALF_OPEN, STATE_CLOSED)
+
+
+class CircuitBreaker:
+    """Closed, open and half-open states for one endpoint.
+
+    After BREAKER_FAILURE_THRESHOLD consecutive failures the breaker opens and
+    rejects requests without sending them. The open period doubles with every
+    trip up to BREAKER_MAX_DELAY, with full jitter so several breakers do not
+    retry in step. Once it ends, a single probe request is let through; its
+    result closes the breaker or opens it again. Failures of requests sent
+    before the breaker opened are ignored.
+    """
+
+    def __init__(self, endpoint, on_change=None):
+        """Initialize."""
+        self.endpoint = endpoint
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self._probing = False
+        self._on_change = on_change
+
+    def before_request(self):
+        """Return True if this request is the half-open probe; raise while open."""
+        if self.state == STATE_CLOSED:
+            return False
+        if self.state == STATE_OPEN and time.monotonic() >= self.retry_at:
+            self._set_state(STATE_HALF_OPEN)
+        if self.state == STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        raise LynkCoCircuitOpenError(
+            "{} is unavailable, retrying in {:.0f}s".format(
+                self.endpoint, max(0.0, self.retry_at - time.monotonic())))
+
+    def record_success(self):
+        """Close the breaker after a healthy response."""
+        self._probing = False
+        self.failures = 0
+        if self.state != STATE_CLOSED:
+            self.trips = 0
+            _LOGGER.debug("%s recovered, closing circuit", self.endpoint)
+            self._set_state(STATE_CLOSED)
+
+    def record_failure(self, probe=False):
+        """Count a failure and open the breaker once the threshold is reached.
+
+        probe is the value before_request returned for the failed request.
+        """
+        if self.state != STATE_CLOSED and not probe:
+            # Sent before the breaker opened; the trip already accounts for it
+            return
+        self.failures += 1
+        if probe or self.failures >= BREAKER_FAILURE_THRESHOLD:
+            self._probing = False
+            self.trips += 1
+            ceiling = min(BREAKER_MAX_DELAY, BREAKER_BASE_DELAY * 2 ** min(self.trips - 1, 16))
+            delay = random.uniform(ceiling / 2, ceiling)
+            self.retry_at = time.monotonic() + delay
+            _LOGGER.debug("%s failing, opening circuit for %.0fs", self.endpoint, delay)
+            self._set_state(STATE_OPEN)
+
+    def release(self):
+        """Give up the probe slot when the probe ended without a result."""
+        self._probing = False
+
+    def as_dict(self):
+        """Return the breaker state for diagnostics and sensor attributes."""
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'trips': self.trips,
+            'retry_in': round(max(0.0, self.retry_at - time.monotonic()), 1)
+            if self.state != STATE_CLOSED else 0,
+        }
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            if self._on_change is not None:
+                self._on_change()
@@ -0,0 +1,17 @@
+"""Status paths shared by entities and field-level change dispatch."""
+from .const import ATTR_ADD_VEHICLE_STATUS, ATTR_VEHICLE_STATUS
+
+
+def status_path(kind, description):
+    """Return the path of a SENSOR_TYPES/BINARY_SENSOR_TYPES kind in vehicleStatus."""
+    group = description[ATTR_VEHICLE_STATUS]
+    sub = description.get(ATTR_ADD_VEHICLE_STATUS)
+    if group == 'additionalVehicleStatus' and sub != kind:
+        return (group, sub, kind)
+    return (group, kind)
+
+
+def ancestors(path):
+    """Yield the path and every prefix of it, down to the root ()."""
+    for i in range(len(path), -1, -1):
+        yield path[:i]
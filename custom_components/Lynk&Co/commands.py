@@ -0,0 +1,155 @@
+"""Per-vehicle command queues for Lynk&Co remote services."""
+import asyncio
+import collections
+import logging
+import time
+
+from .const import CONFIRM_POLL_DELAYS, EVENT_COMMAND, EVENT_COMMAND_CONFIRMED
+from .scheduler import ENGINE_STATUS_PATH, LOCK_STATUS_PATHS, is_locked
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandDispatcher:
+    """Run commands in order for each VIN and concurrently across VINs."""
+
+    def __init__(self, hass, send_command):
+        """Initialize."""
+        self._hass = hass
+        self._send_command = send_command
+        self._queues = {}
+        self._workers = {}
+
+    async def async_submit(self, vin, service, value=None):
+        """Queue a command and wait for its result."""
+        queue = self._queues.get(vin)
+        if queue is None:
+            queue = self._queues[vin] = asyncio.Queue()
+            self._workers[vin] = self._hass.async_create_task(self._async_worker(vin, queue))
+        future = self._hass.loop.create_future()
+        await queue.put((service, value, future))
+        return await future
+
+    async def _async_worker(self, vin, queue):
+        while True:
+            service, value, future = await queue.get()
+            event = {"vin": vin, "service": service}
+            try:
+                result = await self._send_command(vin, service, value)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning("Command %s for %s failed: %s", service, vin, err)
+                event.update(success=False, error=str(err))
+                if not future.done():
+                    future.set_exception(err)
+            else:
+                event.update(success=True, result=result)
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                queue.task_done()
+            self._hass.bus.async_fire(EVENT_COMMAND, event)
+
+    async def async_shutdown(self):
+        """Cancel the workers and any queued commands."""
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        for queue in self._queues.values():
+            while not queue.empty():
+                queue.get_nowait()[2].cancel()
+        self._queues = {}
+        self._workers = {}
+
+
+def _engine_running(snapshot):
+    return snapshot.get(ENGINE_STATUS_PATH, 'ENGINE_OFF') != 'ENGINE_OFF'
+
+
+def _any_unlocked(snapshot):
+    return any(snapshot.get(path) == 0 for path in LOCK_STATUS_PATHS)
+
+
+CONFIRMATIONS = {
+    'start': _engine_running,
+    'stop': lambda status: not _engine_running(status),
+    'lock': is_locked,
+    'unlock': _any_unlocked,
+}
+
+
+class CompletionTracker:
+    """Burst-poll one vehicle until the status reflects an accepted command."""
+
+    def __init__(self, hass, get_status, refresh_vehicle):
+        """Initialize."""
+        self._hass = hass
+        self._get_status = get_status
+        self._refresh_vehicle = refresh_vehicle
+        self._tasks = {}
+        self.latencies = collections.deque(maxlen=50)
+
+    def async_track(self, vin, service, started, before=None):
+        """Start watching a command, replacing any watch on the same VIN.
+
+        before is the status from before the command was sent; a car that
+        was already in the target state has nothing to confirm and is not
+        watched.
+        """
+        confirmed = CONFIRMATIONS.get(service)
+        if confirmed is None:
+            return
+        task = self._tasks.pop(vin, None)
+        if task is not None:
+            task.cancel()
+        if before is not None and confirmed(before):
+            _LOGGER.debug("%s for %s: already in the target state", service, vin)
+            return
+        self._tasks[vin] = self._hass.async_create_task(
+            self._async_watch(vin, service, confirmed, started)
+        )
+
+    async def _async_watch(self, vin, service, confirmed, started):
+        event = {"vin": vin, "service": service, "confirmed": False}
+        try:
+            for delay in CONFIRM_POLL_DELAYS:
+                await asyncio.sleep(delay)
+                # A regular poll may already have picked up the change
+                data = self._get_status(vin)
+                if data is not None and confirmed(data):
+                    break
+                data = await self._refresh_vehicle(vin)
+                if data is not None and confirmed(data):
+                    break
+            else:
+                _LOGGER.debug("%s for %s was not confirmed", service, vin)
+                self._hass.bus.async_fire(EVENT_COMMAND_CONFIRMED, event)
+                return
+        finally:
+            if self._tasks.get(vin) is asyncio.current_task():
+                del self._tasks[vin]
+        latency = round(time.monotonic() - started, 1)
+        self.latencies.append((service, latency))
+        _LOGGER.debug("%s for %s confirmed after %ss", service, vin, latency)
+        event.update(confirmed=True, latency=latency)
+        self._hass.bus.async_fire(EVENT_COMMAND_CONFIRMED, event)
+
+    def as_dict(self):
+        """Return the running watches and recent confirmation latencies for diagnostics."""
+        return {
+            'watching': len(self._tasks),
+            'latencies': [
+                {'service': service, 'latency': latency}
+                for service, latency in self.latencies
+            ],
+        }
+
+    async def async_shutdown(self):
+        """Stop all running watches."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
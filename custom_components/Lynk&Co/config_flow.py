@@ -1,8 +1,6 @@
 
 """Adds config flow for Colorfulclouds."""
 import logging
-import json
-import hashlib
 import voluptuous as vol
 from urllib import parse
 from collections import OrderedDict
@@ -10,7 +8,6 @@ from homeassistant.helpers import aiohttp_client, config_validation as cv
 from homeassistant.const import CONF_NAME
 
 from homeassistant import config_entries, core, exceptions
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.core import callback
 from homeassistant.const import (
     CONF_PASSWORD,
@@ -18,9 +15,22 @@ from homeassistant.const import (
     CONF_USERNAME,
 )
 
+from .api import LynkCoClient
+from .auth import LynkCoAuth
 from .const import (
-    DOMAIN
+    CONF_GEOFENCES,
+    CONF_TRACE_SAMPLE_RATE,
+    CONF_TRACKER_ATTRIBUTES,
+    CONF_TRACKER_MIN_DISTANCE,
+    CONF_TRIP_IDLE_TIMEOUT,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    DEFAULT_TRACKER_ATTRIBUTES,
+    DEFAULT_TRACKER_MIN_DISTANCE,
+    DEFAULT_TRIP_IDLE_TIMEOUT,
+    DOMAIN,
+    MIN_SCAN_INTERVAL,
 )
+from .exceptions import LynkCoError
 
 
 
@@ -52,10 +62,8 @@ class LynkcolowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             # If it is not, continue with communication test
             self._user = user_input[CONF_USERNAME]
             self._password = user_input[CONF_PASSWORD]
-            session = async_get_clientsession(self.hass)  
             try:
-                session.cookie_jar.clear()
-                tmp = await self._login_lynkco(session)
+                tmp = await self._login_lynkco()
                 if not tmp:
                     _LOGGER.warning("login lynkco Failed")
                     self._errors["base"] = "login_url_failed"
@@ -70,27 +78,17 @@ class LynkcolowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 return False
             return await self._show_config_form(user_input)
         return await self._show_config_form(user_input)
-    async def _login_lynkco(self, session):
-        url = 'https://api.xchanger.cn/api/v1/user/login'
-        self._headers['Content-Type'] = 'application/x-www-form-urlencoded'
-        self._headers['Accept'] = 'application/json;charset=UTF-8'
-        self._headers['X-APP-ID'] = 'xiaokanl'
-        auth_post_data = {
-                          'password': hashlib.md5(self._password.encode('utf-8')).hexdigest().lower(),
-                          'username': self._user}
+    async def _login_lynkco(self):
+        client = LynkCoClient()
+        auth = LynkCoAuth(client, self._user, self._password)
         try:
-            r = await session.post(url, headers=self._headers, data=auth_post_data)
-            if r.status == 200:
-                data = json.loads((await r.text()))
-                _LOGGER.debug("_login_lynkco_res: %s", data)
-                if data['resultMessage'] == 'Success':
-                    self._accessToken = data['accessToken']
-                    self._userId = data['userId']
-                    self._refreshToken = data['refreshToken']
-                    return True
-        except BaseException as e:
-            _LOGGER.warning(e.args[0])
+            await auth.async_login()
+        except LynkCoError as e:
+            _LOGGER.warning(e)
             return False
+        finally:
+            await client.async_close()
+        return True
 
     async def _show_config_form(self, user_input):
         data_schema = OrderedDict()
@@ -138,8 +136,28 @@ class LynkcoOptionsFlow(config_entries.OptionsFlow):
                 {
                     vol.Optional(
                         CONF_SCAN_INTERVAL,
-                        default=self.config_entry.options.get(CONF_SCAN_INTERVAL, 5),
-                    ):int
+                        default=self.config_entry.options.get(CONF_SCAN_INTERVAL, MIN_SCAN_INTERVAL),
+                    ):int,
+                    vol.Optional(
+                        CONF_TRACKER_ATTRIBUTES,
+                        default=self.config_entry.options.get(CONF_TRACKER_ATTRIBUTES, DEFAULT_TRACKER_ATTRIBUTES),
+                    ):str,
+                    vol.Optional(
+                        CONF_TRACKER_MIN_DISTANCE,
+                        default=self.config_entry.options.get(CONF_TRACKER_MIN_DISTANCE, DEFAULT_TRACKER_MIN_DISTANCE),
+                    ):int,
+                    vol.Optional(
+                        CONF_TRIP_IDLE_TIMEOUT,
+                        default=self.config_entry.options.get(CONF_TRIP_IDLE_TIMEOUT, DEFAULT_TRIP_IDLE_TIMEOUT),
+                    ):int,
+                    vol.Optional(
+                        CONF_GEOFENCES,
+                        default=self.config_entry.options.get(CONF_GEOFENCES, ""),
+                    ):str,
+                    vol.Optional(
+                        CONF_TRACE_SAMPLE_RATE,
+                        default=self.config_entry.options.get(CONF_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SAMPLE_RATE),
+                    ):vol.All(vol.Coerce(int), vol.Range(min=0))
                 }
             ),
         )
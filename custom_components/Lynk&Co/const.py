@@ -13,12 +13,77 @@ NAME = "Lynk&Co"
 CONF_WAKE_ON_START = "enable_wake_on_start"
 DOMAIN = "lynkco"
 COORDINATOR = "coordinator"
+ACCOUNT = "account"
+GEOFENCES = "geofences"
 DATA_LISTENER = "listener"
 UNDO_UPDATE_LISTENER = "undo_update_listener"
+UNDO_ROSTER_SYNC = "undo_roster_sync"
 DEFAULT_SCAN_INTERVAL = 660
 DEFAULT_WAKE_ON_START = False
 MIN_SCAN_INTERVAL = 60
+MAX_CONCURRENT_REQUESTS = 4
+TOKEN_LIFETIME = 3600
+TOKEN_REFRESH_MARGIN = 300
+AUTH_FAILURE_STATUS = (401, 403)
+API_BASE_URL = "https://api.xchanger.cn"
+API_LOGIN = "/api/v1/user/login"
+API_TOKEN_REFRESH = "/api/v1/user/token/refresh"
+API_VEHICLES = "/device_platform/user/vehicle?id={}"
+API_VEHICLE_STATUS = "/geelyTCAccess/tcservices/vehicle/status/{}?userId={}&latest=false&target=more%2Cbasic"
+API_TELEMATICS = "/geelyTCAccess/tcservices/vehicle/telematics/{}"
+CONNECTION_LIMIT = 10
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+REQUEST_TIMEOUT = 30
+RATE_LIMIT_PER_MINUTE = 30
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_STATUS = 429
+RATE_LIMIT_RETRIES = 2
+RATE_LIMIT_DEFAULT_RETRY_AFTER = 30
+RATE_LIMIT_MAX_RETRY_AFTER = 600
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_DELAY = 30
+BREAKER_MAX_DELAY = 1800
+TELEMETRY_CAPACITY = 720
+# Upper bounds in milliseconds of the request latency histogram buckets
+METRICS_LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+METRICS_SCAN_INTERVAL = 60
+CONF_TRACE_SAMPLE_RATE = "trace_sample_rate"
+DEFAULT_TRACE_SAMPLE_RATE = 1
+CONF_TRIP_IDLE_TIMEOUT = "trip_idle_timeout"
+DEFAULT_TRIP_IDLE_TIMEOUT = 300
+CONF_TRACKER_ATTRIBUTES = "tracker_attributes"
+TRACKER_ATTRIBUTES_FULL = "*"
+CONF_TRACKER_MIN_DISTANCE = "tracker_min_distance"
+DEFAULT_TRACKER_MIN_DISTANCE = 20
+TRACKER_MAX_SILENCE = 300
+TRACKER_MAX_BUFFER = 64
+TRACKER_TRACK_POINTS = 64
+CONF_GEOFENCES = "geofences"
+GEOFENCE_CELL_SIZE = 0.01
+GEOFENCE_MAX_CELLS = 256
+GEOFENCE_HYSTERESIS = 30
+DEFAULT_TRACKER_ATTRIBUTES = (
+    "basicVehicleStatus.engineStatus,"
+    "basicVehicleStatus.speed,"
+    "basicVehicleStatus.direction,"
+    "basicVehicleStatus.distanceToEmpty,"
+    "additionalVehicleStatus.runningStatus.fuelLevelStatus,"
+    "additionalVehicleStatus.maintenanceStatus.odometer"
+)
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.{{}}"
+STORAGE_SAVE_DELAY = 60
 SIGNAL_STATE_UPDATED = f"{DOMAIN}.updated"
+# Formatted with the config entry id; the payload is a list of VINs
+SIGNAL_VEHICLES_ADDED = f"{DOMAIN}.vehicles_added.{{}}"
+SIGNAL_VEHICLES_REMOVED = f"{DOMAIN}.vehicles_removed.{{}}"
+ROSTER_SYNC_INTERVAL = 3600
+EVENT_COMMAND = f"{DOMAIN}_command"
+EVENT_COMMAND_CONFIRMED = f"{DOMAIN}_command_confirmed"
+CONFIRM_POLL_DELAYS = (5, 5, 10, 20, 40, 60)
+EVENT_TRIP_ENDED = f"{DOMAIN}_trip_ended"
+EVENT_GEOFENCE = f"{DOMAIN}_geofence"
 LYNKCO_COMPONENT = ['device_tracker','sensor','binary_sensor']
 ATTR_ICON = "icon"
 ATTR_LABEL = "label"
@@ -30,23 +95,12 @@ ATTR_ADD_VEHICLE_STATUS = 'additionalVehicleStatus'
 
 from homeassistant.const import (
     ATTR_DEVICE_CLASS,
-    DEVICE_CLASS_TEMPERATURE,
-    LENGTH_FEET,
-    LENGTH_INCHES,
-    LENGTH_METERS,
-    SPEED_KILOMETERS_PER_HOUR,
-    SPEED_MILES_PER_HOUR,
-    LENGTH_MILES,
-    LENGTH_KILOMETERS,
-    LENGTH_INCHES,
-    TEMP_CELSIUS,
-    TEMP_FAHRENHEIT,
-    VOLUME_LITERS,
-    TIME_HOURS,
-    TIME_DAYS,
     DEGREE,
-    UV_INDEX,
-    VOLUME_CUBIC_METERS,
+    UnitOfLength,
+    UnitOfSpeed,
+    UnitOfTemperature,
+    UnitOfTime,
+    UnitOfVolume,
 )
 
 OPTIONAL_SENSORS = (
@@ -234,8 +288,8 @@ SENSOR_TYPES = {
         ATTR_VEHICLE_STATUS: "basicVehicleStatus",
         ATTR_LABEL: "Speed",
         ATTR_FRIENDLY_NAME: '速度',
-        ATTR_UNIT_METRIC: SPEED_MILES_PER_HOUR,
-        ATTR_UNIT_IMPERIAL: SPEED_KILOMETERS_PER_HOUR,
+        ATTR_UNIT_METRIC: UnitOfSpeed.MILES_PER_HOUR,
+        ATTR_UNIT_IMPERIAL: UnitOfSpeed.KILOMETERS_PER_HOUR,
     },
     "direction": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -252,8 +306,8 @@ SENSOR_TYPES = {
         ATTR_VEHICLE_STATUS: "basicVehicleStatus",
         ATTR_LABEL: "Distance To Empty",
         ATTR_FRIENDLY_NAME: '剩余公里数',
-        ATTR_UNIT_METRIC: LENGTH_KILOMETERS,
-        ATTR_UNIT_IMPERIAL: LENGTH_KILOMETERS,
+        ATTR_UNIT_METRIC: UnitOfLength.KILOMETERS,
+        ATTR_UNIT_IMPERIAL: UnitOfLength.KILOMETERS,
     },
     "ecuWarningMessages": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -272,8 +326,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "climateStatus",
         ATTR_LABEL: "Exterior temp",
         ATTR_FRIENDLY_NAME: '车外温度',
-        ATTR_UNIT_METRIC: TEMP_CELSIUS,
-        ATTR_UNIT_IMPERIAL: TEMP_CELSIUS,
+        ATTR_UNIT_METRIC: UnitOfTemperature.CELSIUS,
+        ATTR_UNIT_IMPERIAL: UnitOfTemperature.CELSIUS,
     },
     "interiorTemp": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -282,8 +336,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "climateStatus",
         ATTR_LABEL: "Interior temp",
         ATTR_FRIENDLY_NAME: '车内温度',
-        ATTR_UNIT_METRIC: TEMP_CELSIUS,
-        ATTR_UNIT_IMPERIAL: TEMP_CELSIUS,
+        ATTR_UNIT_METRIC: UnitOfTemperature.CELSIUS,
+        ATTR_UNIT_IMPERIAL: UnitOfTemperature.CELSIUS,
     },
     "winStatusDriverRear": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -402,8 +456,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "maintenanceStatus",
         ATTR_LABEL: "Engine Hrs to service",
         ATTR_FRIENDLY_NAME: '引擎维护',
-        ATTR_UNIT_METRIC: TIME_DAYS,
-        ATTR_UNIT_IMPERIAL: TIME_DAYS,
+        ATTR_UNIT_METRIC: UnitOfTime.DAYS,
+        ATTR_UNIT_IMPERIAL: UnitOfTime.DAYS,
     },
     "daysToService": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -412,8 +466,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "maintenanceStatus",
         ATTR_LABEL: "Days to service",
         ATTR_FRIENDLY_NAME: '保养(时间)',
-        ATTR_UNIT_METRIC: TIME_DAYS,
-        ATTR_UNIT_IMPERIAL: TIME_DAYS,
+        ATTR_UNIT_METRIC: UnitOfTime.DAYS,
+        ATTR_UNIT_IMPERIAL: UnitOfTime.DAYS,
     },
     "odometer": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -422,8 +476,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "maintenanceStatus",
         ATTR_LABEL: "Odometer",
         ATTR_FRIENDLY_NAME: '总里程',
-        ATTR_UNIT_METRIC: LENGTH_KILOMETERS,
-        ATTR_UNIT_IMPERIAL: LENGTH_KILOMETERS,
+        ATTR_UNIT_METRIC: UnitOfLength.KILOMETERS,
+        ATTR_UNIT_IMPERIAL: UnitOfLength.KILOMETERS,
     },
     "brakeFluidLevelStatus": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -482,8 +536,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "maintenanceStatus",
         ATTR_LABEL: "Distance to service",
         ATTR_FRIENDLY_NAME: '保养(公里)',
-        ATTR_UNIT_METRIC: LENGTH_KILOMETERS,
-        ATTR_UNIT_IMPERIAL: LENGTH_KILOMETERS,
+        ATTR_UNIT_METRIC: UnitOfLength.KILOMETERS,
+        ATTR_UNIT_IMPERIAL: UnitOfLength.KILOMETERS,
     },
     "serviceWarningTrigger": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -542,8 +596,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "runningStatus",
         ATTR_LABEL: "Ave fuel consumption in latest driving cycle",
         ATTR_FRIENDLY_NAME: '周期油耗',
-        ATTR_UNIT_METRIC: VOLUME_LITERS,
-        ATTR_UNIT_IMPERIAL: VOLUME_LITERS,
+        ATTR_UNIT_METRIC: UnitOfVolume.LITERS,
+        ATTR_UNIT_IMPERIAL: UnitOfVolume.LITERS,
     },
     "engineOilPressureWarning": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -572,8 +626,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "runningStatus",
         ATTR_LABEL: "Engine coolant Temperature",
         ATTR_FRIENDLY_NAME: '冷却液温度',
-        ATTR_UNIT_METRIC: TEMP_CELSIUS,
-        ATTR_UNIT_IMPERIAL: TEMP_CELSIUS,
+        ATTR_UNIT_METRIC: UnitOfTemperature.CELSIUS,
+        ATTR_UNIT_IMPERIAL: UnitOfTemperature.CELSIUS,
     },
     "engineCoolantLevelStatus": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -602,8 +656,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "runningStatus",
         ATTR_LABEL: "Trip meter1",
         ATTR_FRIENDLY_NAME: '行程表1',
-        ATTR_UNIT_METRIC: LENGTH_KILOMETERS,
-        ATTR_UNIT_IMPERIAL: LENGTH_KILOMETERS,
+        ATTR_UNIT_METRIC: UnitOfLength.KILOMETERS,
+        ATTR_UNIT_IMPERIAL: UnitOfLength.KILOMETERS,
     },
     "tripMeter2": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -612,8 +666,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "runningStatus",
         ATTR_LABEL: "Trip meter2",
         ATTR_FRIENDLY_NAME: '行程表2',
-        ATTR_UNIT_METRIC: LENGTH_KILOMETERS,
-        ATTR_UNIT_IMPERIAL: LENGTH_KILOMETERS,
+        ATTR_UNIT_METRIC: UnitOfLength.KILOMETERS,
+        ATTR_UNIT_IMPERIAL: UnitOfLength.KILOMETERS,
     },
     "aveFuelConsumption": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -622,8 +676,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "runningStatus",
         ATTR_LABEL: "Ave fuel consumption",
         ATTR_FRIENDLY_NAME: '平均油耗',
-        ATTR_UNIT_METRIC: VOLUME_LITERS,
-        ATTR_UNIT_IMPERIAL: VOLUME_LITERS,
+        ATTR_UNIT_METRIC: UnitOfVolume.LITERS,
+        ATTR_UNIT_IMPERIAL: UnitOfVolume.LITERS,
     },
     "avgSpeed": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -632,8 +686,8 @@ SENSOR_TYPES = {
         ATTR_ADD_VEHICLE_STATUS: "runningStatus",
         ATTR_LABEL: "Avg speed",
         ATTR_FRIENDLY_NAME: '平均速度',
-        ATTR_UNIT_METRIC: SPEED_MILES_PER_HOUR,
-        ATTR_UNIT_IMPERIAL: SPEED_KILOMETERS_PER_HOUR,
+        ATTR_UNIT_METRIC: UnitOfSpeed.MILES_PER_HOUR,
+        ATTR_UNIT_IMPERIAL: UnitOfSpeed.KILOMETERS_PER_HOUR,
     },
     "srsStatus": {
         ATTR_DEVICE_CLASS: "lynkco_car",
@@ -0,0 +1,458 @@
+"""Account and per-vehicle coordinators for the Lynk&Co cloud."""
+import asyncio
+import json
+import logging
+import time
+
+from aiohttp import ClientError
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .auth import LynkCoAuth
+from .changes import ancestors
+from .commands import CommandDispatcher, CompletionTracker
+from .const import (
+    API_TELEMATICS,
+    API_VEHICLES,
+    API_VEHICLE_STATUS,
+    AUTH_FAILURE_STATUS,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    DEFAULT_TRIP_IDLE_TIMEOUT,
+    DOMAIN,
+    EVENT_TRIP_ENDED,
+    LYNKCO_COMPONENT,
+    MAX_CONCURRENT_REQUESTS,
+    STORAGE_SAVE_DELAY,
+)
+from .exceptions import LynkCoApiError, LynkCoAuthError, LynkCoError
+from .ratelimit import PRIORITY_COMMAND
+from .scheduler import PollingScheduler
+from .snapshot import SnapshotSchema
+from .telemetry import TelemetryBuffer
+from .tracing import NULL_TRACE, Tracer
+from .trips import TRIP_PATH, TripDetector
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LynkCoAccount:
+    """Token, vehicle roster and command queues shared by the cars of one login.
+
+    Every car gets its own LynkCoVehicleCoordinator, so a slow or failing car
+    does not hold back or mark unavailable the others.
+    """
+
+    def __init__(self, hass, client, user, password, scan_interval, max_concurrent=MAX_CONCURRENT_REQUESTS, store=None,
+                 trip_idle_timeout=DEFAULT_TRIP_IDLE_TIMEOUT, extra_paths=(), keep_raw=False,
+                 trace_sample_rate=DEFAULT_TRACE_SAMPLE_RATE):
+        """Initialize."""
+        self.hass = hass
+        self.client = client
+        self.auth = LynkCoAuth(client, user, password)
+        self.vehicles = None
+        self.coordinators = {}
+        self.commands = CommandDispatcher(hass, self._async_send_command)
+        self.completions = CompletionTracker(hass, self._async_current_status, self.async_refresh_vehicle)
+        self.schema = SnapshotSchema(extra_paths)
+        self.tracer = Tracer(trace_sample_rate)
+        self._platform_paths = {}
+        self._keep_raw = keep_raw
+        self._scan_interval = scan_interval
+        self._trip_idle_timeout = trip_idle_timeout
+        self._store = store
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def async_load_cache(self):
+        """Load the last roster and status snapshot; return True if one was found."""
+        if self._store is None:
+            return False
+        cached = await self._store.async_load()
+        if not cached or not cached.get('data'):
+            return False
+        vehicles, data = cached['vehicles'], cached['data']
+        if isinstance(data, list):
+            # Snapshots cached before the data was keyed by VIN
+            vehicles = {item['vin']: item for item in vehicles}
+            data = {status['result']['vin']: status for status in data}
+        self.vehicles = vehicles
+        self._async_add_coordinators()
+        for vin, status in data.items():
+            if vin not in self.coordinators:
+                continue
+            if 'vehicleStatus' in status:
+                # Whole payloads cached before snapshots
+                snapshot = self.schema.snapshot(status['vehicleStatus'])
+            else:
+                snapshot = self.schema.from_dict(status)
+            self.coordinators[vin].async_set_cached_data(snapshot)
+        return True
+
+    async def async_setup(self):
+        """Load the roster if needed and refresh every car once.
+
+        Returns True if at least one car could be refreshed.
+        """
+        if self.vehicles is None:
+            self.vehicles = await self._async_get_roster()
+        self._async_add_coordinators()
+        await self.async_refresh_all()
+        return any(c.last_update_success for c in self.coordinators.values())
+
+    async def async_sync_roster(self):
+        """Reload the vehicle list and add or drop coordinators to match it.
+
+        New cars are refreshed once; the others are left alone. Returns the
+        lists of added and removed VINs. An empty list is treated as a
+        glitch and removes nothing.
+        """
+        vehicles = await self._async_get_roster()
+        if not vehicles and self.vehicles:
+            _LOGGER.debug("Ignoring an empty vehicle list")
+            return [], []
+        added = [vin for vin in vehicles if vin not in self.vehicles]
+        removed = [vin for vin in self.vehicles if vin not in vehicles]
+        self.vehicles = vehicles
+        for vin in removed:
+            coordinator = self.coordinators.pop(vin, None)
+            if coordinator is not None:
+                coordinator.async_stop()
+            self.client.forget_vehicle(vin)
+        self._async_add_coordinators()
+        await asyncio.gather(*(self.coordinators[vin].async_refresh() for vin in added))
+        if added or removed:
+            self.async_save_cache()
+        return added, removed
+
+    async def _async_get_roster(self):
+        await self.auth.async_get_token()
+        try:
+            return await self._get_vehicles()
+        except LynkCoAuthError:
+            self.auth.invalidate()
+            raise
+
+    async def async_refresh_all(self):
+        """Refresh every car concurrently."""
+        await asyncio.gather(*(c.async_refresh() for c in self.coordinators.values()))
+
+    async def async_refresh_vehicle(self, vin):
+        """Refresh one car now; return its status, or None if it failed."""
+        coordinator = self.coordinators.get(vin)
+        if coordinator is None:
+            return None
+        await coordinator.async_refresh()
+        return coordinator.data if coordinator.last_update_success else None
+
+    @callback
+    def _async_add_coordinators(self):
+        for vin in self.vehicles:
+            if vin not in self.coordinators:
+                self.coordinators[vin] = LynkCoVehicleCoordinator(
+                    self.hass, self, vin, self._scan_interval, self._trip_idle_timeout)
+
+    @callback
+    def async_use_paths(self, platform, paths):
+        """Record the status paths a platform's enabled entities read.
+
+        Until every platform has reported, all paths are extracted; then
+        extraction is restricted to the union. Paths reported later widen it
+        again; returns True in that case, so the caller can refresh the cars
+        that need them.
+        """
+        if self.schema.wanted is not None:
+            return self.schema.widen(paths)
+        self._platform_paths.setdefault(platform, set()).update(paths)
+        if set(LYNKCO_COMPONENT).issubset(self._platform_paths):
+            self.schema.restrict(set().union(*self._platform_paths.values()))
+            _LOGGER.debug(
+                "Extracting %s of %s status fields",
+                len(self.schema.wanted), len(self.schema.paths))
+        return False
+
+    def _async_current_status(self, vin):
+        coordinator = self.coordinators.get(vin)
+        return coordinator.data if coordinator is not None else None
+
+    @callback
+    def async_save_cache(self):
+        """Schedule a coalesced save of the roster and the latest snapshots."""
+        if self._store is not None:
+            self._store.async_delay_save(self._cache_data, STORAGE_SAVE_DELAY)
+
+    def _cache_data(self):
+        data = {vin: c.data.as_dict() for vin, c in self.coordinators.items() if c.data is not None}
+        return {'vehicles': self.vehicles, 'data': data}
+
+    async def async_close(self):
+        """Stop queued commands and timers and close the HTTP client."""
+        for coordinator in self.coordinators.values():
+            coordinator.async_stop()
+        await self.commands.async_shutdown()
+        await self.completions.async_shutdown()
+        await self.client.async_close()
+
+    async def async_get_status(self, vin, trace=NULL_TRACE):
+        """Fetch the status of one car as a VehicleSnapshot."""
+        data = await self.async_get_raw_status(vin, trace)
+        with trace.span('snapshot'):
+            return self.schema.snapshot(data['vehicleStatus'], self._keep_raw)
+
+    async def async_get_raw_status(self, vin, trace=NULL_TRACE):
+        """Fetch the whole status payload of one car, renewing the token first if needed."""
+        with trace.span('token'):
+            await self.auth.async_get_token()
+        try:
+            with trace.span('request'):
+                return await self._get_one_vehicle_status(self.vehicles[vin])
+        except LynkCoAuthError:
+            # Only a rejected token leads to a renewal on the next request
+            self.auth.invalidate()
+            raise
+
+    async def _async_send_command(self, vin, service, value):
+        """Send one remote command, renewing the token once if it was rejected."""
+        started = time.monotonic()
+        before = self._async_current_status(vin)
+        trace = self.tracer.start(service, vin)
+        try:
+            await self.auth.async_get_token()
+            try:
+                result = await self._send_RES_command(vin, service, value, trace)
+            except LynkCoAuthError:
+                self.auth.invalidate()
+                await self.auth.async_get_token()
+                result = await self._send_RES_command(vin, service, value, trace)
+        except (ClientError, asyncio.TimeoutError) as error:
+            trace.end(error=error)
+            raise LynkCoApiError("Command failed: {}".format(error)) from error
+        except LynkCoError as error:
+            trace.end(error=error)
+            raise
+        trace.end()
+        self.completions.async_track(vin, service, started, before)
+        return result
+
+    async def _send_RES_command(self, vin, service, value=None, trace=NULL_TRACE):
+        url = self.client.url(API_TELEMATICS, vin)
+        headers ={
+                    "authorization" : self.auth.access_token,
+                    "X-APP-ID" : "xiaokanl",
+                    "X-OPERATOR-CODE":"LYNKCO",
+                    "Content-Type":"application/json",
+                    "Accept":"application/json;responseformat=3"
+                }
+        data = {"command":"",
+                "creator":"tc",
+                "serviceId":"",
+                "timestamp":int(time.time()),
+                "userId":self.auth.user_id
+                }
+        if service == 'start':
+            data['command'] = 'start'
+            data['serviceId'] = 'RES'
+        elif service == 'stop':
+            data['command'] = 'stop'
+            data['serviceId'] = 'RES'
+        elif service == 'lock':
+            data['command'] = 'start'
+            data['serviceId'] = 'RDL'
+        elif service == 'unlock':
+            data['command'] = 'start'
+            data['serviceId'] = 'RDU'
+            data['serviceParameters'] = [{
+                                        "key":"time.window",
+                                        "value":value
+                                        }]
+        elif service == 'hlf':
+            data['command'] = 'start'
+            data['serviceId'] = 'RHL'
+            data['serviceParameters'] = [{
+                                        "key":"rhl",
+                                        "value":value
+                                        }]
+
+        trace.event('request', url=url, headers=headers, data=data)
+        with trace.span('request'):
+            r = await self.client.async_request(
+                'PUT', 'telematics', url, priority=PRIORITY_COMMAND, vin=vin,
+                data=json.dumps(data), headers=headers)
+        trace.event('response', status=r.status, data=r.data)
+        if r.status in AUTH_FAILURE_STATUS:
+            raise LynkCoAuthError("Command rejected: {}".format(r.status))
+        if r.status != 200:
+            raise LynkCoApiError("Command failed: {}".format(r.status), r.status)
+        return (r.data or {}).get('message')
+
+    async def _get_vehicles(self):
+        url = self.client.url(API_VEHICLES, self.auth.user_id)
+        headers = {
+            'Accept':'application/json;charset=UTF-8',
+            'X-APP-ID':'xiaokanl',
+            'x-operator-code':'LYNKCO',
+            'authorization':self.auth.access_token
+        }
+        r = await self.client.async_request('GET', 'vehicles', url, headers=headers)
+        if r.status in AUTH_FAILURE_STATUS:
+            raise LynkCoAuthError("Vehicle list rejected: {}".format(r.status))
+        if r.status != 200:
+            raise LynkCoApiError("Get vehicles failed: {}".format(r.status), r.status)
+        try:
+            return {item['vin']: item for item in r.data['list']}
+        except (KeyError, TypeError) as e:
+            raise LynkCoApiError("Get vehicles failed: {}".format(e)) from e
+
+    async def _get_one_vehicle_status(self, item):
+        url = self.client.url(API_VEHICLE_STATUS, item['vin'], self.auth.user_id)
+        headers = {
+            'Accept':'application/json;charset=UTF-8',
+            'x-operator-code':'LYNKCO',
+            'authorization':self.auth.access_token
+        }
+        async with self._semaphore:
+            try:
+                r = await self.client.async_request(
+                    'GET', 'status', url, vin=item['vin'], headers=headers)
+                if r.status in AUTH_FAILURE_STATUS:
+                    raise LynkCoAuthError("Status rejected: {}".format(r.status))
+                if r.status != 200:
+                    raise LynkCoApiError("Get status failed: {}".format(r.status), r.status)
+                data = r.data['data']
+                if not isinstance(data.get('vehicleStatus'), dict):
+                    raise LynkCoApiError("Get status failed: no vehicleStatus")
+                return data
+            except (ClientError, asyncio.TimeoutError, KeyError, TypeError) as e:
+                raise LynkCoApiError("Get status failed: {}".format(e)) from e
+
+
+class LynkCoVehicleCoordinator(DataUpdateCoordinator):
+    """Poll one car on its own cadence; data is that car's status snapshot."""
+
+    def __init__(self, hass, account, vin, scan_interval, trip_idle_timeout=DEFAULT_TRIP_IDLE_TIMEOUT):
+        """Initialize."""
+        self.account = account
+        self.vin = vin
+        self.stale = False
+        self.telemetry = TelemetryBuffer()
+        self.trips = TripDetector(trip_idle_timeout)
+        self._unsub_trip_timer = None
+        self._scheduler = PollingScheduler(scan_interval)
+        self._changes = set()
+        self._field_listeners = {}
+        self._remove_dispatcher = None
+        self._last_state = (True, False)
+        super().__init__(
+            hass, _LOGGER, name="{} {}".format(DOMAIN, vin),
+            update_interval=self._scheduler.next_interval(()),
+        )
+
+    @property
+    def available(self):
+        """Return True while live data, or the cached snapshot until the first refresh ends, is usable."""
+        return self.data is not None and (self.last_update_success or self.stale)
+
+    @callback
+    def async_set_cached_data(self, snapshot):
+        """Seed the coordinator with a cached snapshot until the first live refresh."""
+        self.data = snapshot
+        self.stale = True
+        self.telemetry.append(snapshot)
+
+    @callback
+    def async_stop(self):
+        """Cancel the trip idle timer and any scheduled refresh."""
+        self._unschedule_refresh()
+        self._async_cancel_trip_timer()
+
+    @callback
+    def _async_cancel_trip_timer(self):
+        if self._unsub_trip_timer is not None:
+            self._unsub_trip_timer()
+            self._unsub_trip_timer = None
+
+    @callback
+    def _async_trip_updated(self, ended):
+        if self.trips.current is not None or ended is not None:
+            self._changes.add(TRIP_PATH)
+        if ended is not None:
+            _LOGGER.debug("Trip of %s ended: %s", self.vin, ended.as_dict())
+            self.hass.bus.async_fire(EVENT_TRIP_ENDED, {"vin": self.vin, **ended.as_dict()})
+        self._async_cancel_trip_timer()
+        deadline = self.trips.idle_deadline()
+        if deadline is not None:
+            # Parked cars are polled rarely, so close the trip on time without waiting for one
+            self._unsub_trip_timer = async_call_later(
+                self.hass, max(0, deadline - time.time()), self._async_trip_timeout)
+
+    @callback
+    def _async_trip_timeout(self, _now):
+        self._unsub_trip_timer = None
+        ended = self.trips.expire(time.time())
+        if ended is None:
+            return
+        self._changes = set()
+        self._async_trip_updated(ended)
+        self.async_update_listeners()
+
+    @callback
+    def async_add_field_listener(self, paths, update_callback):
+        """Call update_callback only when one of the vehicleStatus paths changes."""
+        keys = [tuple(path) for path in paths]
+        for key in keys:
+            self._field_listeners.setdefault(key, []).append(update_callback)
+        if self._remove_dispatcher is None:
+            self._remove_dispatcher = self.async_add_listener(self._async_dispatch_changes)
+
+        @callback
+        def remove_listener():
+            for key in keys:
+                self._field_listeners[key].remove(update_callback)
+                if not self._field_listeners[key]:
+                    del self._field_listeners[key]
+            if not self._field_listeners and self._remove_dispatcher is not None:
+                self._remove_dispatcher()
+                self._remove_dispatcher = None
+
+        return remove_listener
+
+    @callback
+    def _async_dispatch_changes(self):
+        """Notify only the listeners whose fields changed in the last refresh."""
+        pending = set()
+        state = (self.last_update_success, self.stale)
+        if state != self._last_state:
+            self._last_state = state
+            for listeners in self._field_listeners.values():
+                pending.update(listeners)
+        elif self.last_update_success:
+            for path in self._changes:
+                for prefix in ancestors(path):
+                    pending.update(self._field_listeners.get(prefix, ()))
+        self._changes = set()
+        for update_callback in pending:
+            update_callback()
+        if pending:
+            _LOGGER.debug("Wrote %s entity states of %s", len(pending), self.vin)
+
+    async def _async_update_data(self):
+        """Fetch this car's status and pick its next interval."""
+        trace = self.account.tracer.start('update', self.vin)
+        try:
+            data = await self.account.async_get_status(self.vin, trace)
+        except (LynkCoError, ClientError, asyncio.TimeoutError) as error:
+            # The cached snapshot only covers the first live refresh; once that
+            # fails the car goes unavailable instead of showing old data
+            self.stale = False
+            self.update_interval = self._scheduler.failed()
+            trace.end(error=error, next_update=self.update_interval)
+            raise UpdateFailed(error) from error
+        with trace.span('diff'):
+            self._changes = self.account.schema.diff(self.data, data)
+        with trace.span('history'):
+            if self.telemetry.append(data):
+                self._async_trip_updated(self.trips.update(data))
+        self.stale = False
+        self.account.async_save_cache()
+        self.update_interval = self._scheduler.next_interval((data,))
+        trace.end(changed=len(self._changes), next_update=self.update_interval)
+        return data
@@ -1,52 +1,59 @@
 
 """Support for the Xiaomi device tracking."""
 import logging
-import datetime
-import time
 
-from homeassistant.components.device_tracker import SOURCE_TYPE_GPS
+from homeassistant.components.device_tracker import DOMAIN as DEVICE_TRACKER_DOMAIN, SourceType
 from homeassistant.components.device_tracker.config_entry import TrackerEntity
-from homeassistant.const import (
-    ATTR_BATTERY_LEVEL,
-    ATTR_GPS_ACCURACY,
-    ATTR_LATITUDE,
-    ATTR_LONGITUDE,
-)
-from homeassistant.core import callback
-from homeassistant.helpers import device_registry
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.restore_state import RestoreEntity
-from homeassistant.helpers.typing import HomeAssistantType
-from homeassistant.helpers.entity import Entity
 
 from .const import (
     DOMAIN,
-    COORDINATOR,
-    SIGNAL_STATE_UPDATED
+    ACCOUNT,
+    CONF_TRACKER_ATTRIBUTES,
+    CONF_TRACKER_MIN_DISTANCE,
+    DEFAULT_TRACKER_ATTRIBUTES,
+    DEFAULT_TRACKER_MIN_DISTANCE,
 )
+from .roster import EntitySpec, async_track_vehicles
+from .scheduler import is_active
+from .snapshot import LATITUDE_PATH, LONGITUDE_PATH, TRUSTED_PATH, UPDATE_TIME_PATH, parse_projection
+from .telemetry import POSITION_SCALE, sample_time
+from .tracking import TrackFilter
 
 _LOGGER = logging.getLogger(__name__)
 
-async def async_setup_entry(hass: HomeAssistantType, config_entry, async_add_entities):
+async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entities):
     """Configure a dispatcher connection based on a config entry."""
 
-    coordinator = hass.data[DOMAIN][config_entry.entry_id][COORDINATOR]
-    devices = []
-    for i in range(len(coordinator.data)):
-        devices.append(LynkCOEntity(hass, coordinator, i))
-        _LOGGER.debug("device is : %s", i)
-    async_add_entities(devices, True)
+    account = hass.data[DOMAIN][config_entry.entry_id][ACCOUNT]
+    projection = parse_projection(
+        config_entry.options.get(CONF_TRACKER_ATTRIBUTES, DEFAULT_TRACKER_ATTRIBUTES)
+    )
+    min_distance = config_entry.options.get(CONF_TRACKER_MIN_DISTANCE, DEFAULT_TRACKER_MIN_DISTANCE)
+    specs = [EntitySpec(
+        None, None,
+        lambda vin, coordinator: LynkCOEntity(hass, coordinator, vin, projection, min_distance),
+    )]
+    async_track_vehicles(hass, config_entry, account, async_add_entities, DEVICE_TRACKER_DOMAIN, specs)
+
 
-class LynkCOEntity(TrackerEntity, RestoreEntity, Entity):
+class LynkCOEntity(TrackerEntity, RestoreEntity):
     """Represent a tracked device."""
 
-    def __init__(self, hass, coordinator, vin) -> None:
+    _unrecorded_attributes = frozenset({"data", "track"})
+
+    def __init__(self, hass, coordinator, vin, projection=None, min_distance=DEFAULT_TRACKER_MIN_DISTANCE) -> None:
         """Set up Geofency entity."""
         self._hass = hass
         self._vin = vin
-        self.coordinator = coordinator  
-        self._unique_id = coordinator.data[vin]["result"]['vin']
-        self._name = coordinator.data[vin]["plateNo"]
+        self._projection = projection
+        self._filter = TrackFilter(min_distance)
+        self._position = None
+        self._was_available = None
+        self.coordinator = coordinator
+        self._unique_id = vin
+        self._name = coordinator.account.vehicles[vin]["plateNo"]
         self._icon = "mdi:car"
         self.sw_version = '001'
 
@@ -59,34 +66,77 @@ class LynkCOEntity(TrackerEntity, RestoreEntity, Entity):
 
         _LOGGER.debug("device_tracker_unique_id: %s", self._unique_id)
 
-        async def async_update_state():
-            """Update sensor state."""
-            await self.async_update_ha_state(True)
-
+        # Writes follow the position; the other attributes ride along with them
+        paths = (
+            ('basicVehicleStatus', 'position'),
+            ('basicVehicleStatus', 'engineStatus'),
+            ('basicVehicleStatus', 'speed'),
+        )
         self.async_on_remove(
-            self.coordinator.async_add_listener(self.async_write_ha_state)
+            self.coordinator.async_add_field_listener(
+                paths, self._async_status_updated
+            )
         )
+        # Home Assistant writes the first state itself; start the track from it
+        self._was_available = self.available
+        if self._was_available:
+            self._filter_position(force=True)
+
+    def _filter_position(self, force=False):
+        """Return True and keep the current position if the track filter writes it."""
+        status = self.coordinator.data
+        point = (
+            sample_time(status),
+            status.get(LATITUDE_PATH, 0) / POSITION_SCALE,
+            status.get(LONGITUDE_PATH, 0) / POSITION_SCALE,
+        )
+        if not self._filter.update(point, status.get(TRUSTED_PATH), is_active(status), force):
+            return False
+        self._position = point
+        return True
+
+    @callback
+    def _async_status_updated(self):
+        """Write the state for the positions the track filter keeps."""
+        available = self.available
+        force = available != self._was_available
+        self._was_available = available
+        if not available:
+            if force:
+                self.async_write_ha_state()
+            return
+        if self._filter_position(force):
+            self.async_write_ha_state()
 
     @property
-    def device_state_attributes(self):
+    def extra_state_attributes(self):
         """Return device specific attributes."""
-        updateTime = self.coordinator.data[self._vin]["vehicleStatus"]['updateTime']
+        status = self.coordinator.data
         attrs = {
-            "last_update": updateTime,
-            "data": self.coordinator.data[self._vin]["vehicleStatus"],
-            "vin": self._unique_id
+            "last_update": status.get(UPDATE_TIME_PATH),
+            "vin": self._unique_id,
+            "track": [list(point) for point in self._filter.track],
         }
+        if self._projection is None:
+            attrs["data"] = status.as_tree()
+        else:
+            for path in self._projection:
+                attrs[path[-1]] = status.get(path)
         return attrs
 
     @property
     def latitude(self):
         """Return latitude value of the device."""
-        return (self.coordinator.data[self._vin]['vehicleStatus']["basicVehicleStatus"]['position']['latitude'])/3600000
+        if self._position is not None:
+            return self._position[1]
+        return self.coordinator.data.get(LATITUDE_PATH, 0) / POSITION_SCALE
 
     @property
     def longitude(self):
         """Return longitude value of the device."""
-        return (self.coordinator.data[self._vin]['vehicleStatus']["basicVehicleStatus"]['position']['longitude'])/3600000
+        if self._position is not None:
+            return self._position[2]
+        return self.coordinator.data.get(LONGITUDE_PATH, 0) / POSITION_SCALE
 
 
     @property
@@ -110,7 +160,6 @@ class LynkCOEntity(TrackerEntity, RestoreEntity, Entity):
             "identifiers": {(DOMAIN, self._unique_id)},
             "name": self._name,
             "manufacturer": "Lynk&Co",
-            "entry_type": "device",
             "sw_version": self.sw_version,
             "model": self._name
         }
@@ -119,10 +168,20 @@ class LynkCOEntity(TrackerEntity, RestoreEntity, Entity):
         """Return the polling requirement of the entity."""
         return False
 
+    @property
+    def available(self):
+        """Return True if entity is available."""
+        return self.coordinator.available
+
+    @property
+    def assumed_state(self):
+        """Return True while showing the cached snapshot."""
+        return self.coordinator.stale
+
     @property
     def source_type(self):
         """Return the source type, eg gps or router, of the device."""
-        return SOURCE_TYPE_GPS
+        return SourceType.GPS
 
         
 
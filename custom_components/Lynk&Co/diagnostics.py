@@ -0,0 +1,87 @@
+"""Diagnostics support for Lynk&Co."""
+import asyncio
+import json
+
+from aiohttp import ClientError
+from homeassistant.components.device_tracker import DOMAIN as DEVICE_TRACKER_DOMAIN
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.helpers import entity_registry as er
+
+from .const import ACCOUNT, DOMAIN
+from .exceptions import LynkCoError
+
+TO_REDACT = {
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    "vin",
+    "plateNo",
+    "latitude",
+    "longitude",
+    "userId",
+}
+
+
+async def _async_full_status(account, coordinator):
+    """Fetch the whole payload; coordinators only keep the fields entities read."""
+    try:
+        return await account.async_get_raw_status(coordinator.vin)
+    except (LynkCoError, ClientError, asyncio.TimeoutError):
+        if coordinator.data is None:
+            return None
+        return {"vehicleStatus": coordinator.data.as_tree()}
+
+
+def _tracker_attribute_bytes(hass, vins):
+    """Return the size of the attributes Home Assistant holds for each device tracker."""
+    registry = er.async_get(hass)
+    sizes = {}
+    for vin in vins:
+        entity_id = registry.async_get_entity_id(DEVICE_TRACKER_DOMAIN, DOMAIN, vin)
+        state = hass.states.get(entity_id) if entity_id is not None else None
+        if state is not None:
+            sizes[entity_id] = len(json.dumps(dict(state.attributes), default=str))
+    return sizes
+
+
+def _breakers(client, vin=None):
+    """Return the shared breakers, or those of one car keyed by endpoint without the VIN."""
+    return {endpoint: breaker.as_dict() for endpoint, breaker in client.breakers_for(vin).items()}
+
+
+async def async_get_config_entry_diagnostics(hass, config_entry):
+    """Return diagnostics for a config entry, including the full status payload."""
+    account = hass.data[DOMAIN][config_entry.entry_id][ACCOUNT]
+    coordinators = list(account.coordinators.values())
+    statuses = await asyncio.gather(
+        *(_async_full_status(account, coordinator) for coordinator in coordinators)
+    )
+    return {
+        "entry": async_redact_data(config_entry.as_dict(), TO_REDACT),
+        "tracker_attribute_bytes": _tracker_attribute_bytes(hass, account.coordinators),
+        "payload_stats": account.client.payload_stats,
+        "circuit_breakers": _breakers(account.client),
+        "rate_limiter": account.client.limiter.as_dict() if account.client.limiter else None,
+        "command_confirmations": account.completions.as_dict(),
+        "request_metrics": {
+            endpoint: metrics.as_dict()
+            for endpoint, metrics in account.client.metrics.endpoints.items()
+        },
+        "vehicles": [
+            {
+                "last_update_success": coordinator.last_update_success,
+                "stale": coordinator.stale,
+                "update_interval": str(coordinator.update_interval),
+                "telemetry": {
+                    "samples": len(coordinator.telemetry),
+                    "capacity": coordinator.telemetry.capacity,
+                    "bytes": coordinator.telemetry.nbytes,
+                },
+                "request_metrics": account.client.metrics.vehicle(coordinator.vin).as_dict(),
+                "circuit_breakers": _breakers(account.client, coordinator.vin),
+                "vehicle": async_redact_data(account.vehicles.get(coordinator.vin) or {}, TO_REDACT),
+                "status": async_redact_data(status, TO_REDACT) if status is not None else None,
+            }
+            for coordinator, status in zip(coordinators, statuses)
+        ],
+    }
@@ -0,0 +1,23 @@
+"""Exceptions for the Lynk&Co integration."""
+from homeassistant.exceptions import HomeAssistantError
+
+
+class LynkCoError(HomeAssistantError):
+    """Base error for the Lynk&Co cloud."""
+
+
+class LynkCoAuthError(LynkCoError):
+    """The credentials or the access token were rejected."""
+
+
+class LynkCoApiError(LynkCoError):
+    """The backend failed or could not be reached."""
+
+    def __init__(self, message, status=None):
+        """Initialize."""
+        super().__init__(message)
+        self.status = status
+
+
+class LynkCoCircuitOpenError(LynkCoApiError):
+    """Requests to an endpoint are held back after repeated failures."""
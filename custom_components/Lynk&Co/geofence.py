@@ -0,0 +1,252 @@
+"""Grid-indexed geofences evaluated against raw vehicle positions."""
+import json
+import logging
+import math
+
+from homeassistant.const import ATTR_LATITUDE, ATTR_LONGITUDE
+from homeassistant.core import callback
+from homeassistant.helpers.event import TrackStates, async_track_state_change_filtered
+
+from .const import (
+    EVENT_GEOFENCE,
+    GEOFENCE_CELL_SIZE,
+    GEOFENCE_HYSTERESIS,
+    GEOFENCE_MAX_CELLS,
+)
+from .telemetry import POSITION_SCALE
+
+_LOGGER = logging.getLogger(__name__)
+
+ZONE_DOMAIN = 'zone'
+ATTR_RADIUS = 'radius'
+ZONE_SHAPE = (ATTR_LATITUDE, ATTR_LONGITUDE, ATTR_RADIUS)
+POSITION_PATH = ('basicVehicleStatus', 'position')
+
+# Meters per raw position unit (1/3600000 degree) along a meridian
+_METERS_PER_UNIT = 111320.0 / POSITION_SCALE
+
+
+class CircleZone:
+    """Home Assistant zone: a center and a radius in meters."""
+
+    __slots__ = ('name', 'lat', 'lon', 'radius', '_scale')
+
+    def __init__(self, name, latitude, longitude, radius):
+        """Initialize from degrees."""
+        self.name = name
+        self.lat = latitude * POSITION_SCALE
+        self.lon = longitude * POSITION_SCALE
+        self.radius = radius
+        self._scale = math.cos(math.radians(latitude))
+
+    def bounds(self, margin):
+        """Return (min_lat, min_lon, max_lat, max_lon) in raw units."""
+        reach = (self.radius + margin) / _METERS_PER_UNIT
+        return (self.lat - reach, self.lon - reach / self._scale,
+                self.lat + reach, self.lon + reach / self._scale)
+
+    def contains(self, lat, lon, margin=0.0):
+        """Return True if a raw position lies within radius + margin."""
+        dy = (lat - self.lat) * _METERS_PER_UNIT
+        dx = (lon - self.lon) * _METERS_PER_UNIT * self._scale
+        reach = self.radius + margin
+        return dx * dx + dy * dy <= reach * reach
+
+
+class PolygonZone:
+    """Custom polygon given as [[latitude, longitude], ...] in degrees."""
+
+    __slots__ = ('name', 'points', '_scale', '_bounds')
+
+    def __init__(self, name, points):
+        """Initialize from degrees."""
+        if len(points) < 3:
+            raise ValueError("polygon {} needs at least 3 points".format(name))
+        self.name = name
+        self.points = [(float(lat) * POSITION_SCALE, float(lon) * POSITION_SCALE) for lat, lon in points]
+        lats = [lat for lat, _ in self.points]
+        lons = [lon for _, lon in self.points]
+        self._scale = math.cos(math.radians(sum(lats) / len(lats) / POSITION_SCALE))
+        self._bounds = (min(lats), min(lons), max(lats), max(lons))
+
+    def bounds(self, margin):
+        """Return (min_lat, min_lon, max_lat, max_lon) in raw units."""
+        reach = margin / _METERS_PER_UNIT
+        min_lat, min_lon, max_lat, max_lon = self._bounds
+        return (min_lat - reach, min_lon - reach / self._scale,
+                max_lat + reach, max_lon + reach / self._scale)
+
+    def contains(self, lat, lon, margin=0.0):
+        """Return True if a raw position is inside, or within margin meters of the edge."""
+        inside = False
+        points = self.points
+        j = len(points) - 1
+        for i in range(len(points)):
+            lat_i, lon_i = points[i]
+            lat_j, lon_j = points[j]
+            if (lat_i > lat) != (lat_j > lat) and \
+                    lon < (lon_j - lon_i) * (lat - lat_i) / (lat_j - lat_i) + lon_i:
+                inside = not inside
+            j = i
+        if inside or not margin:
+            return inside
+        return self._edge_distance(lat, lon) <= margin
+
+    def _edge_distance(self, lat, lon):
+        best = math.inf
+        points = self.points
+        for i in range(len(points)):
+            ay, ax = points[i - 1]
+            by, bx = points[i]
+            # Local meters relative to the point
+            ax, bx = (ax - lon) * self._scale, (bx - lon) * self._scale
+            ay, by = ay - lat, by - lat
+            ex, ey = bx - ax, by - ay
+            length = ex * ex + ey * ey
+            t = 0.0 if length == 0 else max(0.0, min(1.0, -(ax * ex + ay * ey) / length))
+            best = min(best, math.hypot(ax + t * ex, ay + t * ey))
+        return best * _METERS_PER_UNIT
+
+
+class GeofenceIndex:
+    """Uniform grid over the zones' bounding boxes, hysteresis band included.
+
+    A position is tested only against the zones registered in its cell, plus
+    the few zones too large to register cell by cell.
+    """
+
+    def __init__(self, zones, cell_size=GEOFENCE_CELL_SIZE, margin=GEOFENCE_HYSTERESIS):
+        """Initialize."""
+        self.zones = list(zones)
+        self._cell = cell_size * POSITION_SCALE
+        self._cells = {}
+        self._large = []
+        for zone in self.zones:
+            min_lat, min_lon, max_lat, max_lon = zone.bounds(margin)
+            rows = range(int(min_lat // self._cell), int(max_lat // self._cell) + 1)
+            cols = range(int(min_lon // self._cell), int(max_lon // self._cell) + 1)
+            if len(rows) * len(cols) > GEOFENCE_MAX_CELLS:
+                self._large.append(zone)
+                continue
+            for row in rows:
+                for col in cols:
+                    self._cells.setdefault((row, col), []).append(zone)
+
+    def candidates(self, lat, lon):
+        """Return the zones that may contain a raw position."""
+        cell = self._cells.get((int(lat // self._cell), int(lon // self._cell)), ())
+        if not self._large:
+            return cell
+        return list(cell) + self._large
+
+
+def parse_polygons(value):
+    """Return PolygonZones from the JSON option {"name": [[lat, lon], ...]}."""
+    if not value or not value.strip():
+        return []
+    polygons = json.loads(value)
+    return [PolygonZone(name, points) for name, points in polygons.items()]
+
+
+class GeofenceEngine:
+    """Track which zones each vehicle is in and fire only the transitions.
+
+    A vehicle enters a zone when it is inside it and leaves only once it is
+    more than GEOFENCE_HYSTERESIS meters outside, so GPS noise on the edge
+    does not flap. The first position of a vehicle sets its zones silently.
+    """
+
+    def __init__(self, hass, polygons=()):
+        """Initialize."""
+        self._hass = hass
+        self._polygons = list(polygons)
+        self.index = GeofenceIndex(self._polygons)
+        self.inside = {}
+        self._unsubs = []
+        self._followed = {}
+
+    @callback
+    def async_start(self, coordinators):
+        """Index the zones and follow zone changes and vehicle positions."""
+        self.async_rebuild()
+        self._unsubs.append(async_track_state_change_filtered(
+            self._hass, TrackStates(False, set(), {ZONE_DOMAIN}), self._async_zone_changed
+        ).async_remove)
+        for coordinator in coordinators:
+            self.async_follow(coordinator)
+
+    @callback
+    def async_follow(self, coordinator):
+        """Evaluate a vehicle whenever its position changes."""
+        @callback
+        def position_updated():
+            if coordinator.data is not None:
+                self.async_check(coordinator.vin, coordinator.data)
+
+        self._followed[coordinator.vin] = coordinator.async_add_field_listener(
+            (POSITION_PATH,), position_updated)
+        position_updated()
+
+    @callback
+    def async_unfollow(self, vin):
+        """Stop evaluating a vehicle and forget its zones."""
+        unsub = self._followed.pop(vin, None)
+        if unsub is not None:
+            unsub()
+        self.inside.pop(vin, None)
+
+    @callback
+    def async_stop(self):
+        """Stop listening."""
+        while self._unsubs:
+            self._unsubs.pop()()
+        for vin in list(self._followed):
+            self.async_unfollow(vin)
+
+    @callback
+    def async_rebuild(self):
+        """Rebuild the index from the current zone states and the custom polygons."""
+        zones = list(self._polygons)
+        for state in self._hass.states.async_all(ZONE_DOMAIN):
+            try:
+                zones.append(CircleZone(
+                    state.entity_id,
+                    float(state.attributes[ATTR_LATITUDE]),
+                    float(state.attributes[ATTR_LONGITUDE]),
+                    float(state.attributes.get(ATTR_RADIUS, 0)),
+                ))
+            except (KeyError, TypeError, ValueError):
+                continue
+        self.index = GeofenceIndex(zones)
+        _LOGGER.debug("Indexed %s geofences", len(zones))
+
+    @callback
+    def _async_zone_changed(self, event):
+        # A zone's state is its occupant count; only its shape affects the index
+        old, new = event.data['old_state'], event.data['new_state']
+        if old is None or new is None or any(
+                old.attributes.get(key) != new.attributes.get(key) for key in ZONE_SHAPE):
+            self.async_rebuild()
+
+    @callback
+    def async_check(self, vin, snapshot):
+        """Evaluate one VehicleSnapshot and fire enter/exit events."""
+        try:
+            lat = float(snapshot.get(POSITION_PATH + ('latitude',)))
+            lon = float(snapshot.get(POSITION_PATH + ('longitude',)))
+        except (TypeError, ValueError):
+            return
+        previous = self.inside.get(vin)
+        known = previous or ()
+        current = {
+            zone.name
+            for zone in self.index.candidates(lat, lon)
+            if zone.contains(lat, lon, GEOFENCE_HYSTERESIS if zone.name in known else 0.0)
+        }
+        self.inside[vin] = current
+        if previous is None:
+            return
+        for name in current - previous:
+            self._hass.bus.async_fire(EVENT_GEOFENCE, {"vin": vin, "zone": name, "event": "enter"})
+        for name in previous - current:
+            self._hass.bus.async_fire(EVENT_GEOFENCE, {"vin": vin, "zone": name, "event": "exit"})
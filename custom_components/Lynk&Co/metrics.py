@@ -0,0 +1,140 @@
+"""Request metrics per cloud endpoint and per vehicle."""
+import bisect
+from urllib.parse import urlencode
+
+from .const import METRICS_LATENCY_BUCKETS
+
+# Endpoint names passed to LynkCoClient.async_request
+ENDPOINTS = ('login', 'token_refresh', 'vehicles', 'status', 'telematics')
+
+# Status label of requests that failed before a response arrived
+STATUS_ERROR = 'error'
+STATUS_CIRCUIT_OPEN = 'circuit_open'
+
+
+def request_size(kwargs):
+    """Return the body size in bytes of the keyword arguments of a request."""
+    data = kwargs.get('data')
+    if isinstance(data, str):
+        return len(data.encode())
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, dict):
+        # aiohttp sends dicts form encoded
+        return len(urlencode(data))
+    return 0
+
+
+class RequestMetrics:
+    """Latency histogram, status counts, bytes and retries of one series.
+
+    The histogram has fixed buckets, so recording is O(log buckets) and the
+    memory per series stays constant however many requests are made.
+    """
+
+    __slots__ = (
+        'requests', 'statuses', 'retries', 'bytes_in', 'bytes_out',
+        'buckets', 'latency_sum_ms', 'latency_max_ms',
+    )
+
+    def __init__(self):
+        """Initialize."""
+        self.requests = 0
+        self.statuses = {}
+        self.retries = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # One count per bucket plus the overflow bucket
+        self.buckets = [0] * (len(METRICS_LATENCY_BUCKETS) + 1)
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+
+    def record(self, status, latency_ms=None, bytes_out=0, bytes_in=0):
+        """Add one request; latency_ms is None for requests never sent."""
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        if latency_ms is not None:
+            self.buckets[bisect.bisect_left(METRICS_LATENCY_BUCKETS, latency_ms)] += 1
+            self.latency_sum_ms += latency_ms
+            self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+
+    def percentile(self, fraction):
+        """Return the estimated latency below which fraction of requests fall, or None.
+
+        Interpolates linearly inside the bucket holding the rank, like
+        Prometheus' histogram_quantile, and never exceeds the largest latency seen.
+        """
+        total = sum(self.buckets)
+        if not total:
+            return None
+        rank = fraction * total
+        lower = 0
+        seen = 0
+        for bound, count in zip(METRICS_LATENCY_BUCKETS, self.buckets):
+            if count and seen + count >= rank:
+                estimate = lower + (bound - lower) * (rank - seen) / count
+                return round(min(estimate, self.latency_max_ms), 1)
+            seen += count
+            lower = bound
+        return round(self.latency_max_ms, 1)
+
+    def as_dict(self):
+        """Return the series as a JSON-friendly dict."""
+        timed = sum(self.buckets)
+        return {
+            'requests': self.requests,
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'retries': self.retries,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'latency_ms': {
+                'mean': round(self.latency_sum_ms / timed, 1) if timed else None,
+                'p50': self.percentile(0.5),
+                'p95': self.percentile(0.95),
+                'max': round(self.latency_max_ms, 1),
+                'buckets': {
+                    **{f'le_{bound}': count for bound, count in zip(METRICS_LATENCY_BUCKETS, self.buckets)},
+                    'inf': self.buckets[-1],
+                },
+            },
+        }
+
+
+class MetricsRegistry:
+    """RequestMetrics keyed by endpoint and by VIN."""
+
+    def __init__(self):
+        """Initialize."""
+        self.endpoints = {}
+        self.vehicles = {}
+
+    def endpoint(self, endpoint):
+        """Return the metrics of an endpoint, creating them on first use."""
+        metrics = self.endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = RequestMetrics()
+        return metrics
+
+    def vehicle(self, vin):
+        """Return the metrics of a VIN, creating them on first use."""
+        metrics = self.vehicles.get(vin)
+        if metrics is None:
+            metrics = self.vehicles[vin] = RequestMetrics()
+        return metrics
+
+    def _series(self, endpoint, vin):
+        yield self.endpoint(endpoint)
+        if vin is not None:
+            yield self.vehicle(vin)
+
+    def record(self, endpoint, vin, status, latency_ms=None, bytes_out=0, bytes_in=0):
+        """Add one request to the endpoint and, if given, the VIN series."""
+        for metrics in self._series(endpoint, vin):
+            metrics.record(status, latency_ms, bytes_out, bytes_in)
+
+    def record_retry(self, endpoint, vin):
+        """Count one retried request."""
+        for metrics in self._series(endpoint, vin):
+            metrics.retries += 1
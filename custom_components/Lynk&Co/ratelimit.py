@@ -0,0 +1,161 @@
+"""Account-wide request rate limiting for the Lynk&Co cloud."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
+from homeassistant.core import callback
+
+from .const import (
+    DOMAIN,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_DEFAULT_RETRY_AFTER,
+    RATE_LIMIT_MAX_RETRY_AFTER,
+    RATE_LIMIT_PER_MINUTE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+PRIORITY_NAMES = {PRIORITY_COMMAND: 'command', PRIORITY_POLL: 'poll'}
+
+DATA_LIMITERS = 'rate_limiters'
+
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds of a Retry-After header, or the default."""
+    if value:
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                retry_at = None
+            seconds = None if retry_at is None else retry_at.timestamp() - (now or time.time())
+        if seconds is not None:
+            return min(max(0.0, seconds), RATE_LIMIT_MAX_RETRY_AFTER)
+    return RATE_LIMIT_DEFAULT_RETRY_AFTER
+
+
+class TokenBucketLimiter:
+    """Token bucket with a priority queue of waiters.
+
+    Requests take one token each. When the bucket is empty they queue, and
+    commands are served before background polls. A 429 pauses the bucket for
+    the Retry-After delay and lets it refill from a single token afterwards.
+    """
+
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST):
+        """Initialize."""
+        self.rate = per_minute / 60
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self.throttled = 0
+        self.stats = {
+            name: {'requests': 0, 'queued': 0, 'wait_ms': 0.0, 'max_wait_ms': 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    async def async_acquire(self, priority=PRIORITY_POLL):
+        """Wait for a token; return the seconds spent in the queue."""
+        started = time.monotonic()
+        if not self._waiters and self._take(started):
+            self._record(priority, 0.0)
+            return 0.0
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._schedule()
+        await future
+        waited = time.monotonic() - started
+        self._record(priority, waited)
+        return waited
+
+    @callback
+    def async_throttled(self, retry_after):
+        """Pause the bucket after the backend answered 429."""
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        # One request may go as soon as the pause ends, the rest refill from there
+        self._tokens = 1.0
+        self._updated = self._blocked_until
+        _LOGGER.debug("Rate limited by the backend, pausing requests for %.1fs", retry_after)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._schedule()
+
+    def as_dict(self):
+        """Return the queue statistics for diagnostics."""
+        return {
+            'tokens': round(self._refill(time.monotonic()), 2),
+            'queued': len(self._waiters),
+            'throttled': self.throttled,
+            'blocked_for': round(max(0.0, self._blocked_until - time.monotonic()), 1),
+            'priorities': self.stats,
+        }
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+        return self._tokens
+
+    def _take(self, now):
+        if now < self._blocked_until or self._refill(now) < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _record(self, priority, waited):
+        stats = self.stats[PRIORITY_NAMES[priority]]
+        stats['requests'] += 1
+        if waited:
+            waited_ms = waited * 1000
+            stats['queued'] += 1
+            stats['wait_ms'] += waited_ms
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], waited_ms)
+
+    def _schedule(self):
+        if self._timer is not None or not self._waiters:
+            return
+        now = time.monotonic()
+        delay = max(
+            self._blocked_until - now,
+            (1 - self._refill(now)) / self.rate,
+            0.0,
+        )
+        self._timer = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self):
+        self._timer = None
+        now = time.monotonic()
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # The caller was cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if not self._take(now):
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+        self._schedule()
+
+
+@callback
+def async_get_limiter(hass, username):
+    """Return the limiter shared by every config entry of one account."""
+    limiters = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_LIMITERS, {})
+    limiter = limiters.get(username)
+    if limiter is None:
+        limiter = limiters[username] = TokenBucketLimiter()
+    return limiter
@@ -0,0 +1,122 @@
+"""Add and remove per-vehicle entities as cars join or leave the account."""
+from homeassistant.core import callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, SIGNAL_VEHICLES_ADDED, SIGNAL_VEHICLES_REMOVED
+
+
+class EntitySpec:
+    """One entry of a platform's per-vehicle catalogue, described without building it."""
+
+    __slots__ = ('key', 'name', 'factory', 'enabled_default', 'paths', 'entity_category')
+
+    def __init__(self, key, name, factory, enabled_default=True, paths=(), entity_category=None):
+        """Initialize.
+
+        factory(vin, coordinator) builds the entity; paths are the status
+        paths it reads. A key of None means the unique_id is the VIN itself.
+        """
+        self.key = key
+        self.name = name
+        self.factory = factory
+        self.enabled_default = enabled_default
+        self.paths = paths
+        self.entity_category = entity_category
+
+    def unique_id(self, vin):
+        """Return the unique_id of this entity for one car."""
+        return vin if self.key is None else f"{vin}-{self.key}".lower()
+
+
+@callback
+def _async_enabled_specs(hass, config_entry, account, domain, specs, vin):
+    """Yield the specs to build for a car; register disabled placeholders for the rest.
+
+    Entities disabled in the registry are skipped. Disabled-by-default
+    entities new to the registry get a disabled entry without an entity
+    object, so they can be enabled from the UI; Home Assistant then reloads
+    the config entry and they are built.
+    """
+    registry = er.async_get(hass)
+    device_id = None
+    for spec in specs:
+        unique_id = spec.unique_id(vin)
+        entity_id = registry.async_get_entity_id(domain, DOMAIN, unique_id)
+        if entity_id is not None:
+            if not registry.async_get(entity_id).disabled:
+                yield spec
+            continue
+        if spec.enabled_default:
+            yield spec
+            continue
+        if device_id is None:
+            plate = account.vehicles[vin]["plateNo"]
+            device_id = dr.async_get(hass).async_get_or_create(
+                config_entry_id=config_entry.entry_id,
+                identifiers={(DOMAIN, vin)},
+                name=plate,
+                manufacturer="Lynk&Co",
+                model=plate,
+            ).id
+        registry.async_get_or_create(
+            domain, DOMAIN, unique_id,
+            suggested_object_id=spec.name,
+            config_entry=config_entry,
+            device_id=device_id,
+            disabled_by=er.RegistryEntryDisabler.INTEGRATION,
+            entity_category=spec.entity_category,
+            original_name=spec.name,
+        )
+
+
+@callback
+def async_track_vehicles(hass, config_entry, account, async_add_entities, domain, specs,
+                         update_before_add=False):
+    """Create a platform's enabled entities for every car, now and after each roster sync.
+
+    Entities are built from specs for the current cars right away, for new
+    cars on SIGNAL_VEHICLES_ADDED and removed, with their registry entries,
+    on SIGNAL_VEHICLES_REMOVED. The status paths of the built entities are
+    reported to the account so the coordinators skip the others.
+    """
+    entities = {}
+
+    @callback
+    def add_vehicles(vins, initial=False):
+        new_entities = []
+        paths = set()
+        added = []
+        for vin in vins:
+            coordinator = account.coordinators.get(vin)
+            if coordinator is None or vin in entities:
+                continue
+            entities[vin] = []
+            added.append(coordinator)
+            for spec in _async_enabled_specs(hass, config_entry, account, domain, specs, vin):
+                entities[vin].append(spec.factory(vin, coordinator))
+                paths.update(spec.paths)
+            new_entities.extend(entities[vin])
+        if account.async_use_paths(domain, paths) and not initial:
+            # The new cars were refreshed before their fields were extracted
+            for coordinator in added:
+                hass.async_create_task(coordinator.async_request_refresh())
+        if new_entities:
+            async_add_entities(new_entities, update_before_add)
+
+    @callback
+    def remove_vehicles(vins):
+        registry = er.async_get(hass)
+        for vin in vins:
+            for entity in entities.pop(vin, ()):
+                if entity.entity_id and registry.async_get(entity.entity_id):
+                    # Removing the registry entry also removes the entity
+                    registry.async_remove(entity.entity_id)
+                elif entity.hass is not None:
+                    hass.async_create_task(entity.async_remove(force_remove=True))
+
+    add_vehicles(list(account.coordinators), initial=True)
+    config_entry.async_on_unload(async_dispatcher_connect(
+        hass, SIGNAL_VEHICLES_ADDED.format(config_entry.entry_id), add_vehicles))
+    config_entry.async_on_unload(async_dispatcher_connect(
+        hass, SIGNAL_VEHICLES_REMOVED.format(config_entry.entry_id), remove_vehicles))
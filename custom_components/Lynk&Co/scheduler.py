@@ -0,0 +1,76 @@
+"""State-aware polling interval for the Lynk&Co coordinator."""
+import datetime
+import random
+
+from .const import DEFAULT_SCAN_INTERVAL, MIN_SCAN_INTERVAL
+
+LOCK_STATUS_KINDS = (
+    'doorLockStatusDriver',
+    'doorLockStatusDriverRear',
+    'doorLockStatusPassenger',
+    'doorLockStatusPassengerRear',
+)
+LOCK_STATUS_PATHS = tuple(
+    ('additionalVehicleStatus', 'drivingSafetyStatus', kind) for kind in LOCK_STATUS_KINDS
+)
+ENGINE_STATUS_PATH = ('basicVehicleStatus', 'engineStatus')
+SPEED_PATH = ('basicVehicleStatus', 'speed')
+
+
+def is_active(snapshot):
+    """Return True while the engine runs or the car moves."""
+    if snapshot.get(ENGINE_STATUS_PATH, 'ENGINE_OFF') != 'ENGINE_OFF':
+        return True
+    try:
+        return float(snapshot.get(SPEED_PATH) or 0) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def is_locked(snapshot):
+    """Return True when every door reports locked."""
+    return all(snapshot.get(path) == 1 for path in LOCK_STATUS_PATHS)
+
+
+class PollingScheduler:
+    """Pick the next update interval from the last snapshot.
+
+    Moving and unlocked cars are polled at the configured scan interval,
+    but never more often than every MIN_SCAN_INTERVAL; locked cars every
+    DEFAULT_SCAN_INTERVAL. Errors back off exponentially with jitter up to
+    the parked interval.
+    """
+
+    def __init__(self, scan_interval):
+        """Initialize."""
+        self.active_interval = max(MIN_SCAN_INTERVAL, scan_interval)
+        self.idle_interval = self.active_interval
+        self.parked_interval = max(DEFAULT_SCAN_INTERVAL, self.active_interval)
+        self._failures = 0
+
+    def interval_for(self, status):
+        """Return the interval in seconds suited to one VehicleSnapshot."""
+        if is_active(status):
+            return self.active_interval
+        if is_locked(status):
+            return self.parked_interval
+        return self.idle_interval
+
+    def next_interval(self, statuses):
+        """Return the interval after a successful refresh of all vehicles."""
+        self._failures = 0
+        seconds = min(
+            (self.interval_for(data) for data in statuses),
+            default=self.parked_interval,
+        )
+        return datetime.timedelta(seconds=seconds)
+
+    def failed(self):
+        """Return the interval after a failed refresh."""
+        self._failures += 1
+        ceiling = min(
+            self.parked_interval,
+            self.idle_interval * 2 ** min(self._failures - 1, 10),
+        )
+        seconds = ceiling / 2 + random.uniform(0, ceiling / 2)
+        return datetime.timedelta(seconds=max(self.active_interval, seconds))
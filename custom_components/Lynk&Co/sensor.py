@@ -1,28 +1,31 @@
 """Support for the Colorfulclouds service."""
+import datetime
+import functools
 import logging
-import string
-from homeassistant.const import (
-    ATTR_ATTRIBUTION,
-    ATTR_DEVICE_CLASS,
-    CONF_NAME,
-    DEVICE_CLASS_TEMPERATURE,
-)
-from homeassistant.helpers.entity import Entity
+from homeassistant.const import UnitOfLength
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.entity import Entity, EntityCategory
 
+from .accessors import SENSOR_ACCESSORS
+from .breaker import STATE_CLOSED, STATE_ORDER
+from .metrics import ENDPOINTS
+from .roster import EntitySpec, async_track_vehicles
+from .trips import TRIP_PATH
 from .const import (
-    ATTR_ICON,
-    ATTR_LABEL,
-    ATTR_VEHICLE_STATUS,
-    ATTR_ADD_VEHICLE_STATUS,
-    ATTR_FRIENDLY_NAME,
-    COORDINATOR,
+    ACCOUNT,
     DOMAIN,
+    METRICS_SCAN_INTERVAL,
     NAME,
-    OPTIONAL_SENSORS,
-    SENSOR_TYPES,
 )
 
 PARALLEL_UPDATES = 1
+# Only the request metrics sensors poll; they read in-memory counters
+SCAN_INTERVAL = datetime.timedelta(seconds=METRICS_SCAN_INTERVAL)
+TRIP_SENSORS = {
+    "current_trip": "Current trip",
+    "last_trip": "Last trip",
+}
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -30,12 +33,27 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add Colorfulclouds entities from a config_entry."""
     # name = config_entry.data[CONF_NAME]
 
-    coordinator = hass.data[DOMAIN][config_entry.entry_id][COORDINATOR]
+    account = hass.data[DOMAIN][config_entry.entry_id][ACCOUNT]
+
+    specs = [
+        EntitySpec(
+            kind, accessor.label,
+            lambda vin, coordinator, kind=kind: LynkCoSensor(vin, kind, coordinator),
+            accessor.enabled_default, (accessor.path,),
+        )
+        for kind, accessor in SENSOR_ACCESSORS.items()
+    ]
+    for trip, name in TRIP_SENSORS.items():
+        specs.append(EntitySpec(
+            trip, name, lambda vin, coordinator, trip=trip: LynkCoTripSensor(vin, trip, coordinator)))
+    specs.append(EntitySpec(
+        "request_metrics", "Cloud latency", LynkCoVehicleMetricsSensor,
+        enabled_default=False, entity_category=EntityCategory.DIAGNOSTIC))
+    async_track_vehicles(hass, config_entry, account, async_add_entities, SENSOR_DOMAIN, specs)
 
-    sensors = []
-    for i in range(len(coordinator.data)):
-        for sensor in SENSOR_TYPES:
-            sensors.append(LynkCoSensor(i, sensor, coordinator))
+    sensors = [LynkCoBreakerSensor(config_entry.entry_id, account)]
+    for endpoint in ENDPOINTS:
+        sensors.append(LynkCoEndpointMetricsSensor(config_entry.entry_id, account, endpoint))
     async_add_entities(sensors, False)
 
 
@@ -44,20 +62,20 @@ class LynkCoSensor(Entity):
 
     def __init__(self, vin, kind, coordinator, forecast_day=None):
         """Initialize."""
-        self._name = coordinator.data[vin]["plateNo"]
+        self._name = coordinator.account.vehicles[vin]["plateNo"]
         self.kind = kind
         self.vin = vin
         self.coordinator = coordinator
-        self._unique_id = coordinator.data[vin]["result"]['vin']
+        self._unique_id = vin
+        self._accessor = SENSOR_ACCESSORS[kind]
         self._device_class = None
-        self._attrs = {"friendly_name_cn":SENSOR_TYPES[self.kind][ATTR_FRIENDLY_NAME]}
-        self._unit_system = "Metric"
+        self._attrs = {"friendly_name_cn":self._accessor.friendly_name}
         self.forecast_day = forecast_day
 
     @property
     def name(self):
         """Return the name."""
-        return SENSOR_TYPES[self.kind][ATTR_LABEL]
+        return self._accessor.label
 
     @property
     def unique_id(self):
@@ -72,7 +90,6 @@ class LynkCoSensor(Entity):
             "identifiers": {(DOMAIN, self._unique_id)},
             "name": self._name,
             "manufacturer": "Lynk&Co",
-            "entry_type": "device",
             "model": self._name
         }
 
@@ -84,70 +101,313 @@ class LynkCoSensor(Entity):
     @property
     def available(self):
         """Return True if entity is available."""
-        return self.coordinator.last_update_success
+        return self.coordinator.available
+
+    @property
+    def assumed_state(self):
+        """Return True while showing the cached snapshot."""
+        return self.coordinator.stale
 
     @property
     def state(self):
         """Return the state."""
-        if self.kind == 'ecuWarningMessages':
-            return len(self.coordinator.data[self.vin]["vehicleStatus"][SENSOR_TYPES[self.kind][ATTR_VEHICLE_STATUS]][self.kind])
-        if self.kind == 'mainBatteryStatus':
-            return self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['maintenanceStatus'][self.kind]['stateOfCharge']
-        if SENSOR_TYPES[self.kind][ATTR_VEHICLE_STATUS] == 'additionalVehicleStatus':
-            return self.coordinator.data[self.vin]["vehicleStatus"][SENSOR_TYPES[self.kind][ATTR_VEHICLE_STATUS]][SENSOR_TYPES[self.kind][ATTR_ADD_VEHICLE_STATUS]][self.kind]
-        return self.coordinator.data[self.vin]["vehicleStatus"][SENSOR_TYPES[self.kind][ATTR_VEHICLE_STATUS]][self.kind]
+        return self._accessor.value(self.coordinator.data)
 
     @property
     def icon(self):
         """Return the icon."""
-        icon = SENSOR_TYPES[self.kind][ATTR_ICON]
-        if self.kind == 'engineStatus':
-            if self.coordinator.data[self.vin]["vehicleStatus"][SENSOR_TYPES[self.kind][ATTR_VEHICLE_STATUS]][self.kind]=='ENGINE_OFF':
-                icon = 'mdi:engine-off'
-        if self.kind.find('winStatus') >=0:
-            if self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['climateStatus'][self.kind]==0:
-                icon = 'mdi:window-shutter-alert'
-            elif self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['climateStatus'][self.kind]==1:
-                icon = 'mdi:window-shutter-open'
-        if self.kind == 'sunroofOpenStatus':
-            if self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['climateStatus'][self.kind]==0:
-                icon = 'mdi:window-open'
-
-        return icon
+        return self._accessor.icon(self.coordinator.data)
 
     @property
     def device_class(self):
         """Return the device_class."""
-        return SENSOR_TYPES[self.kind][ATTR_DEVICE_CLASS]
+        return self._accessor.device_class
 
     @property
     def unit_of_measurement(self):
         """Return the unit the value is expressed in."""
-        return SENSOR_TYPES[self.kind][self._unit_system]
+        return self._accessor.unit
 
     @property
-    def device_state_attributes(self):
+    def extra_state_attributes(self):
         """Return the state attributes."""
         if self.kind == 'mainBatteryStatus':
-            self._attrs["stateOfCharge"] =  self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['maintenanceStatus'][self.kind]['stateOfCharge']
-            self._attrs["chargeLevel"] =  self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['maintenanceStatus'][self.kind]['chargeLevel']
-            self._attrs["stateOfHealth"] =  self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['maintenanceStatus'][self.kind]['stateOfHealth']
-            self._attrs["voltage"] =  self.coordinator.data[self.vin]["vehicleStatus"]['additionalVehicleStatus']['maintenanceStatus'][self.kind]['voltage']
-        self._attrs["friendly_name"] = SENSOR_TYPES[self.kind][ATTR_FRIENDLY_NAME]
+            battery = self._accessor.raw(self.coordinator.data) or {}
+            for key in ('stateOfCharge', 'chargeLevel', 'stateOfHealth', 'voltage'):
+                self._attrs[key] = battery.get(key)
+        self._attrs["friendly_name"] = self._accessor.friendly_name
         return self._attrs
 
     @property
     def entity_registry_enabled_default(self):
         """Return if the entity should be enabled when first added to the entity registry."""
-        return bool(self.kind not in OPTIONAL_SENSORS)
+        return self._accessor.enabled_default
 
     async def async_added_to_hass(self):
         """Connect to dispatcher listening for entity data notifications."""
         self.async_on_remove(
-            self.coordinator.async_add_listener(self.async_write_ha_state)
+            self.coordinator.async_add_field_listener(
+                (self._accessor.path,), self.async_write_ha_state
+            )
         )
 
     async def async_update(self):
         """Update Colorfulclouds entity."""
         # _LOGGER.debug("weather_update: %s", self.coordinator.data['server_time'])
         await self.coordinator.async_request_refresh()
+
+
+class LynkCoTripSensor(Entity):
+    """Distance of the current or the last finished trip, details as attributes."""
+
+    def __init__(self, vin, kind, coordinator):
+        """Initialize."""
+        self._name = coordinator.account.vehicles[vin]["plateNo"]
+        self.kind = kind
+        self.vin = vin
+        self.coordinator = coordinator
+        self._unique_id = vin
+
+    @property
+    def _trip(self):
+        if self.kind == "current_trip":
+            return self.coordinator.trips.current
+        return self.coordinator.trips.last
+
+    @property
+    def name(self):
+        """Return the name."""
+        return TRIP_SENSORS[self.kind]
+
+    @property
+    def unique_id(self):
+        """Return a unique_id for this entity."""
+        return f"{self._unique_id}-{self.kind}".lower()
+
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return {
+            "identifiers": {(DOMAIN, self._unique_id)},
+            "name": self._name,
+            "manufacturer": "Lynk&Co",
+            "model": self._name
+        }
+
+    @property
+    def should_poll(self):
+        """Return the polling requirement of the entity."""
+        return False
+
+    @property
+    def available(self):
+        """Return True if entity is available."""
+        return self.coordinator.available
+
+    @property
+    def icon(self):
+        """Return the icon."""
+        return "mdi:map-marker-distance"
+
+    @property
+    def state(self):
+        """Return the trip distance, 0 while no trip is running."""
+        trip = self._trip
+        if trip is None:
+            return 0 if self.kind == "current_trip" else None
+        return round(trip.distance, 1)
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit the value is expressed in."""
+        return UnitOfLength.KILOMETERS
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes."""
+        trip = self._trip
+        return trip.as_dict() if trip is not None else {}
+
+    async def async_added_to_hass(self):
+        """Write the state whenever the trip totals change."""
+        self.async_on_remove(
+            self.coordinator.async_add_field_listener(
+                (TRIP_PATH,), self.async_write_ha_state
+            )
+        )
+
+
+class LynkCoBreakerSensor(Entity):
+    """Diagnostic sensor with the worst state of the account's endpoint breakers.
+
+    The per-car breakers are left out; they are reported under each car in
+    the diagnostics.
+    """
+
+    def __init__(self, entry_id, account):
+        """Initialize."""
+        self._entry_id = entry_id
+        self._client = account.client
+
+    @property
+    def name(self):
+        """Return the name."""
+        return "Cloud circuit breaker"
+
+    @property
+    def unique_id(self):
+        """Return a unique_id for this entity."""
+        return f"{self._entry_id}-circuit_breaker"
+
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return {
+            "identifiers": {(DOMAIN, self._entry_id)},
+            "name": f"{NAME} account",
+            "manufacturer": "Lynk&Co",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+    @property
+    def entity_category(self):
+        """Return the entity category."""
+        return EntityCategory.DIAGNOSTIC
+
+    @property
+    def should_poll(self):
+        """Return the polling requirement of the entity."""
+        return False
+
+    @property
+    def icon(self):
+        """Return the icon."""
+        if self.state == STATE_CLOSED:
+            return "mdi:cloud-check"
+        return "mdi:cloud-alert"
+
+    @property
+    def state(self):
+        """Return the worst state of the endpoint breakers."""
+        states = {breaker.state for breaker in self._client.breakers_for().values()}
+        return next((state for state in STATE_ORDER if state in states), STATE_CLOSED)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state of every endpoint breaker."""
+        return {
+            endpoint: breaker.as_dict()
+            for endpoint, breaker in self._client.breakers_for().items()
+        }
+
+    async def async_added_to_hass(self):
+        """Write the state whenever a breaker changes state."""
+        self.async_on_remove(
+            self._client.add_breaker_listener(self.async_write_ha_state)
+        )
+
+
+class LynkCoMetricsSensor(Entity):
+    """Disabled-by-default diagnostic sensor with the p95 latency of one request series."""
+
+    def __init__(self, get_metrics):
+        """Initialize.
+
+        get_metrics() returns the RequestMetrics series the sensor shows.
+        """
+        self._get_metrics = get_metrics
+
+    @property
+    def entity_category(self):
+        """Return the entity category."""
+        return EntityCategory.DIAGNOSTIC
+
+    @property
+    def entity_registry_enabled_default(self):
+        """Return if the entity should be enabled when first added to the entity registry."""
+        return False
+
+    @property
+    def should_poll(self):
+        """Poll the in-memory counters every SCAN_INTERVAL."""
+        return True
+
+    @property
+    def icon(self):
+        """Return the icon."""
+        return "mdi:timer-outline"
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit the value is expressed in."""
+        return "ms"
+
+    @property
+    def state(self):
+        """Return the 95th percentile latency."""
+        return self._get_metrics().percentile(0.95)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the counters and the latency histogram."""
+        return self._get_metrics().as_dict()
+
+
+class LynkCoEndpointMetricsSensor(LynkCoMetricsSensor):
+    """Request metrics of one cloud endpoint, across all cars of the account."""
+
+    def __init__(self, entry_id, account, endpoint):
+        """Initialize."""
+        super().__init__(functools.partial(account.client.metrics.endpoint, endpoint))
+        self._entry_id = entry_id
+        self.endpoint = endpoint
+
+    @property
+    def name(self):
+        """Return the name."""
+        return f"Cloud {self.endpoint} latency"
+
+    @property
+    def unique_id(self):
+        """Return a unique_id for this entity."""
+        return f"{self._entry_id}-metrics-{self.endpoint}"
+
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return {
+            "identifiers": {(DOMAIN, self._entry_id)},
+            "name": f"{NAME} account",
+            "manufacturer": "Lynk&Co",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+
+class LynkCoVehicleMetricsSensor(LynkCoMetricsSensor):
+    """Request metrics of one car, across its status and command requests."""
+
+    def __init__(self, vin, coordinator):
+        """Initialize."""
+        super().__init__(functools.partial(coordinator.account.client.metrics.vehicle, vin))
+        self._name = coordinator.account.vehicles[vin]["plateNo"]
+        self.vin = vin
+
+    @property
+    def name(self):
+        """Return the name."""
+        return "Cloud latency"
+
+    @property
+    def unique_id(self):
+        """Return a unique_id for this entity."""
+        return f"{self.vin}-request_metrics".lower()
+
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return {
+            "identifiers": {(DOMAIN, self.vin)},
+            "name": self._name,
+            "manufacturer": "Lynk&Co",
+            "model": self._name
+        }
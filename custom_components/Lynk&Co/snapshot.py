@@ -0,0 +1,175 @@
+"""Compact status snapshots holding only the leaf values the integration reads."""
+from .changes import status_path
+from .const import (
+    BINARY_SENSOR_TYPES,
+    DEFAULT_TRACKER_ATTRIBUTES,
+    SENSOR_TYPES,
+    TRACKER_ATTRIBUTES_FULL,
+)
+from .scheduler import ENGINE_STATUS_PATH, LOCK_STATUS_PATHS, SPEED_PATH
+from .telemetry import FIELDS
+
+UPDATE_TIME_PATH = ('updateTime',)
+LATITUDE_PATH = ('basicVehicleStatus', 'position', 'latitude')
+LONGITUDE_PATH = ('basicVehicleStatus', 'position', 'longitude')
+TRUSTED_PATH = ('basicVehicleStatus', 'position', 'posCanBeTrusted')
+
+
+def parse_projection(value):
+    """Return the status paths to expose, or None for the full payload."""
+    value = value.strip()
+    if value == TRACKER_ATTRIBUTES_FULL:
+        return None
+    return tuple(
+        tuple(path.strip().split('.')) for path in value.split(',') if path.strip()
+    )
+
+
+# Paths the scheduler, trips, telemetry, geofences and the tracker always read
+CORE_PATHS = tuple(dict.fromkeys(
+    [UPDATE_TIME_PATH, LATITUDE_PATH, LONGITUDE_PATH, TRUSTED_PATH,
+     ENGINE_STATUS_PATH, SPEED_PATH]
+    + list(LOCK_STATUS_PATHS)
+    + [path for _, path in FIELDS]
+    + list(parse_projection(DEFAULT_TRACKER_ATTRIBUTES))
+))
+# Every path an entity or one of the above reads. Accessors index into
+# snapshots by position, so these always come first.
+BASE_PATHS = tuple(dict.fromkeys(
+    [status_path(kind, description) for kind, description in SENSOR_TYPES.items()]
+    + [status_path(kind, description) for kind, description in BINARY_SENSOR_TYPES.items()]
+    + list(CORE_PATHS)
+))
+BASE_INDEX = {path: index for index, path in enumerate(BASE_PATHS)}
+
+
+class SnapshotSchema:
+    """Ordered leaf paths and the trie that extracts them in one pass.
+
+    Every path keeps its position, but once restrict() is called only
+    CORE_PATHS, the extra paths and the paths passed in are extracted; the
+    others stay None in every snapshot.
+    """
+
+    __slots__ = ('paths', 'index', 'wanted', '_required', '_trie')
+
+    def __init__(self, extra_paths=()):
+        """Initialize with BASE_PATHS followed by any extra paths."""
+        self.paths = tuple(dict.fromkeys(BASE_PATHS + tuple(extra_paths)))
+        self.index = {path: index for index, path in enumerate(self.paths)}
+        self._required = frozenset(CORE_PATHS + tuple(extra_paths))
+        self.wanted = None
+        self._trie = None
+        self._build_trie()
+
+    def _build_trie(self):
+        # key -> [leaf index or None, child trie or None]
+        trie = {}
+        for index, path in enumerate(self.paths):
+            if self.wanted is not None and path not in self.wanted:
+                continue
+            node = trie
+            for key in path[:-1]:
+                entry = node.setdefault(key, [None, None])
+                if entry[1] is None:
+                    entry[1] = {}
+                node = entry[1]
+            node.setdefault(path[-1], [None, None])[0] = index
+        self._trie = trie
+
+    def restrict(self, paths):
+        """Extract only the required paths and these from now on."""
+        self.wanted = self._required.union(paths)
+        self._build_trie()
+
+    def widen(self, paths):
+        """Also extract these paths; return True if any of them was skipped so far."""
+        if self.wanted is None or self.wanted.issuperset(paths):
+            return False
+        self.wanted = self.wanted.union(paths)
+        self._build_trie()
+        return True
+
+    def snapshot(self, tree, keep_raw=False):
+        """Build a VehicleSnapshot from a vehicleStatus tree; anything but a dict is empty."""
+        values = [None] * len(self.paths)
+        if isinstance(tree, dict):
+            _extract(tree, self._trie, values)
+        return VehicleSnapshot(self, tuple(values), tree if keep_raw else None)
+
+    def from_dict(self, flat):
+        """Build a VehicleSnapshot from VehicleSnapshot.as_dict() output."""
+        values = [None] * len(self.paths)
+        for key, value in flat.items():
+            index = self.index.get(tuple(key.split('.')))
+            if index is not None:
+                values[index] = value
+        return VehicleSnapshot(self, tuple(values))
+
+    def diff(self, old, new):
+        """Return the set of paths whose values differ between two snapshots."""
+        if old is None or old.schema is not self:
+            return set(self.paths)
+        paths = self.paths
+        return {
+            paths[index]
+            for index, (before, after) in enumerate(zip(old.values, new.values))
+            if before != after
+        }
+
+
+def _extract(tree, trie, values):
+    for key, (index, children) in trie.items():
+        value = tree.get(key)
+        if index is not None:
+            values[index] = value
+        if children is not None and isinstance(value, dict):
+            _extract(value, children, values)
+
+
+class VehicleSnapshot:
+    """Leaf values of one vehicleStatus payload, in schema order.
+
+    The decoded tree is dropped after extraction unless the schema was asked
+    to keep it, so a car costs one tuple instead of a tree of dicts.
+    """
+
+    __slots__ = ('schema', 'values', 'raw')
+
+    def __init__(self, schema, values, raw=None):
+        """Initialize."""
+        self.schema = schema
+        self.values = values
+        self.raw = raw
+
+    def get(self, path, default=None):
+        """Return the value at a vehicleStatus path."""
+        index = self.schema.index.get(path)
+        if index is None or self.values[index] is None:
+            return default
+        return self.values[index]
+
+    def as_dict(self):
+        """Return {dotted path: value} for storage."""
+        return {
+            '.'.join(path): value
+            for path, value in zip(self.schema.paths, self.values)
+            if value is not None
+        }
+
+    def as_tree(self):
+        """Return the raw tree if kept, else a tree rebuilt from the leaf values."""
+        if self.raw is not None:
+            return self.raw
+        tree = {}
+        for path, value in zip(self.schema.paths, self.values):
+            if value is None:
+                continue
+            node = tree
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+                if not isinstance(node, dict):
+                    break
+            else:
+                node.setdefault(path[-1], value)
+        return tree
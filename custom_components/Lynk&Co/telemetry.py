@@ -0,0 +1,118 @@
+"""Fixed-capacity telemetry history per vehicle."""
+import math
+import time
+from array import array
+
+from .const import TELEMETRY_CAPACITY
+
+NAN = float('nan')
+
+# Column name and vehicleStatus path; latitude and longitude are converted to degrees
+FIELDS = (
+    ('speed', ('basicVehicleStatus', 'speed')),
+    ('engineSpeed', ('additionalVehicleStatus', 'drivingBehaviourStatus', 'engineSpeed')),
+    ('fuelLevelStatus', ('additionalVehicleStatus', 'runningStatus', 'fuelLevelStatus')),
+    ('odometer', ('additionalVehicleStatus', 'maintenanceStatus', 'odometer')),
+    ('distanceToEmpty', ('basicVehicleStatus', 'distanceToEmpty')),
+    ('exteriorTemp', ('additionalVehicleStatus', 'climateStatus', 'exteriorTemp')),
+    ('latitude', ('basicVehicleStatus', 'position', 'latitude')),
+    ('longitude', ('basicVehicleStatus', 'position', 'longitude')),
+)
+POSITION_FIELDS = ('latitude', 'longitude')
+POSITION_SCALE = 3600000
+COLUMNS = ('time',) + tuple(name for name, _ in FIELDS)
+
+
+def status_number(snapshot, path):
+    """Return the number at a vehicleStatus path, or NaN if it is missing."""
+    try:
+        return float(snapshot.get(path))
+    except (TypeError, ValueError):
+        return NAN
+
+
+def sample_time(snapshot):
+    """Return the sample time of a VehicleSnapshot in epoch seconds."""
+    update_time = status_number(snapshot, ('updateTime',))
+    return time.time() if math.isnan(update_time) else update_time / 1000
+
+
+class TelemetryBuffer:
+    """Ring buffer with one array('d') column per numeric field.
+
+    All columns are allocated up front, so memory is fixed at
+    capacity * len(COLUMNS) * 8 bytes per car. Missing values are stored as
+    NaN. Samples are kept in time order; a snapshot whose updateTime is not
+    newer than the last sample is ignored, so unchanged polls take no space.
+    """
+
+    def __init__(self, capacity=TELEMETRY_CAPACITY):
+        """Initialize."""
+        self.capacity = capacity
+        self._columns = {name: array('d', [NAN]) * capacity for name in COLUMNS}
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        """Return the number of samples held."""
+        return self._count
+
+    @property
+    def nbytes(self):
+        """Return the bytes held by the columns."""
+        return sum(column.itemsize * len(column) for column in self._columns.values())
+
+    @property
+    def last_time(self):
+        """Return the time of the newest sample, or None when empty."""
+        if not self._count:
+            return None
+        return self._columns['time'][(self._head - 1) % self.capacity]
+
+    def append(self, status):
+        """Add one VehicleSnapshot; return False if it is not newer than the last sample."""
+        timestamp = sample_time(status)
+        last_time = self.last_time
+        if last_time is not None and timestamp <= last_time:
+            return False
+        head = self._head
+        self._columns['time'][head] = timestamp
+        for name, path in FIELDS:
+            value = status_number(status, path)
+            if name in POSITION_FIELDS:
+                value /= POSITION_SCALE
+            self._columns[name][head] = value
+        self._head = (head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        return True
+
+    def last(self, count, columns=COLUMNS):
+        """Return the newest count samples, oldest first, as {column: [values]}."""
+        return self._window(max(0, self._count - count), columns)
+
+    def since(self, seconds, columns=COLUMNS, now=None):
+        """Return the samples of the last seconds, oldest first, as {column: [values]}."""
+        cutoff = (time.time() if now is None else now) - seconds
+        times = self._columns['time']
+        start = self._head - self._count
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if times[(start + middle) % self.capacity] < cutoff:
+                low = middle + 1
+            else:
+                high = middle
+        return self._window(low, columns)
+
+    def _window(self, offset, columns):
+        first = (self._head - self._count + offset) % self.capacity
+        size = self._count - offset
+        end = first + size
+        window = {}
+        for name in columns:
+            column = self._columns[name]
+            if end <= self.capacity:
+                window[name] = column[first:end].tolist()
+            else:
+                window[name] = column[first:].tolist() + column[:end - self.capacity].tolist()
+        return window
@@ -0,0 +1,165 @@
+"""Sampled, redacted request and refresh tracing.
+
+Traces are written to this module's logger at debug level, so they can be
+switched on without the rest of the integration's debug output:
+
+    logger:
+      logs:
+        custom_components.lynkco.tracing: debug
+
+While that logger is off, or a cycle is not sampled, Tracer.start returns
+NULL_TRACE, whose spans and events do nothing.
+"""
+import json
+import logging
+import re
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+REDACTED = '**REDACTED**'
+REDACT_KEYS = {
+    'accesstoken', 'altitude', 'authorization', 'latitude', 'longitude', 'password',
+    'plateno', 'refreshtoken', 'token', 'userid', 'username', 'vin',
+}
+_VIN = re.compile(r'\b[A-Z0-9]{17}\b')
+_KEYS = '|'.join(sorted(REDACT_KEYS))
+# key=value in URLs and form bodies, "key": value in JSON text
+_QUERY_FIELD = re.compile(r'(?i)\b({})=[^&\s]*'.format(_KEYS))
+_JSON_FIELD = re.compile(r'(?i)("(?:{})"\s*:\s*)("(?:[^"\\]|\\.)*"|[-\d.eE+]+)'.format(_KEYS))
+
+
+def mask_vin(vin):
+    """Return the VIN reduced to its last four characters."""
+    return '***' + vin[-4:] if vin else vin
+
+
+def redact(value):
+    """Return value with tokens, VINs, user ids and positions replaced."""
+    if isinstance(value, dict):
+        return {
+            redact(key): REDACTED if str(key).lower() in REDACT_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        value = _QUERY_FIELD.sub(r'\1=' + REDACTED, value)
+        value = _JSON_FIELD.sub(r'\1"' + REDACTED + '"', value)
+        return _VIN.sub(lambda m: mask_vin(m.group()), value)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    # Errors and other objects are logged as text, which may hold a URL
+    return redact(str(value))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _NullTrace:
+    """Trace of an unsampled cycle; every method is a no-op."""
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def span(self, name):
+        """Return a span that records nothing."""
+        return _NULL_SPAN
+
+    def event(self, name, **fields):
+        """Drop the event."""
+
+    def end(self, **fields):
+        """Drop the trace."""
+
+
+NULL_TRACE = _NullTrace()
+
+
+class _Span:
+    __slots__ = ('_trace', '_name', '_started')
+
+    def __init__(self, trace, name):
+        self._trace = trace
+        self._name = name
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._trace.spans.append((self._name, (time.perf_counter() - self._started) * 1000))
+        return False
+
+
+class Trace:
+    """Timing spans and events of one sampled operation, logged once at the end."""
+
+    __slots__ = ('name', 'vin', 'spans', 'events', '_started')
+
+    def __init__(self, name, vin=None):
+        """Initialize."""
+        self.name = name
+        self.vin = vin
+        self.spans = []
+        self.events = []
+        self._started = time.perf_counter()
+
+    def span(self, name):
+        """Return a context manager that times one stage."""
+        return _Span(self, name)
+
+    def event(self, name, **fields):
+        """Record a named set of fields; they are redacted when logged."""
+        self.events.append((name, fields))
+
+    def end(self, **fields):
+        """Log the trace with its total time, stage timings and redacted events."""
+        total = (time.perf_counter() - self._started) * 1000
+        stages = ' '.join('{}={:.1f}ms'.format(name, ms) for name, ms in self.spans)
+        if fields:
+            self.events.append(('end', fields))
+        _LOGGER.debug(
+            "%s %s total=%.1fms %s %s", self.name, mask_vin(self.vin) or '-', total, stages,
+            json.dumps(redact(dict(self.events))) if self.events else '')
+
+
+class Tracer:
+    """Start a Trace for 1 in sample_rate operations of each name and VIN.
+
+    A sample_rate of 0 disables tracing regardless of the log level.
+    """
+
+    def __init__(self, sample_rate=1):
+        """Initialize."""
+        self.sample_rate = max(0, int(sample_rate))
+        self._counts = {}
+
+    @property
+    def enabled(self):
+        """Return True if traces are sampled and logged."""
+        return self.sample_rate > 0 and _LOGGER.isEnabledFor(logging.DEBUG)
+
+    def start(self, name, vin=None):
+        """Return a Trace if this operation is sampled, else NULL_TRACE."""
+        if not self.enabled:
+            return NULL_TRACE
+        key = (name, vin)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.sample_rate:
+            return NULL_TRACE
+        return Trace(name, vin)
@@ -0,0 +1,101 @@
+"""Write suppression and online track simplification for the device tracker."""
+import collections
+import math
+
+from homeassistant.util import location
+
+from .const import TRACKER_MAX_BUFFER, TRACKER_MAX_SILENCE, TRACKER_TRACK_POINTS
+
+_METERS_PER_DEGREE = 111320.0
+
+
+def _offset(origin, point):
+    """Return point in meters east and north of origin (equirectangular)."""
+    x = (point[2] - origin[2]) * _METERS_PER_DEGREE * math.cos(math.radians(origin[1]))
+    y = (point[1] - origin[1]) * _METERS_PER_DEGREE
+    return x, y
+
+
+def deviation(start, end, point):
+    """Return the distance in meters of point from the segment start-end."""
+    ex, ey = _offset(start, end)
+    px, py = _offset(start, point)
+    length = ex * ex + ey * ey
+    if length == 0:
+        return math.hypot(px, py)
+    t = max(0.0, min(1.0, (px * ex + py * ey) / length))
+    return math.hypot(px - t * ex, py - t * ey)
+
+
+class TrackFilter:
+    """Decide which positions are written and keep a simplified track of them.
+
+    Points are (time, latitude, longitude). A point closer than min_distance
+    to the last written point is dropped unless the position precision
+    changed or the car started or stopped; every other point is written at
+    once, so the shown position never lags behind the car. A min_distance of
+    0 writes every point.
+
+    Written points also feed track, the stored history, simplified as they
+    arrive with the opening-window form of Douglas-Peucker: points are held
+    while each held point lies within min_distance of the straight line from
+    the last vertex to the newest point. When a point breaks that corridor,
+    the last point that still fitted becomes a vertex with its own time.
+    Held points also close a segment when the car stops, after max_silence
+    seconds and once max_buffer points are held. Only the last max_points
+    vertices are kept.
+    """
+
+    def __init__(self, min_distance, max_silence=TRACKER_MAX_SILENCE, max_buffer=TRACKER_MAX_BUFFER,
+                 max_points=TRACKER_TRACK_POINTS):
+        """Initialize."""
+        self.min_distance = min_distance
+        self.max_silence = max_silence
+        self.max_buffer = max_buffer
+        self.last = None
+        self.written = 0
+        self.skipped = 0
+        self._trusted = None
+        self._active = None
+        self._vertices = collections.deque(maxlen=max_points)
+        self._held = []
+
+    @property
+    def track(self):
+        """Return the simplified track, oldest first, ending at the last written point."""
+        if self._held:
+            return [*self._vertices, self._held[-1]]
+        return list(self._vertices)
+
+    def update(self, point, trusted=None, active=True, force=False):
+        """Return True if a new position should be written."""
+        if not (force or not self.min_distance or self.last is None
+                or trusted != self._trusted or active != self._active
+                or location.distance(self.last[1], self.last[2], point[1], point[2]) >= self.min_distance):
+            self.skipped += 1
+            return False
+        self._trusted = trusted
+        self._active = active
+        self.last = point
+        self.written += 1
+        self._simplify(point, active)
+        return True
+
+    def _simplify(self, point, active):
+        if not self._vertices:
+            self._vertices.append(point)
+            return
+        anchor = self._vertices[-1]
+        if self._held and (
+                point[0] - anchor[0] >= self.max_silence
+                or len(self._held) >= self.max_buffer
+                or any(deviation(anchor, point, held) > self.min_distance for held in self._held)):
+            # The last point that fitted the corridor is a corner of the track
+            self._vertices.append(self._held[-1])
+            self._held = []
+        if active:
+            self._held.append(point)
+        else:
+            # A stop always ends a segment
+            self._vertices.append(point)
+            self._held = []
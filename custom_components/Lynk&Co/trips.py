@@ -0,0 +1,152 @@
+"""Incremental trip detection from vehicle status updates."""
+import math
+
+from homeassistant.util import location
+
+from .scheduler import is_active
+from .telemetry import NAN, POSITION_SCALE, sample_time, status_number
+
+# Pseudo status path that trip sensors subscribe to
+TRIP_PATH = ('trip',)
+
+_ODOMETER = ('additionalVehicleStatus', 'maintenanceStatus', 'odometer')
+_FUEL = ('additionalVehicleStatus', 'runningStatus', 'fuelLevelStatus')
+_LATITUDE = ('basicVehicleStatus', 'position', 'latitude')
+_LONGITUDE = ('basicVehicleStatus', 'position', 'longitude')
+
+
+def _position(status):
+    try:
+        return (float(status.get(_LATITUDE)) / POSITION_SCALE,
+                float(status.get(_LONGITUDE)) / POSITION_SCALE)
+    except (TypeError, ValueError):
+        return None
+
+
+class Trip:
+    """Running totals of one trip; every update is O(1)."""
+
+    __slots__ = (
+        'start', 'last_active', 'start_odometer', 'odometer',
+        'start_fuel', 'fuel', 'path_distance', 'position', 'active',
+    )
+
+    def __init__(self, now, odometer, fuel, position):
+        """Initialize."""
+        self.start = now
+        self.last_active = now
+        self.start_odometer = odometer
+        self.odometer = odometer
+        self.start_fuel = fuel
+        self.fuel = fuel
+        self.path_distance = 0.0
+        self.position = position
+        self.active = True
+
+    def add(self, now, active, odometer, fuel, position):
+        """Fold one sample into the totals."""
+        if not math.isnan(odometer):
+            if math.isnan(self.start_odometer):
+                self.start_odometer = odometer
+            self.odometer = odometer
+        if not math.isnan(fuel):
+            if math.isnan(self.start_fuel):
+                self.start_fuel = fuel
+            self.fuel = fuel
+        if position is not None:
+            if self.position is not None:
+                self.path_distance += location.distance(*self.position, *position) or 0.0
+            self.position = position
+        self.active = active
+        if active:
+            self.last_active = now
+
+    @property
+    def distance(self):
+        """Return the distance in km, from the odometer or else from the positions."""
+        if not math.isnan(self.start_odometer) and self.odometer > self.start_odometer:
+            return self.odometer - self.start_odometer
+        return self.path_distance / 1000
+
+    @property
+    def duration(self):
+        """Return the seconds from the start to the last moment the car was active."""
+        return self.last_active - self.start
+
+    @property
+    def average_speed(self):
+        """Return the average speed in km/h."""
+        if self.duration <= 0:
+            return 0.0
+        return self.distance / self.duration * 3600
+
+    @property
+    def fuel_used(self):
+        """Return the drop in fuel level, or None if it is unknown."""
+        if math.isnan(self.start_fuel) or math.isnan(self.fuel):
+            return None
+        return max(0.0, self.start_fuel - self.fuel)
+
+    def as_dict(self):
+        """Return the trip for sensor attributes and events."""
+        fuel_used = self.fuel_used
+        return {
+            'start': self.start,
+            'end': self.last_active,
+            'distance': round(self.distance, 2),
+            'duration': round(self.duration),
+            'average_speed': round(self.average_speed, 1),
+            'fuel_used': None if fuel_used is None else round(fuel_used, 2),
+        }
+
+
+class TripDetector:
+    """Open a trip on engine start or movement, close it after idle_timeout seconds.
+
+    Only the running totals of the current trip and the last finished trip
+    are kept; no history is rescanned.
+    """
+
+    def __init__(self, idle_timeout):
+        """Initialize."""
+        self.idle_timeout = idle_timeout
+        self.current = None
+        self.last = None
+        self._odometer = NAN
+
+    def update(self, status):
+        """Feed one VehicleSnapshot; return the trip it ended, if any."""
+        now = sample_time(status)
+        odometer = status_number(status, _ODOMETER)
+        fuel = status_number(status, _FUEL)
+        position = _position(status)
+        previous = self._odometer
+        moved = odometer > previous
+        if not math.isnan(odometer):
+            self._odometer = odometer
+        active = is_active(status) or moved
+
+        # A car that was idle long enough starts a new trip even if it drives again
+        ended = self.expire(now)
+        if self.current is not None:
+            self.current.add(now, active, odometer, fuel, position)
+        elif active:
+            # Count the distance that revealed the movement
+            self.current = Trip(now, previous if moved else odometer, fuel, position)
+            self.current.odometer = odometer
+        return ended
+
+    def expire(self, now):
+        """Close the current trip if the car has been idle long enough; return it."""
+        trip = self.current
+        if trip is None or trip.active or now - trip.last_active < self.idle_timeout:
+            return None
+        self.current = None
+        self.last = trip
+        return trip
+
+    def idle_deadline(self):
+        """Return when the idle current trip closes unless the car becomes active again."""
+        if self.current is None or self.current.active:
+            return None
+        return self.current.last_active + self.idle_timeout
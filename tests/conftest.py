@@ -0,0 +1,9 @@
+"""Put the repository root on sys.path so the integration package can be imported.
+
+The package directory is named Lynk&Co, so tests load its modules with
+importlib.import_module('custom_components.Lynk&Co.<module>').
+"""
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
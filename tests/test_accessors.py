@@ -0,0 +1,16 @@
+"""Tests for the compiled sensor and binary sensor accessors."""
+import importlib
+
+import pytest
+
+accessors = importlib.import_module('custom_components.Lynk&Co.accessors')
+
+ALL = list(accessors.SENSOR_ACCESSORS.values()) + list(accessors.BINARY_SENSOR_ACCESSORS.values())
+
+
+@pytest.mark.parametrize('accessor', ALL, ids=lambda accessor: accessor.kind)
+def test_no_snapshot_yet(accessor):
+    """A car whose first refresh failed has no snapshot; entities must still render."""
+    assert accessor.raw(None) is None
+    assert accessor.value(None) is None
+    assert accessor.icon(None) == accessor.icon_default
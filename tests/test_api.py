@@ -0,0 +1,39 @@
+"""Tests for response decoding in the HTTP client."""
+import asyncio
+import importlib
+
+import pytest
+
+api = importlib.import_module('custom_components.Lynk&Co.api')
+exceptions = importlib.import_module('custom_components.Lynk&Co.exceptions')
+
+
+def request(status, body):
+    """Decode one canned response through LynkCoClient.async_request."""
+    client = api.LynkCoClient()
+
+    async def send(*args, **kwargs):
+        return status, {}, body
+
+    client._async_send = send
+    return asyncio.run(client.async_request('GET', 'vehicles', 'http://mock'))
+
+
+def test_json_body_is_decoded():
+    response = request(200, b'{"list": []}')
+    assert response.data == {'list': []}
+    assert response.size == 12
+
+
+def test_invalid_json_on_success_raises_api_error():
+    with pytest.raises(exceptions.LynkCoApiError) as error:
+        request(200, b'<html>maintenance</html>')
+    assert error.value.status == 200
+
+
+def test_invalid_json_on_error_decodes_to_none():
+    assert request(502, b'<html>bad gateway</html>').data is None
+
+
+def test_empty_body_decodes_to_none():
+    assert request(200, b'').data is None
@@ -0,0 +1,116 @@
+"""Tests for the token lifecycle."""
+import asyncio
+import importlib
+
+import pytest
+
+api = importlib.import_module('custom_components.Lynk&Co.api')
+auth = importlib.import_module('custom_components.Lynk&Co.auth')
+exceptions = importlib.import_module('custom_components.Lynk&Co.exceptions')
+
+LOGIN = {
+    'resultMessage': 'Success',
+    'accessToken': 'access',
+    'refreshToken': 'refresh',
+    'userId': 'user',
+    'expiresIn': 3600,
+}
+
+
+class FakeClient:
+    """Answer each endpoint with a fixed status and body and count the calls."""
+
+    def __init__(self, **responses):
+        self.responses = responses
+        self.calls = []
+
+    def url(self, path, *args):
+        return path.format(*args)
+
+    async def async_request(self, method, endpoint, url, **kwargs):
+        self.calls.append(endpoint)
+        if isinstance(self.responses[endpoint], Exception):
+            raise self.responses[endpoint]
+        status, data = self.responses[endpoint]
+        return api.ApiResponse(status, {}, data, 0)
+
+
+def renew(client):
+    """Log in, then force two renewals and return the endpoints called."""
+    async def run():
+        lynkco = auth.LynkCoAuth(client, 'user', 'secret')
+        await lynkco.async_get_token()
+        for _ in range(2):
+            lynkco.invalidate()
+            await lynkco.async_get_token()
+        return lynkco
+    asyncio.run(run())
+    return client.calls
+
+
+def test_refresh_token_renews():
+    refreshed = dict(LOGIN, accessToken='renewed')
+    client = FakeClient(login=(200, LOGIN), token_refresh=(200, refreshed))
+    assert renew(client) == ['login', 'token_refresh', 'token_refresh']
+
+
+def test_rejected_refresh_logs_in():
+    client = FakeClient(login=(200, LOGIN), token_refresh=(401, None))
+    assert renew(client) == ['login', 'token_refresh', 'login', 'token_refresh', 'login']
+
+
+@pytest.mark.parametrize('status', [400, 404, 405])
+def test_missing_refresh_endpoint_falls_back_to_login(status):
+    client = FakeClient(login=(200, LOGIN), token_refresh=(status, None))
+    assert renew(client) == ['login', 'token_refresh', 'login', 'login']
+
+
+@pytest.mark.parametrize('failure', [(503, None), asyncio.TimeoutError()], ids=['503', 'timeout'])
+def test_failed_refresh_keeps_a_valid_token(monkeypatch, failure):
+    client = FakeClient(login=(200, LOGIN), token_refresh=failure)
+    now = [1000.0]
+    monkeypatch.setattr(auth.time, 'monotonic', lambda: now[0])
+
+    async def run():
+        lynkco = auth.LynkCoAuth(client, 'user', 'secret')
+        await lynkco.async_get_token()
+        # Inside the refresh margin, but the token has not expired yet
+        now[0] += LOGIN['expiresIn'] - 60
+        return await lynkco.async_get_token()
+
+    assert asyncio.run(run()) == 'access'
+    assert client.calls == ['login', 'token_refresh']
+
+
+@pytest.mark.parametrize('failure', [(503, None), asyncio.TimeoutError()], ids=['503', 'timeout'])
+def test_failed_refresh_of_an_expired_token_logs_in(failure):
+    client = FakeClient(login=(200, LOGIN), token_refresh=failure)
+    assert renew(client) == ['login', 'token_refresh', 'login', 'token_refresh', 'login']
+
+
+@pytest.mark.parametrize('body', [
+    None,
+    ['Success'],
+    {'resultMessage': 'Success', 'accessToken': 'access'},
+    {'resultMessage': 'Success', 'userId': 'user'},
+], ids=['null', 'list', 'no user', 'no token'])
+def test_malformed_login_response_is_an_api_error(body):
+    client = FakeClient(login=(200, body))
+    with pytest.raises(exceptions.LynkCoApiError):
+        asyncio.run(auth.LynkCoAuth(client, 'user', 'secret').async_login())
+
+
+def test_malformed_refresh_response_logs_in():
+    client = FakeClient(login=(200, LOGIN), token_refresh=(200, {'resultMessage': 'Success'}))
+    assert renew(client) == ['login', 'token_refresh', 'login', 'token_refresh', 'login']
+
+
+def test_invalid_token_lifetime_uses_the_default():
+    client = FakeClient(login=(200, dict(LOGIN, expiresIn='soon')))
+
+    async def run():
+        lynkco = auth.LynkCoAuth(client, 'user', 'secret')
+        await lynkco.async_login()
+        return lynkco._expires_at - auth.time.monotonic()
+
+    assert asyncio.run(run()) == pytest.approx(auth.TOKEN_LIFETIME, abs=5)
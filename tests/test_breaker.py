@@ -0,0 +1,140 @@
+"""Tests for the endpoint circuit breakers."""
+import importlib
+import types
+
+import pytest
+
+api = importlib.import_module('custom_components.Lynk&Co.api')
+breaker_module = importlib.import_module('custom_components.Lynk&Co.breaker')
+const = importlib.import_module('custom_components.Lynk&Co.const')
+exceptions = importlib.import_module('custom_components.Lynk&Co.exceptions')
+
+
+class Clock:
+    """Stand-in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, 'monotonic', clock)
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(const.BREAKER_FAILURE_THRESHOLD):
+        breaker.record_failure(breaker.before_request())
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = breaker_module.CircuitBreaker('status')
+    for _ in range(const.BREAKER_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    assert breaker.state == breaker_module.STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == breaker_module.STATE_OPEN
+    with pytest.raises(exceptions.LynkCoCircuitOpenError):
+        breaker.before_request()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = breaker_module.CircuitBreaker('status')
+    for _ in range(const.BREAKER_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == breaker_module.STATE_CLOSED
+
+
+def test_in_flight_failures_do_not_trip_again(clock):
+    breaker = breaker_module.CircuitBreaker('status')
+    probes = [breaker.before_request() for _ in range(const.BREAKER_FAILURE_THRESHOLD + 1)]
+    retry_at = None
+    for probe in probes:
+        breaker.record_failure(probe)
+        retry_at = retry_at or breaker.retry_at
+    assert breaker.trips == 1
+    assert breaker.retry_at == retry_at
+    assert retry_at - clock.now <= const.BREAKER_BASE_DELAY
+
+
+def test_single_probe_after_the_open_period(clock):
+    breaker = breaker_module.CircuitBreaker('status')
+    open_breaker(breaker)
+    clock.now = breaker.retry_at
+    assert breaker.before_request() is True
+    assert breaker.state == breaker_module.STATE_HALF_OPEN
+    with pytest.raises(exceptions.LynkCoCircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == breaker_module.STATE_CLOSED
+    assert breaker.trips == 0
+
+
+def test_failed_probe_doubles_the_open_period(clock, monkeypatch):
+    monkeypatch.setattr(breaker_module.random, 'uniform', lambda low, high: high)
+    breaker = breaker_module.CircuitBreaker('status')
+    open_breaker(breaker)
+    assert breaker.retry_at - clock.now == const.BREAKER_BASE_DELAY
+    clock.now = breaker.retry_at
+    breaker.record_failure(breaker.before_request())
+    assert breaker.state == breaker_module.STATE_OPEN
+    assert breaker.retry_at - clock.now == 2 * const.BREAKER_BASE_DELAY
+
+
+def test_only_the_probe_result_counts_while_half_open(clock):
+    breaker = breaker_module.CircuitBreaker('status')
+    open_breaker(breaker)
+    clock.now = breaker.retry_at
+    probe = breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == breaker_module.STATE_HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == breaker_module.STATE_CLOSED
+    assert probe
+
+
+def test_released_probe_lets_the_next_request_probe(clock):
+    breaker = breaker_module.CircuitBreaker('status')
+    open_breaker(breaker)
+    clock.now = breaker.retry_at
+    assert breaker.before_request()
+    breaker.release()
+    assert breaker.before_request()
+
+
+def test_open_period_is_capped(clock, monkeypatch):
+    monkeypatch.setattr(breaker_module.random, 'uniform', lambda low, high: high)
+    breaker = breaker_module.CircuitBreaker('status')
+    open_breaker(breaker)
+    for _ in range(20):
+        clock.now = breaker.retry_at
+        breaker.record_failure(breaker.before_request())
+    assert breaker.retry_at - clock.now == const.BREAKER_MAX_DELAY
+
+
+def test_cars_have_breakers_of_their_own():
+    client = api.LynkCoClient()
+    assert client.breaker('status', 'VIN1') is not client.breaker('status', 'VIN2')
+    assert client.breaker('status', 'VIN1') is client.breaker('status', 'VIN1')
+    assert client.breaker('login') is client.breaker('login')
+
+
+def test_account_sensor_ignores_per_car_breakers(clock):
+    sensor = importlib.import_module('custom_components.Lynk&Co.sensor')
+    client = api.LynkCoClient()
+    entity = sensor.LynkCoBreakerSensor('entry', types.SimpleNamespace(client=client))
+    open_breaker(client.breaker('status', 'VIN_A'))
+    client.breaker('vehicles')
+    assert entity.state == breaker_module.STATE_CLOSED
+    assert list(entity.extra_state_attributes) == ['vehicles']
+    assert list(client.breakers_for('VIN_A')) == ['status']
+
+    open_breaker(client.breaker('login'))
+    assert entity.state == breaker_module.STATE_OPEN
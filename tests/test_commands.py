@@ -0,0 +1,68 @@
+"""Tests for command completion tracking."""
+import asyncio
+import importlib
+import tempfile
+import time
+
+from homeassistant.core import HomeAssistant
+
+commands = importlib.import_module('custom_components.Lynk&Co.commands')
+const = importlib.import_module('custom_components.Lynk&Co.const')
+scheduler = importlib.import_module('custom_components.Lynk&Co.scheduler')
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+
+SCHEMA = snapshot.SnapshotSchema()
+VIN = 'LB1234567890'
+
+
+def status(locked):
+    doors = {kind: 1 if locked else 0 for kind in scheduler.LOCK_STATUS_KINDS}
+    return SCHEMA.snapshot({'additionalVehicleStatus': {'drivingSafetyStatus': doors}})
+
+
+def track(monkeypatch, service, before, after):
+    """Track one command; return the confirmation events, latencies and refreshes."""
+    monkeypatch.setattr(commands, 'CONFIRM_POLL_DELAYS', (0, 0))
+
+    async def run():
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            events = []
+            hass.bus.async_listen(const.EVENT_COMMAND_CONFIRMED, lambda event: events.append(event.data))
+            current = [before]
+            refreshes = []
+
+            async def refresh_vehicle(vin):
+                refreshes.append(vin)
+                current[0] = after
+                return after
+
+            tracker = commands.CompletionTracker(hass, lambda vin: current[0], refresh_vehicle)
+            tracker.async_track(VIN, service, time.monotonic(), before)
+            await hass.async_block_till_done()
+            await tracker.async_shutdown()
+            await hass.async_stop(force=True)
+            return events, tracker.as_dict()['latencies'], refreshes
+
+    return asyncio.run(run())
+
+
+def test_transition_is_confirmed(monkeypatch):
+    events, latencies, refreshes = track(monkeypatch, 'lock', status(False), status(True))
+    assert refreshes == [VIN]
+    assert [event['confirmed'] for event in events] == [True]
+    assert [latency['service'] for latency in latencies] == ['lock']
+
+
+def test_car_already_in_the_target_state_is_not_watched(monkeypatch):
+    events, latencies, refreshes = track(monkeypatch, 'lock', status(True), status(True))
+    assert refreshes == []
+    assert events == []
+    assert latencies == []
+
+
+def test_unconfirmed_command_records_no_latency(monkeypatch):
+    events, latencies, refreshes = track(monkeypatch, 'unlock', status(True), status(True))
+    assert refreshes == [VIN, VIN]
+    assert [event['confirmed'] for event in events] == [False]
+    assert latencies == []
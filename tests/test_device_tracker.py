@@ -0,0 +1,99 @@
+"""Tests for the device tracker platform."""
+import asyncio
+import datetime
+import importlib
+import logging
+import tempfile
+
+from homeassistant import config_entries, loader
+from homeassistant.bootstrap import async_load_base_functionality
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import EntityPlatform
+
+const = importlib.import_module('custom_components.Lynk&Co.const')
+coordinator = importlib.import_module('custom_components.Lynk&Co.coordinator')
+device_tracker = importlib.import_module('custom_components.Lynk&Co.device_tracker')
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+
+VIN = 'LB1234567890'
+STATUS = {
+    'updateTime': 1700000000000,
+    'basicVehicleStatus': {
+        'engineStatus': 'ENGINE_OFF',
+        'speed': 0,
+        'position': {'latitude': 112320000, 'longitude': 437040000},
+    },
+}
+
+
+class FakeClient:
+    """Record every request; the cloud never answers."""
+
+    def __init__(self):
+        self.calls = []
+
+    def url(self, path, *args):
+        return path.format(*args)
+
+    async def async_request(self, method, endpoint, url, **kwargs):
+        self.calls.append(endpoint)
+        await asyncio.Event().wait()
+
+    async def async_close(self):
+        pass
+
+
+class FakeStore:
+    """Hold one cached roster and snapshot."""
+
+    def __init__(self, data):
+        self.data = data
+
+    async def async_load(self):
+        return self.data
+
+    def async_delay_save(self, data_func, delay):
+        pass
+
+
+def test_setup_from_the_cache_makes_no_api_call():
+    async def run():
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            loader.async_setup(hass)
+            hass.config_entries = config_entries.ConfigEntries(hass, {})
+            await async_load_base_functionality(hass)
+            client = FakeClient()
+            cached = {
+                'vehicles': {VIN: {'vin': VIN, 'plateNo': 'AB123'}},
+                'data': {VIN: snapshot.SnapshotSchema().snapshot(STATUS).as_dict()},
+            }
+            account = coordinator.LynkCoAccount(
+                hass, client, 'user', 'secret', 5, store=FakeStore(cached))
+            assert await account.async_load_cache()
+
+            entry = config_entries.ConfigEntry(
+                version=1, minor_version=1, domain=const.DOMAIN, title='user',
+                data={}, source='user', options={}, entry_id='entry')
+            # Registered the way Home Assistant's own MockConfigEntry.add_to_hass does it
+            hass.config_entries._entries[entry.entry_id] = entry
+            hass.data[const.DOMAIN] = {entry.entry_id: {const.ACCOUNT: account}}
+            platform = EntityPlatform(
+                hass=hass, logger=logging.getLogger(__name__), domain='device_tracker',
+                platform_name=const.DOMAIN, platform=device_tracker,
+                scan_interval=datetime.timedelta(seconds=30), entity_namespace=None)
+            assert await asyncio.wait_for(platform.async_setup_entry(entry), 5)
+            await hass.async_block_till_done()
+
+            state = hass.states.get(er.async_get(hass).async_get_entity_id(
+                'device_tracker', const.DOMAIN, VIN))
+            await account.async_close()
+            await hass.async_stop(force=True)
+            return client.calls, state
+
+    calls, state = asyncio.run(run())
+    assert calls == []
+    assert state.attributes['latitude'] == 31.2
+    assert state.attributes['longitude'] == 121.4
+    assert state.attributes['vin'] == VIN
@@ -0,0 +1,117 @@
+"""Tests for the geofence index and engine."""
+import asyncio
+import importlib
+import tempfile
+
+from homeassistant.core import HomeAssistant
+
+geofence = importlib.import_module('custom_components.Lynk&Co.geofence')
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+
+METERS = 1 / 111320.0
+HOME = {'latitude': 31.2, 'longitude': 121.4, 'radius': 100}
+PARK = '{"park": [[31.30, 121.50], [31.31, 121.50], [31.31, 121.51], [31.30, 121.51]]}'
+SCHEMA = snapshot.SnapshotSchema()
+
+
+def raw(lat, lon):
+    return lat * 3600000, lon * 3600000
+
+
+def position(lat, lon):
+    raw_lat, raw_lon = raw(lat, lon)
+    return SCHEMA.snapshot({'basicVehicleStatus': {'position': {'latitude': raw_lat, 'longitude': raw_lon}}})
+
+
+def test_circle_contains_with_margin():
+    zone = geofence.CircleZone('zone.home', **HOME)
+    assert zone.contains(*raw(31.2 + 90 * METERS, 121.4))
+    assert not zone.contains(*raw(31.2 + 110 * METERS, 121.4))
+    assert zone.contains(*raw(31.2 + 110 * METERS, 121.4), margin=30)
+
+
+def test_polygon_contains_with_margin():
+    zone, = geofence.parse_polygons(PARK)
+    assert zone.contains(*raw(31.305, 121.505))
+    assert not zone.contains(*raw(31.31 + 20 * METERS, 121.505))
+    assert zone.contains(*raw(31.31 + 20 * METERS, 121.505), margin=30)
+    assert not zone.contains(*raw(31.31 + 40 * METERS, 121.505), margin=30)
+
+
+def test_parse_polygons():
+    assert geofence.parse_polygons('') == []
+    assert geofence.parse_polygons('  ') == []
+
+
+def test_index_only_returns_nearby_zones():
+    zones = [geofence.CircleZone('zone.{}'.format(i), 31.0 + i * 0.1, 121.4, 100) for i in range(20)]
+    index = geofence.GeofenceIndex(zones)
+    assert [zone.name for zone in index.candidates(*raw(31.5, 121.4))] == ['zone.5']
+    assert list(index.candidates(*raw(35.0, 121.4))) == []
+
+
+def test_index_keeps_large_zones_out_of_the_grid():
+    large = geofence.CircleZone('zone.city', 31.2, 121.4, 50000)
+    index = geofence.GeofenceIndex([large])
+    assert index.candidates(*raw(35.0, 100.0)) == [large]
+
+
+def run_engine(steps):
+    """Run steps(hass, engine, events) against a started GeofenceEngine."""
+    async def run():
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            events = []
+            hass.bus.async_listen(geofence.EVENT_GEOFENCE, lambda event: events.append(event.data))
+            hass.states.async_set('zone.home', '0', HOME)
+            engine = geofence.GeofenceEngine(hass, geofence.parse_polygons(PARK))
+            engine.async_start([])
+            await steps(hass, engine, events)
+            engine.async_stop()
+            await hass.async_stop(force=True)
+    asyncio.run(run())
+
+
+def test_transitions_with_hysteresis():
+    async def steps(hass, engine, events):
+        for lat in (200, 50, 120, 140):
+            engine.async_check('VIN', position(31.2 + lat * METERS, 121.4))
+        await hass.async_block_till_done()
+        assert events == [
+            {'vin': 'VIN', 'zone': 'zone.home', 'event': 'enter'},
+            {'vin': 'VIN', 'zone': 'zone.home', 'event': 'exit'},
+        ]
+
+    run_engine(steps)
+
+
+def test_first_position_is_silent():
+    async def steps(hass, engine, events):
+        engine.async_check('VIN', position(31.305, 121.505))
+        await hass.async_block_till_done()
+        assert events == []
+        assert engine.inside['VIN'] == {'park'}
+
+    run_engine(steps)
+
+
+def test_zone_occupancy_changes_do_not_rebuild():
+    async def steps(hass, engine, events):
+        index = engine.index
+        hass.states.async_set('zone.home', '2', HOME)
+        await hass.async_block_till_done()
+        assert engine.index is index
+        hass.states.async_set('zone.home', '2', dict(HOME, radius=200))
+        await hass.async_block_till_done()
+        assert engine.index is not index
+        index = engine.index
+        hass.states.async_set('zone.work', '0', {'latitude': 31.4, 'longitude': 121.4, 'radius': 50})
+        await hass.async_block_till_done()
+        assert engine.index is not index
+        assert len(engine.index.zones) == 3
+        hass.states.async_set('sensor.other', '1', HOME)
+        index = engine.index
+        await hass.async_block_till_done()
+        assert engine.index is index
+
+    run_engine(steps)
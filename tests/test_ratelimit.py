@@ -0,0 +1,80 @@
+"""Tests for the account-wide token bucket."""
+import asyncio
+import importlib
+import time
+from email.utils import formatdate
+
+ratelimit = importlib.import_module('custom_components.Lynk&Co.ratelimit')
+const = importlib.import_module('custom_components.Lynk&Co.const')
+
+
+def test_parse_retry_after():
+    assert ratelimit.parse_retry_after('12') == 12
+    assert ratelimit.parse_retry_after('-5') == 0
+    assert ratelimit.parse_retry_after('99999') == const.RATE_LIMIT_MAX_RETRY_AFTER
+    assert ratelimit.parse_retry_after(None) == const.RATE_LIMIT_DEFAULT_RETRY_AFTER
+    assert ratelimit.parse_retry_after('soon') == const.RATE_LIMIT_DEFAULT_RETRY_AFTER
+    now = 1700000000
+    assert abs(ratelimit.parse_retry_after(formatdate(now + 40, usegmt=True), now=now) - 40) < 1
+
+
+def test_burst_is_served_at_once_then_queued():
+    async def run():
+        limiter = ratelimit.TokenBucketLimiter(per_minute=600, burst=3)
+        waits = [await limiter.async_acquire() for _ in range(4)]
+        return limiter, waits
+
+    limiter, waits = asyncio.run(run())
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0.05 < waits[3] < 0.5
+    assert limiter.stats['poll']['requests'] == 4
+    assert limiter.stats['poll']['queued'] == 1
+
+
+def test_commands_go_before_polls():
+    async def run():
+        limiter = ratelimit.TokenBucketLimiter(per_minute=600, burst=1)
+        await limiter.async_acquire()
+        order = []
+
+        async def acquire(name, priority):
+            await limiter.async_acquire(priority)
+            order.append(name)
+
+        await asyncio.gather(
+            acquire('poll 1', ratelimit.PRIORITY_POLL),
+            acquire('poll 2', ratelimit.PRIORITY_POLL),
+            acquire('command', ratelimit.PRIORITY_COMMAND),
+        )
+        return order
+
+    assert asyncio.run(run()) == ['command', 'poll 1', 'poll 2']
+
+
+def test_throttling_pauses_the_bucket():
+    async def run():
+        limiter = ratelimit.TokenBucketLimiter(per_minute=600, burst=5)
+        limiter.async_throttled(0.3)
+        started = time.monotonic()
+        await limiter.async_acquire()
+        return limiter, time.monotonic() - started
+
+    limiter, waited = asyncio.run(run())
+    assert waited >= 0.25
+    assert limiter.throttled == 1
+    assert limiter.as_dict()['throttled'] == 1
+
+
+def test_cancelled_waiter_does_not_take_a_token():
+    async def run():
+        limiter = ratelimit.TokenBucketLimiter(per_minute=600, burst=1)
+        await limiter.async_acquire()
+        cancelled = asyncio.ensure_future(limiter.async_acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        waited = await limiter.async_acquire()
+        return cancelled.cancelled(), waited
+
+    cancelled, waited = asyncio.run(run())
+    assert cancelled
+    assert waited < 0.5
@@ -0,0 +1,51 @@
+"""Tests for the vehicle roster sync of an account."""
+import asyncio
+import importlib
+import tempfile
+
+from homeassistant.core import HomeAssistant
+
+api = importlib.import_module('custom_components.Lynk&Co.api')
+coordinator = importlib.import_module('custom_components.Lynk&Co.coordinator')
+
+
+def test_removed_car_drops_its_breakers_and_metrics():
+    async def run():
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            client = api.LynkCoClient()
+            account = coordinator.LynkCoAccount(hass, client, 'user', 'secret', 60)
+            account.vehicles = {'VIN_A': {'vin': 'VIN_A'}, 'VIN_B': {'vin': 'VIN_B'}}
+            account._async_add_coordinators()
+            for vin in account.vehicles:
+                client.breaker('status', vin)
+                client.breaker('telematics', vin)
+                client.metrics.vehicle(vin)
+            client.breaker('vehicles')
+            changes = []
+            client.add_breaker_listener(lambda: changes.append(True))
+
+            async def get_roster():
+                return {'VIN_B': {'vin': 'VIN_B'}}
+
+            account._async_get_roster = get_roster
+            added, removed = await account.async_sync_roster()
+            await account.async_close()
+            await hass.async_stop(force=True)
+            return client, added, removed, changes
+
+    client, added, removed, changes = asyncio.run(run())
+    assert (added, removed) == ([], ['VIN_A'])
+    assert sorted(client.breakers) == ['status VIN_B', 'telematics VIN_B', 'vehicles']
+    assert list(client.metrics.vehicles) == ['VIN_B']
+    assert changes == [True]
+
+
+def test_forgetting_an_unknown_car_changes_nothing():
+    client = api.LynkCoClient()
+    client.breaker('status', 'VIN_B')
+    changes = []
+    client.add_breaker_listener(lambda: changes.append(True))
+    client.forget_vehicle('VIN_A')
+    assert list(client.breakers) == ['status VIN_B']
+    assert changes == []
@@ -0,0 +1,82 @@
+"""Tests for the state-aware polling scheduler."""
+import datetime
+import importlib
+
+import pytest
+
+const = importlib.import_module('custom_components.Lynk&Co.const')
+scheduler = importlib.import_module('custom_components.Lynk&Co.scheduler')
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+
+SCHEMA = snapshot.SnapshotSchema()
+
+
+def status(engine='ENGINE_OFF', speed=0, locked=True):
+    doors = {kind: 1 if locked else 0 for kind in scheduler.LOCK_STATUS_KINDS}
+    return SCHEMA.snapshot({
+        'basicVehicleStatus': {'engineStatus': engine, 'speed': speed},
+        'additionalVehicleStatus': {'drivingSafetyStatus': doors},
+    })
+
+
+def seconds(interval):
+    return interval.total_seconds()
+
+
+@pytest.mark.parametrize('scan_interval, active', [
+    (1, const.MIN_SCAN_INTERVAL),
+    (5, const.MIN_SCAN_INTERVAL),
+    (120, 120),
+])
+def test_active_interval_is_never_below_the_minimum(scan_interval, active):
+    polling = scheduler.PollingScheduler(scan_interval)
+    assert polling.active_interval == active
+    assert polling.active_interval <= polling.idle_interval <= polling.parked_interval
+
+
+def test_parked_interval_is_never_below_the_active_interval():
+    polling = scheduler.PollingScheduler(2 * const.DEFAULT_SCAN_INTERVAL)
+    assert polling.parked_interval == 2 * const.DEFAULT_SCAN_INTERVAL
+
+
+def test_interval_follows_the_state_of_the_car():
+    polling = scheduler.PollingScheduler(120)
+    assert polling.interval_for(status(engine='ENGINE_RUNNING')) == 120
+    assert polling.interval_for(status(speed=30)) == 120
+    assert polling.interval_for(status(locked=False)) == polling.idle_interval
+    assert polling.interval_for(status()) == const.DEFAULT_SCAN_INTERVAL
+
+
+def test_transitions_between_parked_and_driving():
+    polling = scheduler.PollingScheduler(120)
+    assert seconds(polling.next_interval((status(),))) == const.DEFAULT_SCAN_INTERVAL
+    assert seconds(polling.next_interval((status(locked=False),))) == polling.idle_interval
+    assert seconds(polling.next_interval((status(locked=False, engine='ENGINE_RUNNING'),))) == 120
+    assert seconds(polling.next_interval((status(),))) == const.DEFAULT_SCAN_INTERVAL
+
+
+def test_most_active_car_sets_the_interval():
+    polling = scheduler.PollingScheduler(120)
+    assert seconds(polling.next_interval((status(), status(speed=30)))) == 120
+    assert seconds(polling.next_interval(())) == const.DEFAULT_SCAN_INTERVAL
+
+
+def test_failures_back_off_up_to_the_parked_interval(monkeypatch):
+    monkeypatch.setattr(scheduler.random, 'uniform', lambda low, high: high)
+    polling = scheduler.PollingScheduler(5)
+    backoff = [seconds(polling.failed()) for _ in range(6)]
+    assert backoff == sorted(backoff)
+    assert backoff[0] == const.MIN_SCAN_INTERVAL
+    assert backoff[-1] == const.DEFAULT_SCAN_INTERVAL
+    assert all(const.MIN_SCAN_INTERVAL <= delay <= const.DEFAULT_SCAN_INTERVAL for delay in backoff)
+
+    # A success resets the backoff
+    polling.next_interval((status(),))
+    assert seconds(polling.failed()) == const.MIN_SCAN_INTERVAL
+
+
+def test_backoff_jitter_stays_above_the_active_interval(monkeypatch):
+    monkeypatch.setattr(scheduler.random, 'uniform', lambda low, high: low)
+    polling = scheduler.PollingScheduler(5)
+    assert seconds(polling.failed()) == const.MIN_SCAN_INTERVAL
+    assert isinstance(polling.failed(), datetime.timedelta)
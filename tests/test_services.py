@@ -0,0 +1,99 @@
+"""Tests for the vehicle services shared by all config entries."""
+import asyncio
+import importlib
+import tempfile
+
+import pytest
+from homeassistant import config_entries, loader
+from homeassistant.bootstrap import async_load_base_functionality
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+lynkco = importlib.import_module('custom_components.Lynk&Co')
+const = importlib.import_module('custom_components.Lynk&Co.const')
+exceptions = importlib.import_module('custom_components.Lynk&Co.exceptions')
+
+
+class FakeCommands:
+    def __init__(self, sent):
+        self.sent = sent
+
+    async def async_submit(self, vin, service, value=None):
+        self.sent.append((vin, service, value))
+
+
+class FakeAccount:
+    """One login owning some VINs; records the commands it is given."""
+
+    def __init__(self, *vins):
+        self.coordinators = dict.fromkeys(vins)
+        self.sent = []
+        self.commands = FakeCommands(self.sent)
+
+
+def run_services(steps):
+    """Run steps(hass, entity_ids) with two accounts and their services registered."""
+    async def run():
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            loader.async_setup(hass)
+            hass.config_entries = config_entries.ConfigEntries(hass, {})
+            await async_load_base_functionality(hass)
+            registry = er.async_get(hass)
+            entity_ids = {
+                vin: registry.async_get_or_create('device_tracker', const.DOMAIN, vin).entity_id
+                for vin in ('VIN_A', 'VIN_B')
+            }
+            hass.data[const.DOMAIN] = {
+                'devices': set(),
+                'entry_a': {const.ACCOUNT: FakeAccount('VIN_A')},
+                'entry_b': {const.ACCOUNT: FakeAccount('VIN_B')},
+            }
+            lynkco.async_setup_services(hass)
+            lynkco.async_setup_services(hass)
+            try:
+                await steps(hass, entity_ids)
+            finally:
+                await hass.async_stop(force=True)
+    asyncio.run(run())
+
+
+def test_commands_go_to_the_account_owning_the_vin():
+    async def steps(hass, entity_ids):
+        await hass.services.async_call(
+            const.DOMAIN, 'lock', {'entity_id': entity_ids['VIN_A']}, blocking=True)
+        await hass.services.async_call(
+            const.DOMAIN, 'unlock', {'entity_id': entity_ids['VIN_B'], 'value': 2}, blocking=True)
+        data = hass.data[const.DOMAIN]
+        assert data['entry_a'][const.ACCOUNT].sent == [('VIN_A', 'lock', None)]
+        assert data['entry_b'][const.ACCOUNT].sent == [('VIN_B', 'unlock', 2)]
+
+    run_services(steps)
+
+
+def test_unknown_entity_is_rejected():
+    async def steps(hass, entity_ids):
+        with pytest.raises(exceptions.LynkCoError):
+            await hass.services.async_call(
+                const.DOMAIN, 'lock', {'entity_id': 'device_tracker.unknown'}, blocking=True)
+
+    run_services(steps)
+
+
+def test_services_are_removed_with_the_last_entry():
+    async def steps(hass, entity_ids):
+        data = hass.data[const.DOMAIN]
+        data.pop('entry_a')
+        lynkco.async_unload_services(hass)
+        assert hass.services.has_service(const.DOMAIN, 'lock')
+        # The remaining entry still gets its own commands
+        await hass.services.async_call(
+            const.DOMAIN, 'start', {'entity_id': entity_ids['VIN_B']}, blocking=True)
+        assert data['entry_b'][const.ACCOUNT].sent == [('VIN_B', 'start', None)]
+
+        data.pop('entry_b')
+        lynkco.async_unload_services(hass)
+        for service in lynkco.SERVICE_SCHEMAS:
+            assert not hass.services.has_service(const.DOMAIN, service)
+
+    run_services(steps)
@@ -0,0 +1,117 @@
+"""Tests for the snapshot schema, its path trie and VehicleSnapshot."""
+import importlib
+
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+
+ENTITY_PATHS = [path for path in snapshot.BASE_PATHS if path not in snapshot.CORE_PATHS]
+ENABLED, DISABLED = ENTITY_PATHS[0], ENTITY_PATHS[1]
+
+
+def tree(values):
+    """Build a vehicleStatus tree from {path: value}."""
+    root = {}
+    for path, value in values.items():
+        node = root
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return root
+
+
+STATUS = {
+    snapshot.UPDATE_TIME_PATH: 1700000000000,
+    snapshot.LATITUDE_PATH: 112320000,
+    ENABLED: 'on',
+    DISABLED: 'off',
+}
+
+
+def test_unrestricted_schema_extracts_every_path():
+    schema = snapshot.SnapshotSchema()
+    status = schema.snapshot(tree(STATUS))
+    for path, value in STATUS.items():
+        assert status.get(path) == value
+    assert status.raw is None
+    assert schema.snapshot(tree(STATUS), keep_raw=True).raw == tree(STATUS)
+
+
+def test_restrict_keeps_core_and_enabled_paths():
+    schema = snapshot.SnapshotSchema()
+    schema.restrict({ENABLED})
+    status = schema.snapshot(tree(STATUS))
+    assert status.get(snapshot.LATITUDE_PATH) == 112320000
+    assert status.get(ENABLED) == 'on'
+    assert status.get(DISABLED) is None
+    assert status.get(DISABLED, 'missing') == 'missing'
+
+
+def test_restrict_keeps_extra_paths():
+    extra = ('additionalVehicleStatus', 'custom', 'field')
+    schema = snapshot.SnapshotSchema([extra])
+    schema.restrict(set())
+    assert schema.snapshot(tree({extra: 7})).get(extra) == 7
+
+
+def test_widen_after_an_entity_is_enabled():
+    schema = snapshot.SnapshotSchema()
+    assert not schema.widen({DISABLED})
+    schema.restrict({ENABLED})
+    before = schema.snapshot(tree(STATUS))
+
+    assert schema.widen({DISABLED})
+    assert not schema.widen({DISABLED, ENABLED})
+    after = schema.snapshot(tree(STATUS))
+    assert after.get(DISABLED) == 'off'
+    # The next refresh reports the newly extracted field as changed
+    assert schema.diff(before, after) == {DISABLED}
+
+
+def test_missing_and_odd_typed_branches_are_skipped():
+    schema = snapshot.SnapshotSchema()
+    schema.restrict({ENABLED})
+    odd = {
+        'updateTime': 1700000000000,
+        'basicVehicleStatus': 'unavailable',
+        'additionalVehicleStatus': [1, 2, 3],
+    }
+    status = schema.snapshot(odd)
+    assert status.get(snapshot.UPDATE_TIME_PATH) == 1700000000000
+    assert status.get(snapshot.LATITUDE_PATH) is None
+    assert status.get(ENABLED) is None
+
+    position = {'basicVehicleStatus': {'position': None, 'speed': {'value': 3}}}
+    status = schema.snapshot(position)
+    assert status.get(snapshot.LATITUDE_PATH) is None
+    assert status.get(('basicVehicleStatus', 'speed')) == {'value': 3}
+
+
+def test_non_dict_payload_is_an_empty_snapshot():
+    schema = snapshot.SnapshotSchema()
+    for payload in (None, [], 'error'):
+        status = schema.snapshot(payload)
+        assert status.as_dict() == {}
+        assert status.as_tree() == {}
+
+
+def test_as_dict_round_trip_ignores_unknown_paths():
+    schema = snapshot.SnapshotSchema()
+    status = schema.snapshot(tree(STATUS))
+    flat = dict(status.as_dict(), **{'no.such.path': 1})
+    restored = schema.from_dict(flat)
+    assert restored.values == status.values
+    assert restored.as_tree() == tree(STATUS)
+
+
+def test_diff_against_another_schema_reports_every_path():
+    schema = snapshot.SnapshotSchema()
+    other = snapshot.SnapshotSchema()
+    status = schema.snapshot(tree(STATUS))
+    assert schema.diff(other.snapshot(tree(STATUS)), status) == set(schema.paths)
+    assert schema.diff(None, status) == set(schema.paths)
+    assert schema.diff(status, schema.snapshot(tree(STATUS))) == set()
+
+
+def test_parse_projection():
+    assert snapshot.parse_projection(' * ') is None
+    assert snapshot.parse_projection('a.b, c ,,') == (('a', 'b'), ('c',))
+    assert snapshot.parse_projection('') == ()
@@ -0,0 +1,63 @@
+"""Tests for the per-vehicle telemetry ring buffer."""
+import importlib
+import math
+
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+telemetry = importlib.import_module('custom_components.Lynk&Co.telemetry')
+
+SCHEMA = snapshot.SnapshotSchema()
+
+
+def status(seconds, speed=None, latitude=None):
+    tree = {'updateTime': str(seconds * 1000), 'basicVehicleStatus': {}}
+    if speed is not None:
+        tree['basicVehicleStatus']['speed'] = str(speed)
+    if latitude is not None:
+        tree['basicVehicleStatus']['position'] = {
+            'latitude': str(latitude * telemetry.POSITION_SCALE),
+            'longitude': '0',
+        }
+    return SCHEMA.snapshot(tree)
+
+
+def test_append_keeps_time_order():
+    buffer = telemetry.TelemetryBuffer(capacity=4)
+    assert buffer.last_time is None
+    assert buffer.append(status(100, speed=10))
+    assert not buffer.append(status(100, speed=20))
+    assert not buffer.append(status(90, speed=30))
+    assert len(buffer) == 1
+    assert buffer.last_time == 100
+    assert buffer.last(5, ('speed',)) == {'speed': [10.0]}
+
+
+def test_missing_values_are_nan_and_positions_are_degrees():
+    buffer = telemetry.TelemetryBuffer(capacity=4)
+    buffer.append(status(100, latitude=52.5))
+    window = buffer.last(1)
+    assert window['latitude'] == [52.5]
+    assert math.isnan(window['speed'][0])
+    assert math.isnan(window['odometer'][0])
+
+
+def test_wraparound_drops_the_oldest_samples():
+    buffer = telemetry.TelemetryBuffer(capacity=4)
+    for second in range(10):
+        buffer.append(status(second, speed=second))
+    assert len(buffer) == 4
+    assert buffer.nbytes == 4 * len(telemetry.COLUMNS) * 8
+    assert buffer.last(10, ('time', 'speed')) == {
+        'time': [6.0, 7.0, 8.0, 9.0],
+        'speed': [6.0, 7.0, 8.0, 9.0],
+    }
+    assert buffer.last(2, ('speed',)) == {'speed': [8.0, 9.0]}
+    assert buffer.last(0, ('speed',)) == {'speed': []}
+
+
+def test_since_returns_the_window_across_the_wrap():
+    buffer = telemetry.TelemetryBuffer(capacity=5)
+    for second in range(0, 70, 10):
+        buffer.append(status(second, speed=second))
+    assert buffer.since(25, ('time',), now=60) == {'time': [40.0, 50.0, 60.0]}
+    assert buffer.since(1000, ('time',), now=60) == {'time': [20.0, 30.0, 40.0, 50.0, 60.0]}
+    assert buffer.since(5, ('time',), now=100) == {'time': []}
@@ -0,0 +1,101 @@
+"""Tests for trace redaction and sampling."""
+import importlib
+import logging
+
+import pytest
+
+tracing = importlib.import_module('custom_components.Lynk&Co.tracing')
+
+VIN = 'LB1234567890ABCDE'
+ACCESS_TOKEN = 'access-2f9c1e'
+REFRESH_TOKEN = 'refresh-77ab03'
+USER_ID = 'user-5521'
+PASSWORD_HASH = '5ebe2294ecd0e0f08eab7690d2a6ee69'
+LATITUDE = 112320123
+LONGITUDE = 437040456
+SECRETS = (VIN, ACCESS_TOKEN, REFRESH_TOKEN, USER_ID, PASSWORD_HASH, 'driver@example.com',
+           str(LATITUDE), str(LONGITUDE))
+
+
+@pytest.fixture
+def debug_log(caplog):
+    caplog.set_level(logging.DEBUG, logger=tracing.__name__)
+    return caplog
+
+
+def traced(**events):
+    """Log one trace with the given events and return it."""
+    trace = tracing.Tracer(1).start('update', VIN)
+    for name, fields in events.items():
+        trace.event(name, **fields)
+    return trace
+
+
+def assert_no_secrets(text):
+    for secret in SECRETS:
+        assert secret not in text
+
+
+def test_request_and_response_are_redacted(debug_log):
+    trace = traced(
+        login={'data': {'username': 'driver@example.com', 'password': PASSWORD_HASH}},
+        request={
+            'url': 'https://api.example/vehicles/{}/status?userId={}'.format(VIN, USER_ID),
+            'headers': {'authorization': ACCESS_TOKEN},
+            'data': {'userId': USER_ID, 'refreshToken': REFRESH_TOKEN},
+        },
+        response={'status': 200, 'data': {
+            'accessToken': ACCESS_TOKEN,
+            'vin': VIN,
+            'vehicleStatus': {'basicVehicleStatus': {'position': {
+                'latitude': LATITUDE, 'longitude': LONGITUDE}}},
+        }},
+    )
+    trace.end(changed=3)
+    assert debug_log.text
+    assert_no_secrets(debug_log.text)
+    assert '***BCDE' in debug_log.text
+    assert '"changed": 3' in debug_log.text
+
+
+def test_secrets_inside_text_are_redacted(debug_log):
+    body = '{{"accessToken": "{}", "refreshToken": "{}", "latitude": {}, "longitude": {}}}'.format(
+        ACCESS_TOKEN, REFRESH_TOKEN, LATITUDE, LONGITUDE)
+    trace = traced(response={'text': body, 'form': 'userId={}&password={}'.format(USER_ID, PASSWORD_HASH)})
+    trace.end()
+    assert_no_secrets(debug_log.text)
+
+
+def test_vins_as_keys_and_in_errors_are_redacted(debug_log):
+    trace = traced(roster={'vehicles': {VIN: {'plateNo': 'AB123'}}})
+    trace.end(error=ConnectionError('Cannot connect to /vehicles/{}/status'.format(VIN)))
+    assert_no_secrets(debug_log.text)
+    assert 'AB123' not in debug_log.text
+    assert 'Cannot connect' in debug_log.text
+
+
+@pytest.mark.parametrize('rate, sampled', [(1, 9), (3, 3), (4, 3)])
+def test_one_in_sample_rate_operations_is_traced(debug_log, rate, sampled):
+    tracer = tracing.Tracer(rate)
+    traces = [tracer.start('update', VIN) for _ in range(9)]
+    assert sum(1 for trace in traces if trace) == sampled
+    assert traces[0]
+
+
+def test_sampling_counts_each_operation_and_vin_separately(debug_log):
+    tracer = tracing.Tracer(2)
+    assert tracer.start('update', VIN)
+    assert tracer.start('update', 'OTHER')
+    assert tracer.start('lock', VIN)
+    assert not tracer.start('update', VIN)
+
+
+def test_disabled_tracing_returns_the_null_trace(caplog):
+    caplog.set_level(logging.INFO, logger=tracing.__name__)
+    assert tracing.Tracer(1).start('update', VIN) is tracing.NULL_TRACE
+    caplog.set_level(logging.DEBUG, logger=tracing.__name__)
+    assert tracing.Tracer(0).start('update', VIN) is tracing.NULL_TRACE
+    with tracing.NULL_TRACE.span('request'):
+        tracing.NULL_TRACE.event('request', headers={'authorization': ACCESS_TOKEN})
+    tracing.NULL_TRACE.end()
+    assert not caplog.records
@@ -0,0 +1,88 @@
+"""Tests for the device tracker write filter and track simplification."""
+import importlib
+
+tracking = importlib.import_module('custom_components.Lynk&Co.tracking')
+
+METERS = 1 / 111320.0
+STEP = 125  # 90 km/h polled every 5 s
+
+
+def drive(steps, start=(0, 31.2, 121.4), north=STEP, east=0):
+    """Return positions of a car moving in a straight line every 5 s."""
+    time, lat, lon = start
+    return [(time + 5 * i, lat + i * north * METERS, lon + i * east * METERS) for i in range(1, steps + 1)]
+
+
+def test_moves_beyond_threshold_are_written_at_once():
+    track = tracking.TrackFilter(20)
+    assert track.update((0, 31.2, 121.4), force=True)
+    points = drive(60)
+    assert all(track.update(point) for point in points)
+    assert track.last == points[-1]
+    assert track.written == 61
+
+
+def test_small_moves_are_skipped():
+    track = tracking.TrackFilter(20)
+    track.update((0, 31.2, 121.4), force=True)
+    assert not track.update((5, 31.2 + 5 * METERS, 121.4))
+    assert not track.update((10, 31.2, 121.4 + 10 * METERS))
+    assert track.skipped == 2
+    assert track.update((15, 31.2 + 25 * METERS, 121.4))
+
+
+def test_precision_change_and_stop_are_written():
+    track = tracking.TrackFilter(20)
+    track.update((0, 31.2, 121.4), trusted=True, force=True)
+    assert track.update((5, 31.2, 121.4), trusted=False)
+    assert track.update((10, 31.2, 121.4), trusted=False, active=False)
+    assert not track.update((15, 31.2, 121.4), trusted=False, active=False)
+
+
+def test_zero_distance_writes_every_position():
+    track = tracking.TrackFilter(0)
+    assert all(track.update((i, 31.2, 121.4)) for i in range(5))
+
+
+def test_straight_drive_is_simplified():
+    track = tracking.TrackFilter(20, max_silence=3600)
+    track.update((0, 31.2, 121.4), force=True)
+    points = drive(50)
+    for point in points:
+        track.update(point)
+    assert track.track == [(0, 31.2, 121.4), points[-1]]
+
+
+def test_turn_keeps_the_corner_with_its_own_time():
+    track = tracking.TrackFilter(20, max_silence=3600)
+    track.update((0, 31.2, 121.4), force=True)
+    north = drive(10)
+    east = drive(10, start=north[-1], north=0, east=STEP)
+    for point in north + east:
+        track.update(point)
+    assert track.track == [(0, 31.2, 121.4), north[-1], east[-1]]
+    times = [point[0] for point in track.track]
+    assert len(set(times)) == len(times)
+
+
+def test_silence_closes_a_segment():
+    track = tracking.TrackFilter(20, max_silence=60)
+    track.update((0, 31.2, 121.4), force=True)
+    for point in drive(30):
+        track.update(point)
+    times = [point[0] for point in track.track]
+    assert all(later - earlier <= 65 for earlier, later in zip(times, times[1:]))
+
+
+def test_track_is_bounded():
+    track = tracking.TrackFilter(20, max_points=8)
+    track.update((0, 31.2, 121.4), active=False, force=True)
+    for time, lat, lon in drive(40):
+        track.update((time, lat, lon), active=False)
+    assert len(track.track) == 8
+
+
+def test_deviation_from_segment():
+    start, end = (0, 0.0, 121.4), (1, 100 * METERS, 121.4)
+    assert abs(tracking.deviation(start, end, (0, 50 * METERS, 121.4 + 10 * METERS)) - 10) < 0.1
+    assert abs(tracking.deviation(start, start, (0, 30 * METERS, 121.4)) - 30) < 0.1
@@ -0,0 +1,96 @@
+"""Tests for incremental trip detection."""
+import importlib
+
+import pytest
+
+snapshot = importlib.import_module('custom_components.Lynk&Co.snapshot')
+telemetry = importlib.import_module('custom_components.Lynk&Co.telemetry')
+trips = importlib.import_module('custom_components.Lynk&Co.trips')
+
+SCHEMA = snapshot.SnapshotSchema()
+
+
+def status(seconds, engine='ENGINE_OFF', speed=0, odometer=None, fuel=None, latitude=None):
+    tree = {
+        'updateTime': str(seconds * 1000),
+        'basicVehicleStatus': {'speed': str(speed), 'engineStatus': engine},
+        'additionalVehicleStatus': {'maintenanceStatus': {}, 'runningStatus': {}},
+    }
+    if odometer is not None:
+        tree['additionalVehicleStatus']['maintenanceStatus']['odometer'] = str(odometer)
+    if fuel is not None:
+        tree['additionalVehicleStatus']['runningStatus']['fuelLevelStatus'] = str(fuel)
+    if latitude is not None:
+        tree['basicVehicleStatus']['position'] = {
+            'latitude': str(round(latitude * telemetry.POSITION_SCALE)),
+            'longitude': '0',
+        }
+    return SCHEMA.snapshot(tree)
+
+
+def test_idle_car_opens_no_trip():
+    detector = trips.TripDetector(idle_timeout=300)
+    assert detector.update(status(0, odometer=1000)) is None
+    assert detector.update(status(60, odometer=1000)) is None
+    assert detector.current is None
+    assert detector.idle_deadline() is None
+
+
+def test_trip_from_engine_start_to_idle_timeout():
+    detector = trips.TripDetector(idle_timeout=300)
+    detector.update(status(0, odometer=1000, fuel=40))
+    detector.update(status(60, engine='ENGINE_RUNNING', odometer=1000, fuel=40))
+    assert detector.current is not None
+    detector.update(status(660, engine='ENGINE_RUNNING', speed=60, odometer=1010, fuel=39))
+    detector.update(status(720, odometer=1010, fuel=39))
+    assert detector.idle_deadline() == 660 + 300
+    assert detector.update(status(900, odometer=1010, fuel=39)) is None
+
+    ended = detector.update(status(960, odometer=1010, fuel=39))
+    assert ended is detector.last
+    assert detector.current is None
+    assert ended.as_dict() == {
+        'start': 60,
+        'end': 660,
+        'distance': 10,
+        'duration': 600,
+        'average_speed': 60.0,
+        'fuel_used': 1,
+    }
+
+
+def test_odometer_increase_counts_as_movement():
+    detector = trips.TripDetector(idle_timeout=300)
+    detector.update(status(0, odometer=1000))
+    detector.update(status(60, odometer=1002))
+    assert detector.current is not None
+    assert detector.current.distance == 2
+
+
+def test_distance_falls_back_to_the_path():
+    detector = trips.TripDetector(idle_timeout=300)
+    detector.update(status(0, speed=30, latitude=0))
+    detector.update(status(60, speed=30, latitude=0.01))
+    trip = detector.current
+    assert trip.distance == pytest.approx(1.11, abs=0.01)
+    assert trip.fuel_used is None
+
+
+def test_expire_closes_the_trip_without_a_new_sample():
+    detector = trips.TripDetector(idle_timeout=300)
+    detector.update(status(0, speed=30))
+    detector.update(status(60))
+    assert detector.expire(299) is None
+    trip = detector.expire(300)
+    assert trip is detector.last
+    assert trip.duration == 0
+    assert trip.average_speed == 0.0
+
+
+def test_driving_again_after_the_timeout_starts_a_new_trip():
+    detector = trips.TripDetector(idle_timeout=300)
+    detector.update(status(0, speed=30))
+    detector.update(status(60))
+    ended = detector.update(status(600, speed=30))
+    assert ended is not None and ended.start == 0
+    assert detector.current is not None and detector.current.start == 600